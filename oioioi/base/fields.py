@@ -3,6 +3,7 @@ from django.utils.translation import ugettext_lazy as _
 from django.forms import ValidationError
 from south.modelsinspector import add_introspection_rules
 from oioioi.base.utils import get_object_by_dotted_name
+from oioioi.base.utils.loading import subclasses_manifest_entry
 
 
 class DottedNameField(models.CharField):
@@ -36,12 +37,24 @@ class DottedNameField(models.CharField):
         self.superclass_name = superclass
         self._superclass = superclass
 
+    def _superclass_name(self):
+        if isinstance(self._superclass, basestring):
+            return self._superclass
+        return '%s.%s' % (self._superclass.__module__,
+                self._superclass.__name__)
+
     def _get_superclass(self):
         if isinstance(self._superclass, basestring):
             self._superclass = get_object_by_dotted_name(self._superclass)
         return self._superclass
 
     def _generate_choices(self):
+        entry = subclasses_manifest_entry(self._superclass_name())
+        if entry is not None:
+            # Modules with subclasses are not imported until needed.
+            for dotted_name, description in entry['subclasses']:
+                yield dotted_name, _(description)
+            return
         superclass = self._get_superclass()
         superclass.load_subclasses()
         subclasses = superclass.subclasses
@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.validation import get_validation_errors
+from django.db.models.loading import get_models
+from django.utils.importlib import import_module
+from django.utils.translation import ugettext as _
+from oioioi.base.utils.loading import find_superclasses, timed_imports
+from optparse import make_option
+from cStringIO import StringIO
+import json
+import time
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('-n', '--limit', metavar='N', dest='limit', type='int',
+            default=20, help=_("Number of the slowest modules to list")),
+        make_option('-o', '--output', metavar='FILE', dest='output',
+            default=None, help=_("Write the results to FILE in the JSON "
+                "format")),
+    )
+
+    help = _("Measures the time of starting the web server or a worker: "
+             "importing the installed apps, loading and validating models "
+             "and loading the modules with contest controllers and other "
+             "pluggable classes. Reports the time of imports of every app, "
+             "including failed imports of modules which do not exist, and "
+             "the slowest modules. Modules imported before the command "
+             "starts are not measured.")
+
+    requires_model_validation = False
+
+    def _app_of_module(self, module):
+        apps = [app for app in settings.INSTALLED_APPS
+                if module == app or module.startswith(app + '.')]
+        if apps:
+            return max(apps, key=len)
+        return module.split('.')[0]
+
+    def _load_subclasses(self):
+        for superclass in find_superclasses():
+            superclass.load_subclasses()
+
+    def _measure(self):
+        phases = []
+        with timed_imports() as timings:
+            for name, function in [
+                    ('apps', lambda: [import_module(app)
+                        for app in settings.INSTALLED_APPS]),
+                    ('models', get_models),
+                    ('validation', lambda: get_validation_errors(StringIO())),
+                    ('subclasses', self._load_subclasses)]:
+                start_time = time.time()
+                function()
+                phases.append({'name': name,
+                    'time': (time.time() - start_time) * 1000})
+
+        apps = {}
+        modules = []
+        for module, (total, own) in timings.iteritems():
+            failed = module.endswith(' (failed)')
+            app = apps.setdefault(self._app_of_module(
+                module.split(' ')[0]), {'time': 0., 'modules': 0,
+                    'failed': 0, 'failed_time': 0.})
+            app['time'] += own * 1000
+            app['modules'] += 1
+            if failed:
+                app['failed'] += 1
+                app['failed_time'] += total * 1000
+            modules.append({'name': module, 'time': total * 1000,
+                'own_time': own * 1000})
+        modules.sort(key=lambda module: module['own_time'], reverse=True)
+        return {
+            'manifest': settings.SUBCLASSES_MANIFEST,
+            'phases': phases,
+            'apps': sorted(({'name': name, 'time': app['time'],
+                'modules': app['modules'], 'failed': app['failed'],
+                'failed_time': app['failed_time']}
+                for name, app in apps.iteritems()),
+                key=lambda app: app['time'], reverse=True),
+            'modules': modules,
+        }
+
+    def handle(self, *args, **options):
+        if args:
+            raise CommandError(_("Expected no arguments"))
+        results = self._measure()
+
+        self.stdout.write('%-40s %10s\n' % (_("Phase"), 'time [ms]'))
+        for phase in results['phases']:
+            self.stdout.write('%-40s %10.1f\n' % (phase['name'],
+                phase['time']))
+
+        self.stdout.write('\n%-40s %10s %8s %8s %10s\n' % (_("App"),
+            'time [ms]', _("Modules"), _("Failed"), 'failed [ms]'))
+        for app in results['apps']:
+            self.stdout.write('%-40s %10.1f %8d %8d %10.1f\n' % (app['name'],
+                app['time'], app['modules'], app['failed'],
+                app['failed_time']))
+
+        self.stdout.write('\n%-60s %10s %10s\n' % (_("Module"),
+            'own [ms]', 'total [ms]'))
+        for module in results['modules'][:options['limit']]:
+            self.stdout.write('%-60s %10.1f %10.1f\n' % (module['name'],
+                module['own_time'], module['time']))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=4)
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import ugettext as _
+from oioioi.base.utils.loading import build_subclasses_manifest
+from optparse import make_option
+import json
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('-o', '--output', metavar='FILE', dest='output',
+            default=None, help=_("Write the manifest to FILE instead of "
+                "settings.SUBCLASSES_MANIFEST")),
+    )
+
+    help = _("Writes the manifest of modules with contest controllers, "
+             "problem package backends and other pluggable classes, so that "
+             "they are not looked for in all installed apps when the web "
+             "server and workers start. Run it after installing, upgrading "
+             "or changing INSTALLED_APPS.")
+
+    requires_model_validation = False
+
+    def handle(self, *args, **options):
+        if args:
+            raise CommandError(_("Expected no arguments"))
+        output = options['output'] or settings.SUBCLASSES_MANIFEST
+        if not output:
+            raise CommandError(_("settings.SUBCLASSES_MANIFEST is not set, "
+                "use --output"))
+
+        manifest = build_subclasses_manifest()
+        with open(output, 'w') as f:
+            json.dump(manifest, f, indent=4, sort_keys=True)
+
+        for name, entry in sorted(manifest['superclasses'].iteritems()):
+            self.stdout.write(_("%(name)s: %(modules)d modules, "
+                "%(subclasses)d subclasses\n") % {'name': name,
+                    'modules': len(entry['modules']),
+                    'subclasses': len(entry['subclasses'])})
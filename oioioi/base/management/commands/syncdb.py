@@ -1,7 +1,12 @@
 from django.conf import settings
+from django.core.cache.backends.db import BaseDatabaseCache
+from django.core.management import call_command
+from django.db import connection
 
 from south.management.commands import syncdb
 
+from oioioi.base.utils import get_object_by_dotted_name
+
 import os
 
 
@@ -18,3 +23,12 @@ class Command(syncdb.Command):
                               "in production\n")
         else:
             super(Command, self).handle_noargs(**options)
+            self._create_cache_tables()
+
+    def _create_cache_tables(self):
+        tables = connection.introspection.table_names()
+        for params in settings.CACHES.values():
+            backend = get_object_by_dotted_name(params['BACKEND'])
+            if issubclass(backend, BaseDatabaseCache) \
+                    and params['LOCATION'] not in tables:
+                call_command('createcachetable', params['LOCATION'])
@@ -1,2 +1,52 @@
 # Important. This import is to register signal handlers. Do not remove it.
 import oioioi.base.signal_handlers
+
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from oioioi.base.utils.user_selection import user_search_tokens, \
+        SEARCH_TOKEN_LENGTH
+
+
+class UserSearchTokenManager(models.Manager):
+    def update_for_user(self, user):
+        """Makes the tokens of ``user`` match their current names."""
+        tokens = user_search_tokens(user)
+        existing = set(self.filter(user=user)
+                .values_list('token', flat=True))
+        if tokens == existing:
+            return
+        self.filter(user=user, token__in=existing - tokens).delete()
+        self.bulk_create([UserSearchToken(user=user, token=token)
+                for token in tokens - existing])
+
+    def create_for_users(self, users):
+        """Creates the tokens of ``users``, which have none yet, with
+           a single query.
+
+           Used for users created with ``bulk_create``, which does not send
+           the ``post_save`` signal.
+        """
+        self.bulk_create([UserSearchToken(user_id=user.id, token=token)
+                for user in users for token in user_search_tokens(user)])
+
+
+class UserSearchToken(models.Model):
+    """A normalized word of a username, first name or last name of a user,
+       used by :func:`~oioioi.base.utils.user_selection.search_users`.
+    """
+    objects = UserSearchTokenManager()
+
+    user = models.ForeignKey(User, related_name='search_tokens')
+    token = models.CharField(max_length=SEARCH_TOKEN_LENGTH, db_index=True)
+
+
+@receiver(post_save, sender=User)
+def _update_user_search_tokens(sender, instance, update_fields=None,
+        **kwargs):
+    if update_fields is not None and not set(update_fields) \
+            & set(['username', 'first_name', 'last_name']):
+        return
+    UserSearchToken.objects.update_for_user(instance)
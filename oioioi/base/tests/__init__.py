@@ -11,10 +11,13 @@ from contextlib import contextmanager
 import threading
 import urllib
 import subprocess
+import json
+from cStringIO import StringIO
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.core import mail
+from django.core.management import call_command
 from django.core.files.uploadedfile import TemporaryUploadedFile, \
         SimpleUploadedFile
 from django.utils import unittest
@@ -32,6 +35,10 @@ from oioioi.base.permissions import is_superuser, Condition, make_condition, \
     make_request_condition, RequestBasedCondition, enforce_condition
 from oioioi.base.utils import RegisteredSubclassesBase, archive
 from oioioi.base.utils.execute import execute, ExecuteError
+from oioioi.base.utils.loading import subclasses_manifest_entry, \
+        timed_imports
+from oioioi.base.utils.user_selection import search_users
+from oioioi.base.models import UserSearchToken
 from oioioi.base.fields import DottedNameField, EnumRegistry, EnumField
 from oioioi.base.menu import menu_registry, OrderedRegistry, \
     side_pane_menus_registry, MenuRegistry
@@ -498,6 +505,76 @@ class TestFields(unittest.TestCase):
             field.validate('FOO', None)
 
 
+class TestSubclassesManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_manifest(self):
+        path = os.path.join(self.tmpdir, 'manifest.json')
+        call_command('subclasses_manifest', output=path, stdout=StringIO())
+        with open(path) as f:
+            manifest = json.load(f)
+        entry = manifest['superclasses'][
+                'oioioi.base.tests.TestDottedFieldClass']
+        self.assertEqual(entry['modules'],
+                ['oioioi.base.tests.test_dotted_field_classes'])
+        self.assertEqual(entry['subclasses'],
+                [['oioioi.base.tests.TestDottedFieldSubclass',
+                    'Description']])
+        self.assertIn('oioioi.contests.controllers.ContestController',
+                manifest['superclasses'])
+
+        entry['subclasses'][0][1] = 'From the manifest'
+        path = os.path.join(self.tmpdir, 'changed_manifest.json')
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
+        with override_settings(SUBCLASSES_MANIFEST=path):
+            field = DottedNameField('oioioi.base.tests.TestDottedFieldClass')
+            self.assertEqual([(name, unicode(description))
+                    for name, description in field.choices],
+                [('oioioi.base.tests.TestDottedFieldSubclass',
+                    u'From the manifest')])
+
+        # The module has been added since the manifest was made.
+        module = 'oioioi.base.tests.test_dotted_field_classes'
+        self.assertIsNotNone(manifest['fingerprint'][module])
+        manifest['fingerprint'][module] = None
+        path = os.path.join(self.tmpdir, 'new_module_manifest.json')
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
+        with override_settings(SUBCLASSES_MANIFEST=path):
+            self.assertIsNone(subclasses_manifest_entry(
+                'oioioi.base.tests.TestDottedFieldClass'))
+
+        manifest['installed_apps'].append('oioioi.nonexistent')
+        path = os.path.join(self.tmpdir, 'outdated_manifest.json')
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
+        with override_settings(SUBCLASSES_MANIFEST=path):
+            self.assertIsNone(subclasses_manifest_entry(
+                'oioioi.base.tests.TestDottedFieldClass'))
+
+    def test_timed_imports(self):
+        with timed_imports() as timings:
+            try:
+                import oioioi.base.tests.nonexistent_module
+            except ImportError:
+                pass
+        self.assertIn('oioioi.base.tests.nonexistent_module (failed)',
+                timings)
+
+    def test_profile_startup(self):
+        path = os.path.join(self.tmpdir, 'profile.json')
+        call_command('profile_startup', output=path, stdout=StringIO())
+        with open(path) as f:
+            results = json.load(f)
+        self.assertEqual([phase['name'] for phase in results['phases']],
+                ['apps', 'models', 'validation', 'subclasses'])
+
+
 class TestExecute(unittest.TestCase):
     def test_echo(self):
         self.assertEqual("foo\n", execute("echo foo"))
@@ -766,3 +843,62 @@ class TestCondition(TestCase):
         request = self.factory()
         res = example_view(request)
         self.assertTrue(isinstance(res, HttpResponseRedirect))
+
+
+class TestUserSearch(TestCase):
+    fixtures = ['test_users']
+
+    def test_search_users(self):
+        user = User.objects.get(username='test_user')
+        user.first_name = u'\u0141ukasz'
+        user.last_name = u'Kowalski-Nowak'
+        user.save()
+        self.assertEqual(set(UserSearchToken.objects.filter(user=user)
+                .values_list('token', flat=True)),
+                set([u'test_user', u'lukasz', u'kowalski-nowak']))
+
+        self.assertEqual(search_users(u'\u0142uk'),
+                [(u'test_user', u'\u0141ukasz', u'Kowalski-Nowak')])
+        self.assertEqual(search_users('LUKASZ kow'),
+                [(u'test_user', u'\u0141ukasz', u'Kowalski-Nowak')])
+        self.assertEqual(search_users('lukasz test_a'), [])
+        self.assertEqual(search_users('   '), [])
+        self.assertEqual(search_users('test', User.objects
+                .filter(username='test_user')), [(u'test_user', u'\u0141ukasz',
+                    u'Kowalski-Nowak')])
+
+        # Exact matches go first.
+        names = [u[0] for u in search_users('test')]
+        self.assertEqual(names[-1], 'test_user')
+        self.assertEqual(len(search_users('test', limit=1)), 1)
+
+    def test_search_users_relevance(self):
+        User.objects.bulk_create([User(username='ann%02d' % i,
+                first_name='Annabel', last_name='Smith') for i in xrange(60)]
+            + [User(username='zed', first_name='Ann', last_name='Smith'),
+               User(username='zoe', first_name='Ann', last_name='Smithson')])
+        UserSearchToken.objects.create_for_users(User.objects
+                .filter(last_name__startswith='Smith'))
+
+        # Users matched exactly are found beyond the candidates matched by
+        # prefixes only.
+        names = [user[0] for user in search_users('ann', limit=3)]
+        self.assertEqual(names, ['zed', 'zoe', 'ann00'])
+        names = [user[0] for user in search_users('ann smith', limit=3)]
+        self.assertEqual(names, ['zed', 'ann00', 'ann01'])
+        self.assertEqual(len(search_users('ann', limit=10)), 10)
+        self.assertEqual(search_users('smiths'),
+                [(u'zoe', u'Ann', u'Smithson')])
+
+    def test_bulk_created_users(self):
+        User.objects.bulk_create([
+            User(username='bulk1', first_name='Jan', last_name='Bulk'),
+            User(username='bulk2', first_name='Anna', last_name='Bulk')])
+        self.assertEqual(search_users('bulk'), [])
+
+        with self.assertNumQueries(2):
+            UserSearchToken.objects.create_for_users(
+                    list(User.objects.filter(username__startswith='bulk')))
+        self.assertEqual(search_users('bulk jan'),
+                [(u'bulk1', u'Jan', u'Bulk')])
+        self.assertEqual(len(search_users('bulk')), 2)
@@ -0,0 +1,16 @@
+from django.core.cache import cache
+from nose.plugins import Plugin
+
+
+class ClearCache(Plugin):
+    """Clears the cache before every test, as it is not rolled back together
+       with the database.
+    """
+    enabled = True
+
+    def options(self, parser, env):
+        # Always enabled.
+        pass
+
+    def beforeTest(self, test):
+        cache.clear()
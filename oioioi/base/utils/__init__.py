@@ -117,9 +117,23 @@ class RegisteredSubclassesBase(ClassInitBase):
 
     @classmethod
     def load_subclasses(cls):
+        """Imports the ``modules_with_subclasses`` of all installed apps.
+
+           If there is a manifest of subclasses (see
+           :mod:`oioioi.base.utils.loading`), only the modules listed there
+           are imported.
+        """
         if cls._subclasses_loaded:
             return
         from django.conf import settings
+        from oioioi.base.utils.loading import subclasses_manifest_entry
+        entry = subclasses_manifest_entry('%s.%s' % (cls.__module__,
+            cls.__name__))
+        if entry is not None:
+            for module in entry['modules']:
+                import_module(module)
+            cls._subclasses_loaded = True
+            return
         modules_to_load = getattr(cls, 'modules_with_subclasses', [])
         if isinstance(modules_to_load, basestring):
             modules_to_load = [modules_to_load]
@@ -333,17 +347,43 @@ def reset_memoized(memoized_fn):
 
 
 def request_cached(fn):
-    """Adds per-request caching for functions which operate on sole request."""
+    """Adds per-request caching for functions which operate on a request.
+
+       Other arguments, if any, must be positional and hashable, like in
+       :func:`memoized`.
+    """
     @functools.wraps(fn)
-    def cacher(request):
+    def cacher(request, *args):
         if not hasattr(request, '_cache'):
             setattr(request, '_cache', {})
-        if fn not in request._cache:
-            request._cache[fn] = fn(request)
-        return request._cache[fn]
+        key = (fn,) + args
+        if key not in request._cache:
+            request._cache[key] = fn(request, *args)
+        return request._cache[key]
     return cacher
 
 
+# Caching
+
+
+def is_cache_shared():
+    """Tells whether the default cache is shared by all the web server and
+       celery processes, so that invalidating a cached value in one of them
+       reaches the others.
+
+       This is ``settings.CACHE_IS_SHARED``, or if it is ``None``, it is
+       guessed from the backend: local-memory and dummy caches are private
+       to a process.
+    """
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.core.cache.backends.dummy import DummyCache
+    from django.core.cache.backends.locmem import LocMemCache
+    if settings.CACHE_IS_SHARED is not None:
+        return settings.CACHE_IS_SHARED
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
 # Finding objects by name
 
 
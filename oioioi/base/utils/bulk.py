@@ -0,0 +1,31 @@
+from django.db.models import F
+
+
+def bulk_add_missing(model, field, values, defaults=None, **lookup):
+    """Creates objects of ``model`` for those of ``values`` which do not have
+       one yet.
+
+       It works like calling ``model.objects.get_or_create(defaults=defaults,
+       **dict(lookup, **{field: value}))`` for each of the ``values``, but
+       uses a constant number of queries.
+
+       :param field: name of the field which takes the ``values``; values of
+                     foreign keys should be given as primary keys
+       :param values: an iterable (e.g. a ``values_list`` queryset)
+       :returns: the set of values for which the objects were created
+    """
+    existing = set(model.objects.filter(**lookup)
+            .values_list(field, flat=True))
+    missing = set(values) - existing
+    attname = model._meta.get_field(field).attname
+    kwargs = dict(defaults or {}, **lookup)
+    model.objects.bulk_create([model(**dict(kwargs, **{attname: value}))
+            for value in missing])
+    return missing
+
+
+def bulk_increment(queryset, field, amount):
+    """Adds ``amount`` to ``field`` in all objects from ``queryset``
+       with a single ``UPDATE`` and returns the number of updated rows.
+    """
+    return queryset.update(**{field: F(field) + amount})
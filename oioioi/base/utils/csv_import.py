@@ -0,0 +1,213 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.translation import ugettext as _
+from optparse import make_option
+import csv
+import itertools
+import os
+import urllib2
+
+
+class CSVImportCommand(BaseCommand):
+    """A base class for management commands importing data from CSV files.
+
+       The file is streamed and processed in chunks of ``--chunk-size`` rows.
+       Each chunk is validated as a whole by :meth:`validate_chunk`, which
+       should use lookup tables prepared once in :meth:`prepare` or fetched
+       once per chunk, and then saved by :meth:`save_chunk`, preferably with
+       bulk queries.
+
+       By default all chunks are saved in one transaction, so nothing is
+       changed if any row is invalid. With ``--checkpoint`` every chunk is
+       committed on its own and the number of imported rows is stored in the
+       given file. The import stops at the first invalid chunk and running
+       the command again with the same checkpoint file resumes it.
+
+       Errors may be also written to a CSV file given with
+       ``--error-report``, with the columns ``line``, ``field`` and
+       ``message``.
+    """
+
+    columns = []
+
+    option_list = BaseCommand.option_list + (
+        make_option('--chunk-size', metavar='N', dest='chunk_size',
+            type='int', default=500,
+            help=_("Number of rows validated and saved at once")),
+        make_option('--checkpoint', metavar='FILE', dest='checkpoint',
+            default=None,
+            help=_("Commit every chunk and store the number of imported "
+                "rows in FILE, resuming from it if it exists")),
+        make_option('--error-report', metavar='FILE', dest='error_report',
+            default=None,
+            help=_("Write the errors to FILE in the CSV format")),
+    )
+
+    requires_model_validation = True
+
+    def open_stream(self, arg):
+        if arg.startswith('http://') or arg.startswith('https://'):
+            self.stdout.write(_("Fetching %s...\n") % (arg,))
+            return urllib2.urlopen(arg)
+        if not os.path.exists(arg):
+            raise CommandError(_("File not found: ") + arg)
+        return open(arg, 'r')
+
+    def prepare(self, *args):
+        """Parses the command arguments and prepares the lookup tables.
+
+           Returns the name or URL of the file to import.
+        """
+        raise NotImplementedError
+
+    def validate_chunk(self, rows):
+        """Validates a chunk of rows.
+
+           :param rows: a list of pairs ``(line_number, row)``, where ``row``
+                        maps column names to unicode values
+           :returns: a pair ``(data, errors)``, where ``data`` is passed to
+                     :meth:`save_chunk` and ``errors`` is a list of triples
+                     ``(line_number, field, message)``, ``field`` being
+                     ``None`` for errors not related to a single field
+        """
+        raise NotImplementedError
+
+    def save_chunk(self, data):
+        """Saves a validated chunk and returns the number of created
+           objects.
+        """
+        raise NotImplementedError
+
+    def validation_errors(self, line, e):
+        """Converts a :exc:`~django.core.exceptions.ValidationError` to
+           a list of error triples.
+        """
+        errors = []
+        for field, messages in e.message_dict.iteritems():
+            if field == '__all__':
+                field = None
+            errors.extend((line, field, message) for message in messages)
+        return errors
+
+    def _read_checkpoint(self, filename):
+        if filename and os.path.exists(filename):
+            with open(filename) as f:
+                return int(f.read().strip() or 0)
+        return 0
+
+    def _write_checkpoint(self, filename, count):
+        with open(filename + '.tmp', 'w') as f:
+            f.write('%d\n' % (count,))
+        os.rename(filename + '.tmp', filename)
+
+    def _report_errors(self, errors, report):
+        for line, field, message in errors:
+            if field is None:
+                self.stdout.write(_("Error in line %(line)d: %(message)s\n")
+                        % {'line': line, 'message': message})
+            else:
+                self.stdout.write(_("Error in line %(line)d, field "
+                    "%(field)s: %(message)s\n")
+                        % {'line': line, 'field': field, 'message': message})
+            if report:
+                report.writerow([line, field or '',
+                    unicode(message).encode('utf8')])
+
+    def _chunks(self, reader, chunk_size, skip):
+        # Line 1 is the header.
+        rows = itertools.islice(enumerate(reader, 2), skip, None)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def _decode_chunk(self, chunk):
+        rows = []
+        errors = []
+        for line, row in chunk:
+            if len(row) != len(self.columns):
+                errors.append((line, None, _("Expected %(expected)d "
+                    "columns, got %(got)d") % {'expected': len(self.columns),
+                        'got': len(row)}))
+                continue
+            rows.append((line, dict(zip(self.columns,
+                [value.decode('utf8') for value in row]))))
+        return rows, errors
+
+    def _import_chunk(self, chunk, save=True):
+        rows, errors = self._decode_chunk(chunk)
+        data, validation_errors = self.validate_chunk(rows)
+        errors.extend(validation_errors)
+        if errors or not save:
+            return 0, errors
+        return self.save_chunk(data), []
+
+    def handle(self, *args, **options):
+        arg = self.prepare(*args)
+        reader = csv.reader(self.open_stream(arg))
+        header = reader.next()
+        if header != self.columns:
+            raise CommandError(_("Missing header or invalid columns: "
+                "%(header)s\nExpected: %(expected)s") % {
+                    'header': ', '.join(header),
+                    'expected': ', '.join(self.columns)})
+
+        checkpoint = options['checkpoint']
+        done = self._read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(_("Resuming after %d entries\n") % (done,))
+
+        report_file = None
+        report = None
+        if options['error_report']:
+            report_file = open(options['error_report'], 'w')
+            report = csv.writer(report_file)
+            report.writerow(['line', 'field', 'message'])
+
+        try:
+            all_count, created_count = self._import(reader, done, report,
+                    **options)
+        finally:
+            if report_file:
+                report_file.close()
+
+        self.stdout.write(_("Processed %(all_count)d entries (%(new_count)d "
+            "new)\n") % {'all_count': all_count, 'new_count': created_count})
+
+    def _import(self, reader, done, report, checkpoint=None, chunk_size=500,
+            **kwargs):
+        all_count = 0
+        created_count = 0
+        chunks = self._chunks(reader, chunk_size, done)
+
+        if checkpoint:
+            for chunk in chunks:
+                with transaction.commit_on_success():
+                    created, errors = self._import_chunk(chunk)
+                if errors:
+                    self._report_errors(errors, report)
+                    raise CommandError(_("There were some errors. Imported "
+                        "%(count)d entries, fix the file and run the "
+                        "command again to resume.\n")
+                            % {'count': done + all_count})
+                all_count += len(chunk)
+                created_count += created
+                self._write_checkpoint(checkpoint, done + all_count)
+            return all_count, created_count
+
+        with transaction.commit_on_success():
+            failed = False
+            for chunk in chunks:
+                # After the first error the remaining rows are only
+                # validated, to report all the errors at once.
+                created, errors = self._import_chunk(chunk, save=not failed)
+                all_count += len(chunk)
+                created_count += created
+                if errors:
+                    self._report_errors(errors, report)
+                    failed = True
+            if failed:
+                raise CommandError(_("There were some errors. Database not "
+                    "changed.\n"))
+        return all_count, created_count
@@ -0,0 +1,200 @@
+"""Loading of modules with subclasses of
+   :class:`~oioioi.base.utils.RegisteredSubclassesBase` and measuring the
+   time of imports.
+
+   Finding subclasses requires trying to import the ``modules_with_subclasses``
+   of every installed app. A manifest, generated at deploy time by the
+   ``subclasses_manifest`` management command and pointed to by
+   ``settings.SUBCLASSES_MANIFEST``, lists the modules which exist and the
+   subclasses they define, so that only existing modules are imported, and
+   only when the subclasses are actually needed.
+
+   The manifest is ignored if it is out of date, i.e. it was made for
+   different ``INSTALLED_APPS`` or any of the modules it was made from has
+   been added, removed or modified since.
+"""
+
+from contextlib import contextmanager
+import __builtin__
+import imp
+import json
+import logging
+import os.path
+import sys
+import time
+
+from django.conf import settings
+from django.utils import translation
+from django.utils.encoding import force_unicode
+from django.utils.importlib import import_module
+
+from oioioi.base.utils import RegisteredSubclassesBase, memoized
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 2
+
+
+def dotted_name(cls):
+    return '%s.%s' % (cls.__module__, cls.__name__)
+
+
+def _module_mtime(module):
+    """Returns the modification time of the file (or the directory, for
+       a package) of the module with the given dotted name, or ``None`` if
+       there is no such module. The module itself is not imported.
+    """
+    package, _dot, name = module.rpartition('.')
+    try:
+        path = import_module(package).__path__
+        f, filename, _description = imp.find_module(name, path)
+    except (ImportError, AttributeError):
+        return None
+    if f is not None:
+        f.close()
+    return os.path.getmtime(filename)
+
+
+def _fingerprint(modules):
+    """Returns a dictionary mapping the given module names to their
+       modification times, for telling whether a manifest is out of date.
+    """
+    return dict((module, _module_mtime(module)) for module in modules)
+
+
+@memoized
+def _load_manifest(path, mtime):
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION or \
+            manifest.get('installed_apps') != list(settings.INSTALLED_APPS) \
+            or manifest['fingerprint'] != \
+                _fingerprint(manifest['fingerprint']):
+        logger.warning("Subclasses manifest %s is out of date, ignoring it",
+                path)
+        return None
+    return manifest['superclasses']
+
+
+def subclasses_manifest_entry(superclass_name):
+    """Returns the manifest entry of the class with the given dotted name,
+       which is a dictionary with the list of ``modules`` to import and the
+       ``subclasses``, as pairs ``(dotted name, description)``, or ``None``
+       if there is no up-to-date manifest or the class is not in it.
+    """
+    path = getattr(settings, 'SUBCLASSES_MANIFEST', None)
+    if not path or not os.path.exists(path):
+        return None
+    manifest = _load_manifest(path, os.path.getmtime(path))
+    if manifest is None:
+        return None
+    return manifest.get(superclass_name)
+
+
+def _modules_with_subclasses(superclass):
+    names = superclass.__dict__['modules_with_subclasses']
+    if isinstance(names, basestring):
+        names = [names]
+    return ['%s.%s' % (app, name) for app in settings.INSTALLED_APPS
+            for name in names]
+
+
+def find_superclasses():
+    """Returns all the loaded subclasses of
+       :class:`~oioioi.base.utils.RegisteredSubclassesBase` which define
+       ``modules_with_subclasses``.
+
+       Models are loaded first, so that the classes used by their
+       :class:`~oioioi.base.fields.DottedNameField` fields are found.
+    """
+    from django.db.models.loading import get_models
+    from oioioi.base.fields import DottedNameField
+    for model in get_models():
+        for field in model._meta.fields:
+            if isinstance(field, DottedNameField):
+                field._get_superclass()
+
+    stack = [RegisteredSubclassesBase]
+    found = []
+    while stack:
+        cls = stack.pop()
+        if 'modules_with_subclasses' in cls.__dict__:
+            found.append(cls)
+        stack.extend(cls.__subclasses__())
+    return found
+
+
+def build_subclasses_manifest():
+    """Imports the modules with subclasses of all the classes which have
+       ``modules_with_subclasses`` and returns the manifest to be written
+       to ``settings.SUBCLASSES_MANIFEST`` in the JSON format.
+    """
+    superclasses = {}
+    candidates = set()
+    for superclass in find_superclasses():
+        modules = []
+        for module in _modules_with_subclasses(superclass):
+            candidates.add(module)
+            try:
+                import_module(module)
+                modules.append(module)
+            except ImportError:
+                continue
+        superclass._subclasses_loaded = True
+        # Descriptions are stored untranslated, to be translated when used.
+        with translation.override(None):
+            subclasses = [(dotted_name(subclass),
+                force_unicode(getattr(subclass, 'description',
+                    dotted_name(subclass))))
+                for subclass in superclass.subclasses]
+        superclasses[dotted_name(superclass)] = {
+            'modules': modules,
+            'subclasses': subclasses,
+        }
+    return {
+        'version': MANIFEST_VERSION,
+        'installed_apps': list(settings.INSTALLED_APPS),
+        'fingerprint': _fingerprint(candidates),
+        'superclasses': superclasses,
+    }
+
+
+@contextmanager
+def timed_imports():
+    """Measures the time of importing modules within the block.
+
+       Yields a dictionary, which is filled with names of imported modules
+       mapped to pairs ``(total time, own time)`` in seconds, where the own
+       time does not include importing other modules. Names of modules
+       which failed to import are suffixed with ``' (failed)'``. Modules
+       imported earlier are not measured.
+    """
+    timings = {}
+    stack = []
+    original_import = __builtin__.__import__
+
+    def timed_import(name, globals=None, locals=None, fromlist=None,
+            level=-1):
+        if name in sys.modules:
+            return original_import(name, globals, locals, fromlist, level)
+        stack.append(0.)
+        start_time = time.time()
+        failed = True
+        try:
+            module = original_import(name, globals, locals, fromlist, level)
+            failed = False
+            return module
+        finally:
+            duration = time.time() - start_time
+            own = duration - stack.pop()
+            if stack:
+                stack[-1] += duration
+            key = failed and name + ' (failed)' or name
+            total_so_far, own_so_far = timings.get(key, (0., 0.))
+            timings[key] = (total_so_far + duration, own_so_far + own)
+
+    __builtin__.__import__ = timed_import
+    try:
+        yield timings
+    finally:
+        __builtin__.__import__ = original_import
@@ -0,0 +1,82 @@
+import calendar
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import Http404
+from django.utils.timezone import utc
+
+
+def _encode_cursor(date, pk):
+    timestamp = calendar.timegm(date.utctimetuple()) * 1000000 \
+            + date.microsecond
+    return '%d_%d' % (timestamp, pk)
+
+
+def _decode_cursor(cursor):
+    try:
+        timestamp, pk = [int(x) for x in cursor.split('_')]
+        date = datetime.utcfromtimestamp(timestamp // 1000000) \
+                .replace(microsecond=timestamp % 1000000, tzinfo=utc)
+    except (ValueError, OverflowError):
+        raise Http404
+    return date, pk
+
+
+class KeysetPage(object):
+    """A page of objects returned by :func:`keyset_paginate`.
+
+       ``newer`` and ``older`` are the cursors of the adjacent pages, to be
+       passed in the ``after`` and ``before`` GET parameters respectively,
+       or ``None`` if there are no such pages.
+    """
+    def __init__(self, object_list, newer, older):
+        self.object_list = object_list
+        self.newer = newer
+        self.older = older
+
+    @property
+    def is_paginated(self):
+        return bool(self.newer or self.older)
+
+
+def keyset_paginate(request, queryset, per_page, field='date'):
+    """Returns a :class:`KeysetPage` of objects from ``queryset`` ordered
+       from the newest by ``field`` (a ``DateTimeField``) and then by
+       primary key.
+
+       Unlike pagination with ``OFFSET``, fetching a page costs the same
+       regardless of its position, provided there is an index covering
+       the filters of ``queryset`` and ``field``. The page is selected by
+       the ``before`` or ``after`` GET parameter, which is a cursor
+       pointing at the last object of the newer page or the first object
+       of the older one.
+    """
+    def _key(obj):
+        return _encode_cursor(getattr(obj, field), obj.pk)
+
+    if request.GET.get('after'):
+        date, pk = _decode_cursor(request.GET['after'])
+        objects = list(queryset
+                .filter(Q(**{field + '__gt': date})
+                        | Q(**{field: date, 'pk__gt': pk}))
+                .order_by(field, 'pk')[:per_page + 1])
+        has_newer = len(objects) > per_page
+        objects = objects[:per_page][::-1]
+        has_older = True
+    else:
+        if request.GET.get('before'):
+            date, pk = _decode_cursor(request.GET['before'])
+            queryset = queryset.filter(Q(**{field + '__lt': date})
+                    | Q(**{field: date, 'pk__lt': pk}))
+            has_newer = True
+        else:
+            has_newer = False
+        objects = list(queryset.order_by('-' + field, '-pk')[:per_page + 1])
+        has_older = len(objects) > per_page
+        objects = objects[:per_page]
+
+    if not objects:
+        return KeysetPage(objects, None, None)
+    return KeysetPage(objects,
+            has_newer and _key(objects[0]) or None,
+            has_older and _key(objects[-1]) or None)
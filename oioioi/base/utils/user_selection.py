@@ -1,4 +1,7 @@
-from django.db.models import Q
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count, Q
+import unicodedata
 
 
 def get_user_q_expression(substr, user_field_name):
@@ -27,3 +30,96 @@ def get_user_q_expression(substr, user_field_name):
                        | Q(**q_dict_last)
 
     return q_expression
+
+
+# Maximum length of a token of the user search index.
+SEARCH_TOKEN_LENGTH = 30
+
+# Number of candidates of each kind (matched exactly or by prefixes only)
+# fetched by search_users for every returned hint, among which the most
+# relevant ones are chosen.
+SEARCH_CANDIDATES_FACTOR = 5
+
+# Letters which are not decomposed by the Unicode normalization.
+_FOLDED_LETTERS = {
+    u'\u0141': u'L', u'\u0142': u'l',
+    u'\u00d8': u'O', u'\u00f8': u'o',
+    u'\u0110': u'D', u'\u0111': u'd',
+    u'\u00df': u'ss',
+}
+
+
+def normalize_name(text):
+    """Lowercases ``text`` and strips diacritics from it."""
+    text = u''.join(_FOLDED_LETTERS.get(c, c) for c in unicode(text))
+    text = unicodedata.normalize('NFKD', text)
+    return u''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def user_search_tokens(user):
+    """Returns the set of tokens under which ``user`` may be found by
+       :func:`search_users`, i.e. normalized words of their username, first
+       name and last name.
+    """
+    tokens = set()
+    for value in (user.username, user.first_name, user.last_name):
+        tokens.update(word[:SEARCH_TOKEN_LENGTH]
+                for word in normalize_name(value).split())
+    return tokens
+
+
+def search_users(substr, queryset=None, limit=None):
+    """Finds users for autocompletion hints.
+
+       Every word of ``substr`` must be a prefix of a word of the username,
+       first name or last name of a user, ignoring case and diacritics.
+       Only the indexed
+       :class:`~oioioi.base.models.UserSearchToken`\ s are searched, so the
+       time does not depend on the number of users.
+
+       :param queryset: a queryset of users to search in, all users by
+                        default
+       :param limit: the maximum number of results, ``settings.NUM_HINTS``
+                     by default
+       :returns: a list of ``(username, first_name, last_name)`` triples,
+                 with users who have the most words matched exactly first
+    """
+    if limit is None:
+        limit = getattr(settings, 'NUM_HINTS', 10)
+    words = [word[:SEARCH_TOKEN_LENGTH]
+            for word in normalize_name(substr).split()]
+    if not words:
+        return []
+
+    if queryset is None:
+        queryset = User.objects.all()
+    fields = ('username', 'first_name', 'last_name')
+    count = limit * SEARCH_CANDIDATES_FACTOR
+
+    def relevance(user):
+        username = user[0]
+        tokens = set(normalize_name(u' '.join(user)).split())
+        exact = len([word for word in words if word in tokens])
+        return (-exact, not normalize_name(username).startswith(words[0]),
+                username)
+
+    # Users with words matched exactly are fetched first, so that they are
+    # not missed among many users matched by prefixes only. The number of
+    # matched words is counted over the join filtered by the exact tokens,
+    # so it must be annotated before filtering by the prefixes.
+    exact = queryset.filter(search_tokens__token__in=words) \
+            .annotate(exact_count=Count('search_tokens', distinct=True))
+    prefix = queryset
+    for word in words:
+        exact = exact.filter(search_tokens__token__startswith=word)
+        prefix = prefix.filter(search_tokens__token__startswith=word)
+    candidates = [user[:3] for user in exact
+            .order_by('-exact_count', 'username')
+            .values_list(*(fields + ('exact_count',)))[:count]]
+    results = sorted(candidates, key=relevance)[:limit]
+    if len(results) < limit:
+        found = [user[0] for user in candidates]
+        candidates = prefix.exclude(username__in=found).distinct() \
+                .order_by('username').values_list(*fields)[:count]
+        results += sorted(candidates, key=relevance)[:limit - len(results)]
+    return results
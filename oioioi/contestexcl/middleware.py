@@ -22,7 +22,8 @@ class ExclusiveContestsMiddleware(ObjectWithMixins):
 
        #. All contests with active
           :class:`~oioioi.contestexcl.models.ExclusivenessConfig` instance are
-          acquired from the database.
+          looked up in the cached
+          :class:`~oioioi.contestexcl.models.ExclusivenessSchedule`.
        #. They are filtered with a special selector function, which by default
           checks if the user is not a contest admin. In addition,
           ``process_view`` accepts another selector function as an argument.
@@ -51,9 +52,8 @@ class ExclusiveContestsMiddleware(ObjectWithMixins):
             final_selector = lambda user, contest: \
                 _default_selector(user, contest) and selector(user, contest)
 
-        qs = ExclusivenessConfig.objects.get_active(request.timestamp) \
-            .select_related('contest')
-        qs = [ex_cf.contest for ex_cf in qs]
+        qs = ExclusivenessConfig.objects.get_schedule() \
+            .get_active_contests(request.timestamp)
         qs = [cnst for cnst in qs if final_selector(request.user, cnst)]
 
         if len(qs) > 1:
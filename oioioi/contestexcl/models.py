@@ -1,13 +1,79 @@
+from bisect import bisect_right
+
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+from oioioi.base.utils import is_cache_shared
 from oioioi.contests.models import Contest
 
 
+EXCLUSIVENESS_SCHEDULE_CACHE_KEY = 'contestexcl_schedule'
+
+
+class ExclusivenessSchedule(object):
+    """A precomputed timeline of exclusiveness windows.
+
+       The timeline is split at every start and end date of an enabled
+       :class:`ExclusivenessConfig` into segments, in which the set of
+       exclusive contests does not change. :meth:`get_active_contests` finds
+       the right segment with a bisection, so it does not touch the database.
+    """
+
+    def __init__(self, configs):
+        # A point in time t is represented by (t, 0). Windows include both
+        # their start and end dates, so a window stops being active at
+        # (end_date, 1), which sorts just after (end_date, 0).
+        windows = [((cf.start_date, 0),
+                    (cf.end_date, 1) if cf.end_date is not None else None,
+                    cf.contest)
+                   for cf in configs]
+        self.boundaries = sorted(set([start for start, _end, _c in windows]
+                + [end for _start, end, _c in windows if end is not None]))
+        self.segments = []
+        for point in self.boundaries:
+            self.segments.append([contest for start, end, contest in windows
+                    if start <= point and (end is None or point < end)])
+
+    def get_active_contests(self, timestamp):
+        """Returns the list of contests being exclusive at the given
+           moment, ordered like their configs.
+        """
+        index = bisect_right(self.boundaries, (timestamp, 0)) - 1
+        if index < 0:
+            return []
+        return self.segments[index]
+
+
 class ExclusivenessConfigManager(models.Manager):
+    def get_schedule(self):
+        """Returns an :class:`ExclusivenessSchedule` of all enabled
+           configs.
+
+           If the cache is shared by all processes (see
+           :func:`~oioioi.base.utils.is_cache_shared`), the schedule is kept
+           in it and rebuilt only after an :class:`ExclusivenessConfig` or
+           a contest changes. Otherwise it is built on every call.
+        """
+        # A change made through one process must reach the others at once,
+        # or users could leave an exclusive contest or be locked in it.
+        use_cache = is_cache_shared()
+        schedule = None
+        if use_cache:
+            schedule = cache.get(EXCLUSIVENESS_SCHEDULE_CACHE_KEY)
+        if schedule is None:
+            schedule = ExclusivenessSchedule(self.get_query_set()
+                    .filter(enabled=True).select_related('contest')
+                    .order_by('id'))
+            if use_cache:
+                cache.set(EXCLUSIVENESS_SCHEDULE_CACHE_KEY, schedule)
+        return schedule
+
     def get_active(self, timestamp):
         condition = Q(start_date__lte=timestamp, end_date__isnull=True) \
             | Q(start_date__lte=timestamp, end_date__gte=timestamp)
@@ -52,3 +118,9 @@ class ExclusivenessConfig(models.Model):
         if self.end_date is not None and self.start_date > self.end_date:
             raise ValidationError(_("The start date should"
                                     " precede the end date"))
+
+
+@receiver([post_save, post_delete], sender=ExclusivenessConfig)
+@receiver(post_save, sender=Contest)
+def _invalidate_exclusiveness_schedule(sender, **kwargs):
+    cache.delete(EXCLUSIVENESS_SCHEDULE_CACHE_KEY)
@@ -5,11 +5,66 @@ from django.test.utils import override_settings
 from django.utils.timezone import utc
 
 from oioioi.base.tests import fake_time
-from oioioi.contestexcl.models import ExclusivenessConfig
+from oioioi.contestexcl.models import ExclusivenessConfig, \
+        ExclusivenessSchedule
 from oioioi.contests.models import Contest
 from oioioi.test_settings import MIDDLEWARE_CLASSES
 
 
+class TestExclusivenessSchedule(TestCase):
+    fixtures = ['test_two_empty_contests']
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_active_contests(self):
+        c1 = Contest.objects.get(id='c1')
+        c2 = Contest.objects.get(id='c2')
+        ExclusivenessConfig(contest=c1,
+                start_date=datetime(2012, 1, 1, 10, tzinfo=utc),
+                end_date=datetime(2012, 1, 1, 14, tzinfo=utc)).save()
+        ExclusivenessConfig(contest=c2,
+                start_date=datetime(2012, 1, 1, 14, tzinfo=utc)).save()
+
+        with self.assertNumQueries(1):
+            schedule = ExclusivenessConfig.objects.get_schedule()
+        self.assertIsInstance(schedule, ExclusivenessSchedule)
+
+        for hour, expected in ((9, []), (10, [c1]), (13, [c1]),
+                               (14, [c1, c2]), (15, [c2])):
+            timestamp = datetime(2012, 1, 1, hour, tzinfo=utc)
+            with self.assertNumQueries(0):
+                active = schedule.get_active_contests(timestamp)
+            self.assertEqual(active, expected)
+            self.assertEqual(active, [ex_cf.contest for ex_cf in
+                ExclusivenessConfig.objects.get_active(timestamp)
+                    .order_by('id')])
+
+        with self.assertNumQueries(0):
+            ExclusivenessConfig.objects.get_schedule()
+
+        ex_cf = ExclusivenessConfig.objects.get(contest=c2)
+        ex_cf.enabled = False
+        ex_cf.save()
+        schedule = ExclusivenessConfig.objects.get_schedule()
+        self.assertEqual(schedule.get_active_contests(
+            datetime(2012, 1, 1, 15, tzinfo=utc)), [])
+
+        ExclusivenessConfig.objects.get(contest=c1).delete()
+        schedule = ExclusivenessConfig.objects.get_schedule()
+        self.assertEqual(schedule.get_active_contests(
+            datetime(2012, 1, 1, 13, tzinfo=utc)), [])
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_unshared_cache(self):
+        c1 = Contest.objects.get(id='c1')
+        ExclusivenessConfig(contest=c1,
+                start_date=datetime(2012, 1, 1, 10, tzinfo=utc)).save()
+        for _i in xrange(2):
+            with self.assertNumQueries(1):
+                schedule = ExclusivenessConfig.objects.get_schedule()
+            self.assertEqual(schedule.get_active_contests(
+                datetime(2012, 1, 1, 11, tzinfo=utc)), [c1])
+
+
 class ContestIdViewCheckMixin(object):
 
     def _assertContestVisible(self, contest_id):
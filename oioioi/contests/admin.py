@@ -1,11 +1,16 @@
 from functools import partial
+import json
 import urllib
 
+from django.conf import settings
+from django.conf.urls import patterns, url
 from django.contrib.admin import AllValuesFieldListFilter, SimpleListFilter
 from django.contrib.admin.util import unquote, quote
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
 from django.forms.models import modelform_factory
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, HttpResponse, Http404
 from django.shortcuts import redirect
 from django.utils.translation import ugettext_lazy as _, ungettext_lazy
 from django.utils.html import conditional_escape
@@ -13,6 +18,7 @@ from django.utils.encoding import force_unicode
 
 from oioioi.base import admin
 from oioioi.base.utils import make_html_links, make_html_link
+from oioioi.base.utils.user_selection import search_users
 from oioioi.contests.forms import ProblemInstanceForm, SimpleContestForm
 from oioioi.contests.menu import contest_admin_menu_registry, \
         contest_observer_menu_registry
@@ -232,19 +238,44 @@ class ProblemFilter(AllValuesFieldListFilter):
 
 
 class UserListFilter(SimpleListFilter):
+    """Filters submissions by their author.
+
+       Listing all submitters of a big contest in the sidebar would be slow
+       and useless, so only the currently selected user is listed and the
+       others are found with an autocomplete backed by
+       :class:`~oioioi.contests.models.ContestSubmitter`.
+    """
     title = _("user")
     parameter_name = 'user'
+    template = 'admin/contests/submission/user_list_filter.html'
+
+    def __init__(self, request, params, model, model_admin):
+        super(UserListFilter, self).__init__(request, params, model,
+                model_admin)
+        # Set by the autocomplete, which selects users by their logins.
+        self.username = params.get('user__username', '')
+
+    def has_output(self):
+        return True
 
     def lookups(self, request, model_admin):
-        # Unique users that have submitted something in this contest
-        users = list(set(Submission.objects
-                .filter(problem_instance__contest=request.contest)
-                .values_list('user__id', 'user__username')))
-        if (None, None) in users:
-            users = [x for x in users if x != (None, None)]
+        users = []
+        if self.value() and self.value() != 'None':
+            users.extend(User.objects.filter(id=self.value())
+                    .values_list('id', 'username'))
+        if Submission.objects.filter(problem_instance__contest=request.contest,
+                user__isnull=True).exists():
             users.append(('None', _("(None)")))
         return users
 
+    def choices(self, cl):
+        self.hints_url = \
+                reverse('oioioiadmin:contests_submission_user_hints')
+        self.num_hints = getattr(settings, 'NUM_HINTS', 10)
+        self.autocomplete_query_string = cl.get_query_string({},
+                [self.parameter_name, 'user__username'])
+        return super(UserListFilter, self).choices(cl)
+
     def queryset(self, request, queryset):
         if self.value():
             if self.value() != 'None':
@@ -261,9 +292,9 @@ class ProblemNameListFilter(SimpleListFilter):
 
     def lookups(self, request, model_admin):
         # Unique problem names
-        p_names = list(set(ProblemInstance.objects
-                .filter(contest=request.contest)
-                .values_list('problem__name', flat=True)))
+        p_names = ProblemInstance.objects.filter(contest=request.contest) \
+                .order_by('problem__name') \
+                .values_list('problem__name', flat=True).distinct()
         return [(x, x) for x in p_names]
 
     def queryset(self, request, queryset):
@@ -366,6 +397,25 @@ class SubmissionAdmin(admin.ModelAdmin):
         return redirect('submission', contest_id=request.contest.id,
             submission_id=unquote(object_id))
 
+    def user_hints_view(self, request):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        substr = request.REQUEST.get('substr', '')
+        if len(substr) < 2:
+            raise Http404
+        users = search_users(substr, User.objects
+                .filter(contestsubmitter__contest=request.contest))
+        users = ['%s (%s %s)' % u for u in users]
+        return HttpResponse(json.dumps(users), content_type='application/json')
+
+    def get_urls(self):
+        urls = super(SubmissionAdmin, self).get_urls()
+        extra_urls = patterns('',
+                url(r'^user_hints/$', self.user_hints_view,
+                    name='contests_submission_user_hints'),
+            )
+        return extra_urls + urls
+
 admin.site.register(Submission, SubmissionAdmin)
 
 contest_admin_menu_registry.register('submissions_admin', _("Submissions"),
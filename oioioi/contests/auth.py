@@ -1,5 +1,39 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.utils.translation import ugettext_lazy as _
-from oioioi.contests.models import ContestPermission, Contest
+from oioioi.base.utils import is_cache_shared
+from oioioi.contests.models import ContestPermission, Contest, \
+        contest_permissions_cache_key, contest_permissions_generation
+
+
+def get_contest_permissions(user_obj):
+    """Returns a snapshot of all contest permissions of the given user.
+
+       The snapshot is a frozenset of ``(contest_id, permission)`` pairs,
+       loaded with a single query and then kept on the user object and, if
+       the cache is shared by all processes (see
+       :func:`~oioioi.base.utils.is_cache_shared`), in the cache across
+       requests. It is invalidated whenever
+       a :class:`~oioioi.contests.models.ContestPermission` of the user is
+       saved or deleted.
+    """
+    generation = contest_permissions_generation()
+    cached = getattr(user_obj, '_contest_perm_cache', None)
+    if cached is None or cached[0] != generation:
+        # A revoked permission must not be kept by other processes.
+        use_cache = is_cache_shared()
+        key = contest_permissions_cache_key(user_obj.id)
+        perms = None
+        if use_cache:
+            perms = cache.get(key)
+        if perms is None:
+            perms = frozenset(ContestPermission.objects.filter(user=user_obj)
+                    .values_list('contest_id', 'permission'))
+            if use_cache:
+                cache.set(key, perms,
+                        settings.CONTEST_PERMISSIONS_CACHE_TIMEOUT)
+        cached = user_obj._contest_perm_cache = (generation, perms)
+    return cached[1]
 
 
 class ContestPermissionsAuthBackend(object):
@@ -14,5 +48,4 @@ class ContestPermissionsAuthBackend(object):
             return False
         if obj is None or not isinstance(obj, Contest):
             return False
-        return ContestPermission.objects.filter(user=user_obj, contest=obj,
-            permission=perm).exists()
+        return (obj.id, perm) in get_contest_permissions(user_obj)
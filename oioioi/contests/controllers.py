@@ -1,5 +1,4 @@
 from datetime import timedelta
-import json
 import logging
 import pprint
 
@@ -7,6 +6,7 @@ from django.db import transaction
 from django.template import RequestContext
 from django.template.loader import render_to_string
 from django.core.exceptions import PermissionDenied, ObjectDoesNotExist
+from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 from django.core.urlresolvers import reverse
 from django.conf import settings
 from django.utils import timezone
@@ -18,11 +18,12 @@ from oioioi.base.utils import RegisteredSubclassesBase, ObjectWithMixins
 from oioioi.contests.utils import is_contest_admin
 from oioioi.contests.models import Submission, Round, UserResultForRound, \
         UserResultForProblem, FailureReport, SubmissionReport, \
-        UserResultForContest, submission_kinds
+        UserResultForContest, SubmissionsCounter, submission_kinds
 from oioioi.contests.scores import ScoreValue
 from oioioi.contests.utils import visible_problem_instances, rounds_times, \
         is_contest_admin, is_contest_observer
 from oioioi import evalmgr
+from oioioi.evalmgr.utils import log_env
 
 
 logger = logging.getLogger(__name__)
@@ -132,6 +133,23 @@ class PublicContestRegistrationController(RegistrationController):
         return queryset
 
 
+def _failure_environ_entries(environ):
+    """Splits the evaluation environment into a sorted list of pairs
+       ``(key, value)`` to be shown on pages. Dictionaries of dictionaries,
+       like ``tests``, are split into one entry per item.
+    """
+    entries = []
+    for key, value in environ.iteritems():
+        if isinstance(value, dict) and value and \
+                all(isinstance(item, dict) for item in value.itervalues()):
+            entries.extend(('%s[%r]' % (key, item_key), item)
+                    for item_key, item in value.iteritems())
+        else:
+            entries.append((key, value))
+    entries.sort()
+    return entries
+
+
 class ContestController(RegisteredSubclassesBase, ObjectWithMixins):
     """Contains the contest logic and rules.
 
@@ -283,8 +301,8 @@ class ContestController(RegisteredSubclassesBase, ObjectWithMixins):
         return problem_instance.submissions_limit
 
     def is_submissions_limit_exceeded(self, request, problem_instance, kind):
-        submissions_number = Submission.objects.filter(user=request.user,
-            problem_instance__id=problem_instance.id, kind=kind).count()
+        submissions_number = SubmissionsCounter.objects.get_count(
+                request.user, problem_instance, kind)
         submissions_limit = self.get_submissions_limit(request,
             problem_instance)
         if submissions_limit and submissions_number >= submissions_limit:
@@ -329,6 +347,10 @@ class ContestController(RegisteredSubclassesBase, ObjectWithMixins):
         return {'hidden_judge': _("Visible only for admins")}
 
     def judge(self, submission, extra_args={}):
+        """Sends the submission for evaluation.
+
+           Returns the Celery ``AsyncResult`` of the evaluation.
+        """
         environ = {}
         environ['extra_args'] = extra_args
         self.fill_evaluation_environ(environ, submission)
@@ -361,9 +383,23 @@ class ContestController(RegisteredSubclassesBase, ObjectWithMixins):
 
         environ['recipe'].extend(extra_steps)
 
-        logger.debug("Judging submission #%d with environ:\n %s",
-                submission.id, pprint.pformat(environ, indent=4))
-        async_result = evalmgr.evalmgr_job.delay(environ)
+        log_env(logger, logging.DEBUG, "Judging submission #%d with environ",
+                environ, submission.id)
+        return evalmgr.evalmgr_job.apply_async((environ,),
+                **environ.get('evalmgr_extra_args', {}))
+
+    def schedule_judging(self, submission, extra_args={}):
+        """Judges the submission.
+
+           If ``settings.DEFER_JUDGING`` is set, the evaluation environment
+           is prepared by a Celery task, so that requests creating
+           submissions do not wait for it.
+        """
+        if settings.DEFER_JUDGING:
+            from oioioi.contests.tasks import judge_submission
+            judge_submission.delay(submission.id, extra_args)
+        else:
+            self.judge(submission, extra_args)
 
     def submission_judged(self, submission):
         pass
@@ -655,18 +691,32 @@ class ContestController(RegisteredSubclassesBase, ObjectWithMixins):
             failure_report = \
                     FailureReport.objects.get(submission_report=report)
             message = failure_report.message
-            environ = json.loads(failure_report.json_environ)
+            environ = failure_report.environ
             if not environ.get('recipe'):
                 next_step = '(none)'
             else:
                 next_step = repr(environ['recipe'][0])
-            del environ['recipe']
-            del environ['error_handlers']
-            environ = pprint.pformat(environ, indent=4)
+            environ.pop('recipe', None)
+            environ.pop('error_handlers', None)
+
+            # Only the entries on the requested page are formatted.
+            paginator = Paginator(_failure_environ_entries(environ),
+                    settings.FAILURE_REPORT_ENTRIES_ON_PAGE)
+            try:
+                page = paginator.page(request.GET.get('failure_page', 1))
+            except (PageNotAnInteger, EmptyPage):
+                page = paginator.page(1)
+            entries = [(key, pprint.pformat(value, indent=4))
+                    for key, value in page.object_list]
+            report_url = reverse('report', kwargs={
+                'contest_id': report.submission.problem_instance.contest_id,
+                'submission_id': report.submission_id,
+                'report_id': report.id})
             return render_to_string('contests/failure_report.html',
                     context_instance=RequestContext(request,
                         {'message': message, 'next_step': next_step,
-                            'environ': environ}))
+                            'entries': entries, 'page': page,
+                            'report_url': report_url}))
         else:
             raise NotImplementedError
 
@@ -697,6 +747,9 @@ class ContestController(RegisteredSubclassesBase, ObjectWithMixins):
         old_kind = submission.kind
         submission.kind = kind
         submission.save()
+        if submission.user_id is not None and old_kind != kind:
+            SubmissionsCounter.objects.add(submission, old_kind, -1)
+            SubmissionsCounter.objects.add(submission, kind, 1)
         if old_kind == 'SUSPECTED' and kind != 'SUSPECTED':
             self.judge(submission)
         if submission.user:
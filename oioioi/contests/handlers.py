@@ -1,12 +1,11 @@
-import json
 import logging
 import traceback
-import pprint
 from smtplib import SMTPException
 from django.core.mail import mail_admins
 from django.db import transaction
 from oioioi.contests.models import Contest, ProblemInstance, Submission, \
         SubmissionReport, FailureReport
+from oioioi.evalmgr.utils import log_env
 
 logger = logging.getLogger(__name__)
 
@@ -63,9 +62,8 @@ def create_error_report(env, exc_info, **kwargs):
            * `env['submission_id']`
     """
 
-    logger.error("System Error evaluating submission #%s:\n%s",
-            env.get('submission_id', '???'),
-            pprint.pformat(env, indent=4), exc_info=exc_info)
+    log_env(logger, logging.ERROR, "System Error evaluating submission #%s",
+            env, env.get('submission_id', '???'), exc_info=exc_info)
 
     if 'submission_id' not in env:
         return env
@@ -80,7 +78,7 @@ def create_error_report(env, exc_info, **kwargs):
     submission_report.save()
 
     failure_report = FailureReport(submission_report=submission_report)
-    failure_report.json_environ = json.dumps(env)
+    failure_report.environ = env
     failure_report.message = traceback.format_exc(exc_info)
     failure_report.save()
 
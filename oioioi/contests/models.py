@@ -1,22 +1,27 @@
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.text import get_valid_filename
 from django.utils.translation import ugettext_lazy as _
 from oioioi.base.fields import DottedNameField, EnumRegistry, EnumField
 from oioioi.base.utils import get_object_by_dotted_name
+from oioioi.base.utils.bulk import bulk_increment
 from oioioi.contests.fields import ScoreField
 from oioioi.filetracker.fields import FileField
 from oioioi.base.utils.validators import validate_whitespaces, \
         validate_db_string_id
 from oioioi.problems.models import Problem
 
+import base64
 import itertools
+import json
 import os.path
+import zlib
 
 
 def make_contest_filename(instance, filename):
@@ -227,6 +232,7 @@ class Submission(models.Model):
         verbose_name = _("submission")
         verbose_name_plural = _("submissions")
         get_latest_by = 'date'
+        index_together = (('user', 'problem_instance', 'date'),)
 
     def is_scored(self):
         return self.score is not None
@@ -241,6 +247,102 @@ class Submission(models.Model):
         return self.problem_instance.contest.controller \
                 .render_submission_score(self)
 
+
+class ContestSubmitter(models.Model):
+    """Marks that the user has made at least one submission in the contest.
+
+       It is an index of distinct submitters maintained on submission save,
+       so that listing them does not require scanning all submissions.
+    """
+    contest = models.ForeignKey(Contest)
+    user = models.ForeignKey(User)
+
+    class Meta:
+        unique_together = ('contest', 'user')
+
+
+# Signals of saved submissions are sent with their actual class, e.g.
+# ProgramSubmission, as the sender, so receivers check it themselves.
+@receiver(post_save)
+def _add_contest_submitter(sender, instance, created, **kwargs):
+    if created and issubclass(sender, Submission) \
+            and instance.user_id is not None:
+        ContestSubmitter.objects.get_or_create(user_id=instance.user_id,
+                contest_id=instance.problem_instance.contest_id)
+
+
+def latest_submissions_cache_key(contest_id, user_id):
+    return 'contests_latest_submissions_%s_%d' % (contest_id, user_id)
+
+
+@receiver([post_save, post_delete])
+def _invalidate_latest_submissions(sender, instance, created=True, **kwargs):
+    # Changes of existing submissions do not change which are the latest.
+    if created and issubclass(sender, Submission) \
+            and instance.user_id is not None:
+        try:
+            contest_id = instance.problem_instance.contest_id
+        except ProblemInstance.DoesNotExist:
+            # Deleted together with the problem instance, so there is
+            # nothing left to submit to.
+            return
+        cache.delete(latest_submissions_cache_key(contest_id,
+                instance.user_id))
+
+
+class SubmissionsCounterManager(models.Manager):
+    def add(self, submission, kind, delta):
+        """Adds ``delta`` to the number of submissions of ``kind`` made by
+           the author of ``submission`` to its problem instance.
+        """
+        lookup = dict(user_id=submission.user_id,
+                problem_instance_id=submission.problem_instance_id,
+                kind=kind)
+        # Counters are not created when decreasing, as this happens also
+        # when the problem instance or the user is being deleted.
+        if delta > 0:
+            self.get_or_create(**lookup)
+        bulk_increment(self.filter(**lookup), 'count', delta)
+
+    def get_count(self, user, problem_instance, kind):
+        counts = self.filter(user=user, problem_instance=problem_instance,
+                kind=kind).values_list('count', flat=True)
+        return counts and counts[0] or 0
+
+
+class SubmissionsCounter(models.Model):
+    """Number of submissions of the given kind made by the user to
+       the problem instance.
+
+       It is maintained on submission creation, deletion and
+       :meth:`~oioioi.contests.controllers.ContestController.change_submission_kind`,
+       so that checking the submissions limit does not count submissions.
+    """
+    objects = SubmissionsCounterManager()
+
+    user = models.ForeignKey(User)
+    problem_instance = models.ForeignKey(ProblemInstance)
+    kind = EnumField(submission_kinds)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'problem_instance', 'kind')
+
+
+@receiver(post_save)
+def _count_created_submission(sender, instance, created, raw, **kwargs):
+    if created and not raw and issubclass(sender, Submission) \
+            and instance.user_id is not None:
+        SubmissionsCounter.objects.add(instance, instance.kind, 1)
+
+
+@receiver(post_delete, sender=Submission)
+def _count_deleted_submission(sender, instance, **kwargs):
+    # Deleting a submission of a subclass deletes the Submission as well,
+    # so it is counted only here.
+    if instance.user_id is not None:
+        SubmissionsCounter.objects.add(instance, instance.kind, -1)
+
 submission_report_kinds = EnumRegistry()
 submission_report_kinds.register('FINAL', _("Final report"))
 submission_report_kinds.register('FAILURE', _("Evaluation failure report"))
@@ -282,15 +384,104 @@ class ScoreReport(models.Model):
         return unicode(self.score)
 
 
+def _truncate_strings(value, max_length):
+    if isinstance(value, basestring):
+        if len(value) > max_length:
+            return value[:max_length] + '... (%d more characters)' \
+                    % (len(value) - max_length,)
+        return value
+    if isinstance(value, dict):
+        return dict((k, _truncate_strings(v, max_length))
+                for k, v in value.iteritems())
+    if isinstance(value, (list, tuple)):
+        return [_truncate_strings(v, max_length) for v in value]
+    return value
+
+
+def compact_failure_environ(env):
+    """Returns a smaller copy of the evaluation environment ``env``, to be
+       stored in a :class:`FailureReport`.
+
+       Only the next step of the recipe is kept and the error handlers are
+       left out. Descriptors of tests collected from the problem (having
+       the ``id`` of the test) are replaced by the ids, as the rest is
+       stored with the problem. From the results of tests, the values
+       repeated from the test descriptors are left out and the values
+       shared by all the tests are stored once, under the
+       ``test_results_common`` key.
+
+       Strings longer than ``settings.FAILURE_REPORT_MAX_STRING_LENGTH`` are
+       truncated and, if the environment is still larger than
+       ``settings.FAILURE_REPORT_MAX_SIZE`` bytes in JSON, its largest
+       entries are replaced by a note.
+    """
+    env = dict(env)
+    recipe = env.get('recipe') or []
+    env['recipe'] = recipe[:1]
+    env['recipe_length'] = len(recipe)
+    env.pop('error_handlers', None)
+
+    tests = env.get('tests')
+    if isinstance(tests, dict):
+        env['tests'] = dict((name, 'id' in test and {'id': test['id']}
+                or test) for name, test in tests.iteritems())
+    else:
+        tests = {}
+
+    results = env.get('test_results')
+    if isinstance(results, dict) and results:
+        results = results.values()
+        common = dict((key, value) for key, value
+                in results[0].iteritems()
+                if len(results) > 1 and all(result.get(key, not value)
+                    == value for result in results[1:]))
+        env['test_results_common'] = common
+        env['test_results'] = dict((name, dict((key, value)
+                for key, value in result.iteritems() if key not in common
+                and tests.get(name, {}).get(key, not value) != value))
+            for name, result in env['test_results'].iteritems())
+
+    env = _truncate_strings(env, settings.FAILURE_REPORT_MAX_STRING_LENGTH)
+    sizes = dict((key, len(json.dumps(value))) for key, value
+            in env.iteritems())
+    size = sum(sizes.itervalues())
+    for key in sorted(sizes, key=sizes.get, reverse=True):
+        if size <= settings.FAILURE_REPORT_MAX_SIZE:
+            break
+        env[key] = '(left out, %d bytes)' % (sizes[key],)
+        size -= sizes[key]
+    return env
+
+
 class FailureReport(models.Model):
     """A report generated when evaluation process failed.
 
        The submission should have its status set to ``FAILED``. Such reports
        are not shown to users.
+
+       The environment of the failed evaluation is stored compacted by
+       :func:`compact_failure_environ` and compressed, see :attr:`environ`.
+       Older reports have it stored as plain JSON in ``json_environ``.
     """
     submission_report = models.ForeignKey(SubmissionReport)
     message = models.TextField()
-    json_environ = models.TextField()
+    json_environ = models.TextField(blank=True)
+    compressed_environ = models.TextField(blank=True)
+
+    def _get_environ(self):
+        if self.compressed_environ:
+            return json.loads(zlib.decompress(
+                base64.b64decode(self.compressed_environ)))
+        return json.loads(self.json_environ)
+
+    def _set_environ(self, env):
+        self.json_environ = ''
+        self.compressed_environ = base64.b64encode(zlib.compress(
+            json.dumps(compact_failure_environ(env),
+                separators=(',', ':'))))
+
+    #: The environment of the failed evaluation, as a dictionary.
+    environ = property(_get_environ, _set_environ)
 
 
 class UserResultForProblem(models.Model):
@@ -374,6 +565,26 @@ class ContestPermission(models.Model):
         return u'%s/%s: %s' % (self.contest, self.permission, self.user)
 
 
+# Bumped on every change of a ContestPermission, so that permission snapshots
+# memoized on User instances living in this process get dropped, too.
+_contest_permissions_generation = 0
+
+
+def contest_permissions_cache_key(user_id):
+    return 'contests_permissions_%d' % (user_id,)
+
+
+def contest_permissions_generation():
+    return _contest_permissions_generation
+
+
+@receiver([post_save, post_delete], sender=ContestPermission)
+def _invalidate_contest_permissions(sender, instance, **kwargs):
+    global _contest_permissions_generation
+    _contest_permissions_generation += 1
+    cache.delete(contest_permissions_cache_key(instance.user_id))
+
+
 class ContestView(models.Model):
     user = models.ForeignKey(User)
     contest = models.ForeignKey(Contest)
@@ -0,0 +1,26 @@
+import logging
+
+from celery.task import task
+
+from oioioi.contests.models import Submission
+
+logger = logging.getLogger(__name__)
+
+
+@task(max_retries=5, default_retry_delay=1)
+def judge_submission(submission_id, extra_args={}):
+    """Judges a submission created with ``settings.DEFER_JUDGING`` set.
+
+       The task may start before the transaction which created the
+       submission is committed, so it is retried if the submission is not
+       found.
+    """
+    try:
+        submission = Submission.objects \
+                .select_related('problem_instance__contest') \
+                .get(id=submission_id)
+    except Submission.DoesNotExist, e:
+        logger.info("Submission #%d not found, retrying", submission_id)
+        raise judge_submission.retry(exc=e)
+    submission.problem_instance.contest.controller.judge(submission,
+            extra_args)
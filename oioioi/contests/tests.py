@@ -1,6 +1,8 @@
 from datetime import datetime
 from functools import partial
+import json
 from django.core import mail
+from django.core.cache import cache
 
 from django.test import TestCase, RequestFactory
 from django.test.utils import override_settings
@@ -17,12 +19,14 @@ from oioioi.base.tests import check_not_accessible, fake_time
 from oioioi.contests.models import Contest, Round, ProblemInstance, \
         UserResultForContest, Submission, ContestAttachment, \
         RoundTimeExtension, ContestPermission, UserResultForProblem, \
-        ContestView
+        ContestView, SubmissionsCounter, SubmissionReport, FailureReport, \
+        compact_failure_environ, latest_submissions_cache_key
+from oioioi.contests.auth import get_contest_permissions
 from oioioi.contests.scores import IntegerScore
 from oioioi.contests.controllers import ContestController, \
         RegistrationController
 from oioioi.contests.utils import is_contest_admin, is_contest_observer, \
-        can_enter_contest
+        can_enter_contest, latest_submission_ids
 from oioioi.filetracker.tests import TestStreamingMixin
 from oioioi.problems.models import Problem, ProblemStatement, ProblemAttachment
 from oioioi.programs.controllers import ProgrammingContestController
@@ -372,6 +376,35 @@ class TestManyRounds(TestCase):
             self.assertEqual(response.content.count('<td>34</td>'), 2)
 
 
+    @override_settings(SUBMISSIONS_ON_PAGE=3)
+    def test_submissions_pagination(self):
+        contest = Contest.objects.get()
+        url = reverse('my_submissions', kwargs={'contest_id': contest.id})
+        self.client.login(username='test_user')
+        with fake_time(datetime(2015, 8, 5, tzinfo=utc)):
+            response = self.client.get(url)
+            page = response.context['page']
+            first_ids = [s.id for s in page.object_list]
+            self.assertEqual(len(first_ids), 3)
+            self.assertIsNone(page.newer)
+            self.assertIsNotNone(page.older)
+
+            response = self.client.get(url, {'before': page.older})
+            page = response.context['page']
+            self.assertEqual(response.content.count('<td>34</td>'), 1)
+            self.assertNotIn(page.object_list[0].id, first_ids)
+            self.assertIsNone(page.older)
+
+            response = self.client.get(url, {'after': page.newer})
+            self.assertEqual([s.id for s in
+                response.context['page'].object_list], first_ids)
+
+            for cursor in ['invalid', '99999999999999999999_1',
+                    '-99999999999999999999_1']:
+                response = self.client.get(url, {'before': cursor})
+                self.assertEqual(response.status_code, 404)
+
+
 class TestMultilingualStatements(TestCase, TestStreamingMixin):
     fixtures = ['test_users', 'test_contest', 'test_full_package',
             'test_extra_statements']
@@ -455,6 +488,69 @@ class TestRejudgeAndFailure(TestCase):
         self.assertNotIn('failure report', response.content)
         self.assertNotIn('EXPECTED FAILURE', response.content)
 
+    @override_settings(FAILURE_REPORT_ENTRIES_ON_PAGE=2)
+    def test_failure_report_pages(self):
+        contest = Contest.objects.get()
+        contest.controller_name = \
+                'oioioi.contests.tests.BrokenContestController'
+        contest.save()
+
+        submission = Submission.objects.get(pk=1)
+        self.client.login(username='test_admin')
+        kwargs = {'contest_id': contest.id, 'submission_id': submission.id}
+        self.client.post(reverse('rejudge_submission', kwargs=kwargs))
+
+        failure_report = FailureReport.objects.get()
+        self.assertEqual(failure_report.json_environ, '')
+        self.assertNotEqual(failure_report.compressed_environ, '')
+        environ = failure_report.environ
+        self.assertEqual(environ['submission_id'], submission.id)
+        self.assertNotIn('error_handlers', environ)
+
+        kwargs['report_id'] = failure_report.submission_report_id
+        url = reverse('report', kwargs=kwargs)
+        response = self.client.get(url)
+        self.assertIn('EXPECTED FAILURE', response.content)
+        self.assertIn('failure_page=2', response.content)
+        first_page = response.content
+        response = self.client.get(url, {'failure_page': 2})
+        self.assertIn('EXPECTED FAILURE', response.content)
+        self.assertNotEqual(first_page, response.content)
+
+    @override_settings(FAILURE_REPORT_MAX_STRING_LENGTH=10,
+            FAILURE_REPORT_MAX_SIZE=200)
+    def test_compact_failure_environ(self):
+        env = {
+            'recipe': [('a', 'x.a'), ('b', 'x.b'), ('c', 'x.c')],
+            'error_handlers': [('d', 'x.d')],
+            'tests': {
+                '1a': {'id': 1, 'name': '1a', 'kind': 'NORMAL',
+                    'in_file': '/tests/1a.in', 'exec_time_limit': 1000},
+                '1b': {'id': 2, 'name': '1b', 'kind': 'NORMAL',
+                    'in_file': '/tests/1b.in', 'exec_time_limit': 1000},
+            },
+            'test_results': {
+                '1a': {'name': '1a', 'kind': 'NORMAL', 'result_code': 'OK',
+                    'time_used': 10},
+                '1b': {'name': '1b', 'kind': 'NORMAL', 'result_code': 'WA',
+                    'time_used': 20},
+            },
+            'compiler_output': 'error: ' * 10,
+            'huge': range(100),
+        }
+        compact = compact_failure_environ(env)
+        self.assertEqual(compact['recipe'], [['a', 'x.a']])
+        self.assertEqual(compact['recipe_length'], 3)
+        self.assertNotIn('error_handlers', compact)
+        self.assertEqual(compact['tests'], {'1a': {'id': 1}, '1b': {'id': 2}})
+        self.assertEqual(compact['test_results_common'], {'kind': 'NORMAL'})
+        self.assertEqual(compact['test_results']['1b'],
+                {'result_code': 'WA', 'time_used': 20})
+        self.assertTrue(compact['compiler_output'].startswith('error: err'))
+        self.assertIn('more characters', compact['compiler_output'])
+        self.assertIn('left out', compact['huge'])
+        self.assertEqual(len(env['recipe']), 3)
+
 
 class TestContestAdmin(TestCase):
     fixtures = ['test_users']
@@ -695,6 +791,39 @@ class TestSubmission(TestCase, SubmitFileMixin):
             self.assertEqual(200, response.status_code)
             self.assertIn('Sorry, there are no problems', response.content)
 
+    def test_contest_submitter(self):
+        contest = Contest.objects.get()
+        problem_instance = ProblemInstance.objects.get()
+        response = self.submit_file(contest, problem_instance)
+        self._assertSubmitted(contest, response)
+
+        self.client.login(username='test_admin')
+        url = reverse('oioioiadmin:contests_submission_user_hints')
+        response = self.client.get(url, {'substr': 'test_u'})
+        self.assertEqual(json.loads(response.content),
+                ['test_user (Test User)'])
+
+    def test_latest_submission_ids(self):
+        contest = Contest.objects.get()
+        problem_instance = ProblemInstance.objects.get()
+        user = User.objects.get(username='test_user')
+        key = latest_submissions_cache_key(contest.id, user.id)
+
+        with override_settings(CACHE_IS_SHARED=True):
+            self.assertEqual(latest_submission_ids(contest.id, user.id, 4),
+                    [])
+            response = self.submit_file(contest, problem_instance)
+            self._assertSubmitted(contest, response)
+            submission = Submission.objects.get(user=user)
+            self.assertEqual(latest_submission_ids(contest.id, user.id, 4),
+                    [submission.id])
+        cache.delete(key)
+
+        with override_settings(CACHE_IS_SHARED=False):
+            self.assertEqual(latest_submission_ids(contest.id, user.id, 4),
+                    [submission.id])
+            self.assertIsNone(cache.get(key))
+
     def test_huge_submission(self):
         contest = Contest.objects.get()
         problem_instance = ProblemInstance.objects.get()
@@ -718,6 +847,26 @@ class TestSubmission(TestCase, SubmitFileMixin):
         self.assertEqual(200, response.status_code)
         self.assertIn('Submission limit for the problem', response.content)
 
+    @override_settings(DEFER_JUDGING=True)
+    def test_submissions_counter(self):
+        contest = Contest.objects.get()
+        problem_instance = ProblemInstance.objects.get()
+        response = self.submit_file(contest, problem_instance)
+        self._assertSubmitted(contest, response)
+        submission = Submission.objects.get(user__username='test_user')
+        self.assertTrue(SubmissionReport.objects
+                .filter(submission=submission).exists())
+
+        def count(kind):
+            return SubmissionsCounter.objects.get_count(submission.user,
+                    problem_instance, kind)
+        self.assertEqual(count('NORMAL'), 1)
+        contest.controller.change_submission_kind(submission, 'IGNORED')
+        self.assertEqual(count('NORMAL'), 0)
+        self.assertEqual(count('IGNORED'), 1)
+        submission.delete()
+        self.assertEqual(count('IGNORED'), 0)
+
     def _assertUnsupportedExtension(self, contest, problem_instance, name, ext):
         response = self.submit_file(contest, problem_instance,
                 file_name='%s.%s' % (name, ext))
@@ -892,6 +1041,46 @@ class TestPermissions(TestCase):
         self.assertTrue(test_user.has_perm('contests.contest_observer',
             self.contest))
 
+    def test_permissions_snapshot(self):
+        other_contest = Contest(id='c2', name='Other contest',
+            controller_name=self.contest.controller_name)
+        other_contest.save()
+
+        with self.assertNumQueries(1):
+            self.assertTrue(self.observer.has_perm(
+                'contests.contest_observer', self.contest))
+            self.assertFalse(self.observer.has_perm(
+                'contests.contest_observer', other_contest))
+
+        perm = ContestPermission(user=self.cadmin, contest=other_contest,
+            permission='contests.contest_admin')
+        perm.save()
+        self.assertTrue(self.cadmin.has_perm('contests.contest_admin',
+            other_contest))
+        perm.delete()
+        self.assertFalse(self.cadmin.has_perm('contests.contest_admin',
+            other_contest))
+
+    def test_permissions_cache(self):
+        # Each request (possibly in another process) has its own user object.
+        def permissions():
+            return get_contest_permissions(User.objects.get(id=self.cadmin.id))
+
+        perm = (self.contest.id, 'contests.contest_admin')
+        with self.settings(CACHE_IS_SHARED=True):
+            self.assertIn(perm, permissions())
+            with self.assertNumQueries(1):
+                self.assertIn(perm, permissions())
+            ContestPermission.objects.get(user=self.cadmin).delete()
+            self.assertNotIn(perm, permissions())
+
+        with self.settings(CACHE_IS_SHARED=False):
+            ContestPermission(user=self.cadmin, contest=self.contest,
+                permission='contests.contest_admin').save()
+            self.assertIn(perm, permissions())
+            with self.assertNumQueries(2):
+                self.assertIn(perm, permissions())
+
     def test_menu(self):
         self.client.login(username='test_contest_admin')
         response = self.client.get(reverse('default_contest_view',
@@ -1,10 +1,11 @@
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from oioioi.base.permissions import make_request_condition
 from oioioi.contests.models import Contest, Round, ProblemInstance, \
-        Submission, RoundTimeExtension
-from oioioi.base.utils import request_cached
+        Submission, RoundTimeExtension, latest_submissions_cache_key
+from oioioi.base.utils import request_cached, is_cache_shared
 from datetime import timedelta
 
 
@@ -127,6 +128,30 @@ def visible_problem_instances(request):
     return [pi for pi in queryset if controller.can_see_problem(request, pi)]
 
 
+def latest_submission_ids(contest_id, user_id, count):
+    """Returns the ids of (at most) ``count`` latest submissions of the user
+       in the contest, newest first.
+
+       The list is cached until the user submits something in the contest,
+       if the cache is shared by all processes (see
+       :func:`~oioioi.base.utils.is_cache_shared`).
+    """
+    # Otherwise a submission made through one process would not invalidate
+    # the lists cached by the others.
+    use_cache = is_cache_shared()
+    key = latest_submissions_cache_key(contest_id, user_id)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None and cached[0] >= count:
+            return cached[1][:count]
+    ids = list(Submission.objects
+            .filter(problem_instance__contest=contest_id, user=user_id)
+            .order_by('-date', '-id').values_list('id', flat=True)[:count])
+    if use_cache:
+        cache.set(key, (count, ids))
+    return ids
+
+
 @request_cached
 def visible_rounds(request):
     controller = request.contest.controller
@@ -20,6 +20,7 @@ from django.core.exceptions import SuspiciousOperation
 
 from oioioi.base.menu import menu_registry
 from oioioi.base.permissions import not_anonymous, enforce_condition
+from oioioi.base.utils.pagination import keyset_paginate
 from oioioi.contests.controllers import submission_template_context
 from oioioi.contests.forms import SubmissionForm
 from oioioi.contests.models import ProblemInstance, Submission, \
@@ -154,15 +155,17 @@ def submit_view(request, contest_id):
 def my_submissions_view(request, contest_id):
     queryset = Submission.objects \
             .filter(problem_instance__contest=request.contest) \
-            .order_by('-date') \
-            .select_related()
+            .select_related('problem_instance__contest',
+                            'problem_instance__problem')
     controller = request.contest.controller
     queryset = controller.filter_my_visible_submissions(request, queryset)
-    show_scores = bool(queryset.filter(score__isnull=False))
+    page = keyset_paginate(request, queryset,
+            getattr(settings, 'SUBMISSIONS_ON_PAGE', 100))
+    show_scores = queryset.filter(score__isnull=False).exists()
     return TemplateResponse(request, 'contests/my_submissions.html',
         {'submissions': [submission_template_context(request, s)
-         for s in queryset], 'show_scores': show_scores,
-         'submissions_on_page': getattr(settings, 'SUBMISSIONS_ON_PAGE', 100)})
+         for s in page.object_list], 'show_scores': show_scores,
+         'page': page})
 
 
 @enforce_condition(contest_exists & can_enter_contest)
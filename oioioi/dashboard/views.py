@@ -10,7 +10,8 @@ from oioioi.base.permissions import not_anonymous, enforce_condition
 from oioioi.contests.models import Submission
 from oioioi.contests.controllers import submission_template_context
 from oioioi.contests.utils import can_enter_contest, contest_exists, \
-        has_any_submittable_problem, has_any_visible_problem_instance
+        has_any_submittable_problem, has_any_visible_problem_instance, \
+        latest_submission_ids
 from oioioi.dashboard.menu import top_links_registry
 from oioioi.rankings.views import has_any_ranking_visible
 from oioioi.questions.views import messages_template_context, \
@@ -42,21 +43,41 @@ def grouper(n, iterable, fillvalue=None):
     return list(itertools.izip_longest(*args, fillvalue=fillvalue))
 
 
+def latest_visible_submissions(request, count):
+    """Returns (at most) ``count`` latest submissions of the current user
+       which are visible in "My submissions".
+
+       Only the cached latest submissions of the user are checked for
+       visibility, unless there are too few visible ones among them.
+    """
+    cc = request.contest.controller
+    queryset = Submission.objects \
+            .filter(problem_instance__contest=request.contest) \
+            .order_by('-date', '-id') \
+            .select_related('problem_instance__contest',
+                            'problem_instance__problem')
+    # Some of the latest submissions may be invisible (e.g. in a round
+    # which is not visible yet), so a few more are cached.
+    ids = latest_submission_ids(request.contest.id, request.user.id,
+            2 * count)
+    submissions = list(cc.filter_my_visible_submissions(request,
+            queryset.filter(id__in=ids))[:count])
+    if len(submissions) < count and len(ids) == 2 * count:
+        submissions = list(cc.filter_my_visible_submissions(request,
+                queryset)[:count])
+    return submissions
+
+
 @menu_registry.register_decorator(_("Dashboard"), lambda request:
         reverse('contest_dashboard', kwargs={'contest_id': request.contest.id}),
     order=20)
 @enforce_condition(not_anonymous & contest_exists & can_enter_contest)
 def contest_dashboard_view(request, contest_id):
     top_links = grouper(3, top_links_registry.template_context(request))
-    submissions = Submission.objects \
-            .filter(problem_instance__contest=request.contest) \
-            .order_by('-date').select_related()
-    cc = request.contest.controller
-    submissions = cc.filter_my_visible_submissions(request, submissions)
-    submissions = \
-            submissions[:getattr(settings, 'NUM_DASHBOARD_SUBMISSIONS', 8)]
+    submissions = latest_visible_submissions(request,
+            getattr(settings, 'NUM_DASHBOARD_SUBMISSIONS', 8))
+    show_scores = any(s.score is not None for s in submissions)
     submissions = [submission_template_context(request, s) for s in submissions]
-    show_scores = bool(s for s in submissions if s.score is not None)
     messages = messages_template_context(request, visible_messages(request))
     messages = messages[:getattr(settings, 'NUM_DASHBOARD_MESSAGES', 8)]
     context = {
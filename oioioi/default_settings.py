@@ -174,6 +174,12 @@ INSTALLED_APPS = (
     'django.contrib.staticfiles',
 )
 
+# Path of the manifest written by the subclasses_manifest command, listing
+# the modules with contest controllers, problem package backends and other
+# subclasses of RegisteredSubclassesBase (None means no manifest, so that
+# the modules are looked for in all INSTALLED_APPS).
+SUBCLASSES_MANIFEST = None
+
 AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',
     'oioioi.contests.auth.ContestPermissionsAuthBackend',
@@ -190,6 +196,14 @@ NOSE_ARGS = (
 )
 
 SIOWORKERS_BACKEND = 'oioioi.sioworkers.backends.CeleryBackend'
+
+# Delays of jobs run by oioioi.sioworkers.backends.SimulatedBackend, given
+# for each kind of job ('compile' or 'exec') as a pair of the mean and the
+# standard deviation of the normal distribution, in milliseconds.
+SIMULATED_SIOWORKERS_LATENCY = {'compile': (0, 0), 'exec': (0, 0)}
+# Probabilities of results other than OK of the simulated jobs.
+SIMULATED_SIOWORKERS_FAILURES = {'CE': 0.05, 'WA': 0.1, 'TLE': 0.02,
+        'RE': 0.02}
 FILETRACKER_CLIENT_FACTORY = 'oioioi.filetracker.client.media_root_factory'
 DEFAULT_FILE_STORAGE = 'oioioi.filetracker.storage.FiletrackerStorage'
 
@@ -201,7 +215,23 @@ PAGINATION_DEFAULT_MARGIN = 1
 FILES_ON_PAGE = 100
 PROBLEMS_ON_PAGE = 100
 QUESTIONS_ON_PAGE = 30
+RANKING_ROWS_ON_PAGE = 100
+# The navbar counters of new messages are cached for this many seconds
+# (they are also invalidated when messages are added or read).
+QUESTIONS_UNREAD_CACHE_TIMEOUT = 5 * 60
+# Indexes of rankings are kept in a shared cache for this many seconds (they
+# are also invalidated when results, rounds, problems, participants or users
+# of the contest change).
+RANKINGS_CACHE_TIMEOUT = 10 * 60
 SUBMISSIONS_ON_PAGE = 100
+FAILURE_REPORT_ENTRIES_ON_PAGE = 50
+
+# Environments of failed evaluations are stored in failure reports with
+# strings truncated to FAILURE_REPORT_MAX_STRING_LENGTH characters and
+# the largest entries left out if they exceed FAILURE_REPORT_MAX_SIZE bytes
+# in JSON.
+FAILURE_REPORT_MAX_STRING_LENGTH = 1000
+FAILURE_REPORT_MAX_SIZE = 256 * 1024
 
 NUM_DASHBOARD_SUBMISSIONS = 8
 NUM_DASHBOARD_MESSAGES = 8
@@ -209,6 +239,17 @@ NUM_DASHBOARD_MESSAGES = 8
 NUM_HINTS = 10
 NUM_RECENT_CONTESTS = 5
 
+# Whether the default cache is shared by all the web server and celery
+# processes, so that invalidating cached data in one of them reaches
+# the others. Data which must not be stale, like contest permissions and
+# rankings, is cached only in a shared cache. None means guessing from the
+# backend: local-memory and dummy caches are private to a process.
+CACHE_IS_SHARED = None
+
+# Snapshots of users' contest permissions are kept in a shared cache for this
+# many seconds (they are also invalidated when the permissions change).
+CONTEST_PERMISSIONS_CACHE_TIMEOUT = 60 * 60
+
 PROBLEM_SOURCES = (
     'oioioi.problems.problem_sources.PackageSource',
 )
@@ -220,6 +261,9 @@ PROBLEM_PACKAGE_BACKENDS = (
 SAFE_EXEC_MODE = 'vcpu'
 SUBMITTABLE_EXTENSIONS = ['c', 'cpp', 'pas']
 USE_UNSAFE_EXEC = False
+# Reuse results of running the same executable on the same tests, e.g. when
+# rejudging submissions after changing only the scoring.
+CACHE_TEST_RESULTS = False
 USE_LOCAL_COMPILERS = False
 RUN_LOCAL_WORKERS = False
 
@@ -279,15 +323,50 @@ CELERY_IMPORTS += [
 
 CELERY_ROUTES.update({
     'oioioi.evalmgr.evalmgr_job': dict(queue='evalmgr'),
+    'oioioi.contests.tasks.judge_submission': dict(queue='evalmgr'),
+    'oioioi.programs.tasks.evaluate_model_solutions': dict(queue='evalmgr'),
+    'oioioi.problems.tasks.process_problem_package':
+        dict(queue='unpackmgr'),
+    'oioioi.printing.tasks.render_print_job': dict(queue='printing'),
+    'oioioi.printing.tasks.spool_print_job': dict(queue='printing-spooler'),
 })
 
 # Number of concurrently evaluated submissions
 EVALMGR_CONCURRENCY = 1
 
+# Number of concurrently processed problem packages
+UNPACKMGR_CONCURRENCY = 1
+
+# A problem package queued or processed for longer than this many seconds is
+# assumed to be lost or abandoned by a worker which has died, and may be
+# processed again.
+PROBLEM_PACKAGE_PROCESSING_TIMEOUT = 60 * 60
+
+# If set, evaluation of new submissions is prepared by a Celery task
+# instead of the request which created them, which keeps submitting fast
+# when many submissions arrive at once (e.g. at the end of a round).
+DEFER_JUDGING = False
+
+# If set, the duration and the number of database queries of every phase
+# of evaluation are stored in env['phase_timings']. The queries are counted
+# only if Django records them, e.g. with DEBUG set.
+EVALMGR_MEASURE_PHASES = False
+
+# Evaluation environments are logged at the DEBUG level of the evalmgr
+# loggers only for this fraction of evaluations (from 0 to 1), and each
+# logged environment is truncated to EVALMGR_LOG_MAX_LENGTH characters
+# (None means no limit). Nothing is rendered if DEBUG logging is disabled.
+EVALMGR_LOG_SAMPLING_RATE = 1.0
+EVALMGR_LOG_MAX_LENGTH = 20000
+
 # Split-priority evaluation
 ENABLE_SPLITEVAL = False
 SPLITEVAL_EVALMGR = False
 
+# Model solutions are evaluated this many seconds after the last change
+# of their problem, so that a burst of changes triggers one evaluation.
+MODEL_SOLUTIONS_DELAY = 60
+
 # ID of JotForm account for "Send Feedback" link.
 JOTFORM_ID = None
 
@@ -298,6 +377,18 @@ PRINTING_FONT_SIZE = 8  # in pt
 PRINTING_MAX_FILE_SIZE = 1024 * 100  # in kB
 PRINTING_MAX_FILE_PAGES = 10
 PRINTING_COMMAND = ['lp']  # as argv list
+# If set, rendered PDFs are put in this directory instead of being passed
+# to PRINTING_COMMAND.
+PRINTING_SPOOL_DIR = None
+# Number of concurrently rendered print jobs
+PRINTING_CONCURRENCY = 2
+
+# Number of bytes from the beginning and from the end of test run outputs
+# stored in reports and shown as a preview.
+TESTRUN_OUTPUT_PREVIEW_SIZE = 1024
+# Number of days after which the full outputs of test runs are deleted
+# by the expire_testrun_outputs command (None to keep them forever).
+TESTRUN_OUTPUT_LIFETIME = 30
 
 # To get unlimited submissions count set to 0.
 DEFAULT_SUBMISSIONS_LIMIT = 10
@@ -84,6 +84,8 @@ def generate_all(dir):
     os.environ.pop('DJANGO_SETTINGS_MODULE', None)
     execute([sys.executable, manage_py, 'collectstatic', '--noinput'],
             capture_output=False)
+    execute([sys.executable, manage_py, 'subclasses_manifest'],
+            capture_output=False)
 
 
 def main():
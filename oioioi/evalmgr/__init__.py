@@ -1,10 +1,13 @@
 from oioioi.base.utils import get_object_by_dotted_name
+from oioioi.evalmgr.utils import LazyEnvDiff, env_logging_enabled, log_env
 
 from celery.task import task
+from django.conf import settings
+from django.db import connection
 import copy
 import sys
 import logging
-import pprint
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -81,19 +84,37 @@ def _run_phase(env, phase, extra_kwargs={}):
     return env
 
 
+def _run_measured_phase(env, phase):
+    start_time = time.time()
+    start_queries = len(connection.queries)
+    env = _run_phase(env, phase)
+    env.setdefault('phase_timings', []).append((phase[0],
+            time.time() - start_time, len(connection.queries) - start_queries))
+    return env
+
+
+def _run_logged_phase(env, phase, run_phase):
+    old_env = copy.deepcopy(env)
+    env = run_phase(env, phase)
+    logger.debug("Phase '%s' of job %s changed:\n%s", phase[0],
+            env.get('job_id'), LazyEnvDiff(old_env, env))
+    return env
+
+
 def _run_error_handlers(env, exc_info):
-    logger.debug("Handling exception '%s' in job:\n%s",
-            exc_info[0], pprint.pformat(env, indent=4))
+    log_env(logger, logging.DEBUG, "Handling exception '%s' in job", env,
+            exc_info[0])
     error_handlers = env.get('error_handlers', [])
     try:
         for phase in error_handlers:
             env = _run_phase(env, phase, extra_kwargs=dict(exc_info=exc_info))
     except Exception:
-        logger.error("Exception occured in job's error handlers:\n%s",
-                pprint.pformat(env, indent=4), exc_info=True)
+        log_env(logger, logging.ERROR,
+                "Exception occured in job's error handlers", env,
+                exc_info=True)
     if not env.get('ignore_errors'):
-        logger.error("Exception occured in job:\n%s",
-                pprint.pformat(env, indent=4), exc_info=exc_info)
+        log_env(logger, logging.ERROR, "Exception occured in job", env,
+                exc_info=exc_info)
         raise exc_info[0], exc_info[1], exc_info[2]
     return env
 
@@ -121,6 +142,14 @@ def evalmgr_job(env):
         Before running the job, its unique identifier is generated and saved in
         ``env['job_id']``.
 
+        If ``settings.EVALMGR_MEASURE_PHASES`` is set, triples
+        (``phaseName``, duration in seconds, number of database queries)
+        are appended to ``env['phase_timings']`` after every phase.
+
+        If debug logging is enabled for this module and the evaluation is
+        sampled (see :mod:`oioioi.evalmgr.utils`), the changes made by
+        every phase to the environment are logged.
+
         If during any of the phases an exception is thrown, and
         ``env['error_handlers']`` is present (it should be in the same
         format as recipe), functions listed there are called with
@@ -139,13 +168,19 @@ def evalmgr_job(env):
             raise RuntimeError('No recipe found in job environment. '
                     'Did you forget to set environ["run_externally"]?')
 
+        run_phase = settings.EVALMGR_MEASURE_PHASES and _run_measured_phase \
+                or _run_phase
+        log_phases = env_logging_enabled(logger, env)
         while True:
             recipe = env.get('recipe')
             if not recipe:
                 break
             phase = recipe[0]
             env['recipe'] = recipe[1:]
-            env = _run_phase(env, phase)
+            if log_phases:
+                env = _run_logged_phase(env, phase, run_phase)
+            else:
+                env = run_phase(env, phase)
 
         return env
 
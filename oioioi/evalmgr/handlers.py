@@ -1,7 +1,7 @@
 from oioioi import evalmgr
+from oioioi.evalmgr.utils import log_env
 import copy
 import logging
-import pprint
 
 logger = logging.getLogger(__name__)
 
@@ -20,5 +20,5 @@ def error_handled(env, **kwargs):
 
 
 def dump_env(env, message, **kwargs):
-    logger.debug(message + ":\n%s", pprint.pformat(env, indent=4))
+    log_env(logger, logging.DEBUG, message, env)
     return env
@@ -2,10 +2,12 @@ from django.utils import unittest
 from django.test.utils import override_settings
 from django.test import SimpleTestCase
 from oioioi.evalmgr import evalmgr_job
+from oioioi.evalmgr.utils import env_diff, log_env
 from oioioi.sioworkers.jobs import run_sioworkers_job
 from oioioi.filetracker.client import get_client
 
 import copy
+import logging
 import uuid
 import os.path
 
@@ -258,3 +260,50 @@ class TestErrorBehavior(unittest.TestCase):
                 self.assertEqual(status, police_files[case]['suspect_status'])
             if mood:
                 self.assertEqual(mood, police_files[case]['suspect_mood'])
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestEnvLogging(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('oioioi.evalmgr')
+        self.handler = ListHandler()
+        self.level = self.logger.level
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.level)
+
+    def test_env_diff(self):
+        self.assertEqual(env_diff({'a': 1, 'b': 0, 'c': 3},
+                {'a': 1, 'b': 2, 'd': []}),
+                {'b': (0, 2), 'c': (3, None), 'd': (None, [])})
+
+    def test_phase_diffs(self):
+        evalmgr_job.delay(dict(recipe=hunting, area='forest')).get()
+        messages = [m for m in self.handler.messages if "Phase 'Hunt'" in m]
+        self.assertEqual(len(messages), 1)
+        self.assertIn('Hedgehog hunted.', messages[0])
+        self.assertNotIn('forest', messages[0])
+
+    @override_settings(EVALMGR_LOG_SAMPLING_RATE=0)
+    def test_sampling(self):
+        evalmgr_job.delay(dict(recipe=hunting, area='forest')).get()
+        self.assertEqual(self.handler.messages, [])
+        log_env(self.logger, logging.ERROR, "Failed", {'submission_id': 1})
+        self.assertEqual(len(self.handler.messages), 1)
+
+    @override_settings(EVALMGR_LOG_MAX_LENGTH=10)
+    def test_truncation(self):
+        log_env(self.logger, logging.DEBUG, "Env", {'key': 'x' * 100})
+        self.assertIn('more characters', self.handler.messages[0])
+        self.assertLess(len(self.handler.messages[0]), 60)
@@ -0,0 +1,102 @@
+"""Logging of evaluation environments.
+
+   Environments may be large, so they are rendered only when a log record
+   is actually emitted, truncated to ``settings.EVALMGR_LOG_MAX_LENGTH``
+   characters. Debug records are additionally limited to the fraction
+   ``settings.EVALMGR_LOG_SAMPLING_RATE`` of evaluations, chosen by the
+   submission (or job) identifier, so that all records of a sampled
+   evaluation are logged.
+"""
+
+from django.conf import settings
+import logging
+import pprint
+import zlib
+
+_MISSING = object()
+
+
+def _truncate(text):
+    max_length = settings.EVALMGR_LOG_MAX_LENGTH
+    if max_length is not None and len(text) > max_length:
+        return '%s\n... (%d more characters)' % (text[:max_length],
+                len(text) - max_length)
+    return text
+
+
+class LazyEnv(object):
+    """Renders the environment with :func:`pprint.pformat` only when
+       converted to a string.
+    """
+
+    def __init__(self, env):
+        self.env = env
+
+    def __str__(self):
+        return _truncate(pprint.pformat(self.env, indent=4))
+
+
+class LazyEnvDiff(object):
+    """Renders the top-level keys of the environment added, changed or
+       removed between two snapshots, only when converted to a string.
+    """
+
+    def __init__(self, old_env, new_env):
+        self.old_env = old_env
+        self.new_env = new_env
+
+    def __str__(self):
+        return _truncate(pprint.pformat(env_diff(self.old_env, self.new_env),
+                indent=4))
+
+
+def env_diff(old_env, new_env):
+    """Returns a dictionary mapping the keys which differ between
+       the environments to pairs ``(old value, new value)``, with
+       ``None`` in place of a missing value.
+    """
+    diff = {}
+    for key in set(old_env) | set(new_env):
+        old = old_env.get(key, _MISSING)
+        new = new_env.get(key, _MISSING)
+        if old != new:
+            diff[key] = (None if old is _MISSING else old,
+                    None if new is _MISSING else new)
+    return diff
+
+
+def is_sampled(env):
+    """Checks if the debug records of the evaluation of ``env`` should be
+       logged, according to ``settings.EVALMGR_LOG_SAMPLING_RATE``.
+    """
+    rate = settings.EVALMGR_LOG_SAMPLING_RATE
+    if rate >= 1:
+        return True
+    if rate <= 0:
+        return False
+    key = env.get('submission_id') or env.get('job_id')
+    return (zlib.crc32(str(key)) & 0xffffffff) % 10000 < rate * 10000
+
+
+def env_logging_enabled(logger, env, level=logging.DEBUG):
+    """Checks if :func:`log_env` would log anything, which allows to skip
+       preparing data only needed for logging.
+    """
+    if not logger.isEnabledFor(level):
+        return False
+    return level >= logging.WARNING or is_sampled(env)
+
+
+def log_env(logger, level, message, env, *args, **kwargs):
+    """Logs ``message`` followed by the rendered environment.
+
+       The record has the ``job_id`` and ``submission_id`` attributes set,
+       for use in log formats and filters. Records below the ``WARNING``
+       level are sampled.
+    """
+    if not env_logging_enabled(logger, env, level):
+        return
+    kwargs.setdefault('extra', {}).update(job_id=env.get('job_id'),
+            submission_id=env.get('submission_id'))
+    logger.log(level, message + ':\n%s', *(args + (LazyEnv(env),)),
+            **kwargs)
@@ -1,8 +1,9 @@
 from django.core.servers.basehttp import FileWrapper
 from django.core.files.storage import default_storage
 from django.core.files import File
-from django.http import StreamingHttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 import mimetypes
+import re
 
 
 class FileInFiletracker(File):
@@ -56,7 +57,51 @@ def filetracker_to_django_file(filetracker_path, storage=None):
             filetracker_path[prefix_len + 1:])
 
 
-def stream_file(django_file, name=None, showable=None):
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _parse_range(header, size):
+    """Parses a single byte range from the ``Range`` header.
+
+       Returns a pair ``(start, end)`` (inclusive), ``None`` if the header
+       is not supported (in which case the whole file should be sent)
+       or ``False`` if the range is not satisfiable.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        # A suffix range, i.e. the last ``end`` bytes.
+        start = max(size - int(end), 0)
+        end = size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _file_range(django_file, start, length, chunk_size=65536):
+    try:
+        django_file.seek(start)
+    except (AttributeError, IOError, ValueError):
+        # Streams from Filetracker may be not seekable.
+        while start > 0:
+            skipped = len(django_file.read(min(chunk_size, start)))
+            if not skipped:
+                return
+            start -= skipped
+    while length > 0:
+        data = django_file.read(min(chunk_size, length))
+        if not data:
+            return
+        length -= len(data)
+        yield data
+
+
+def stream_file(django_file, name=None, showable=None, request=None):
     """Returns a :class:`HttpResponse` representing a file download.
 
        Optional argument ``name`` sets default filename under which
@@ -66,14 +111,35 @@ def stream_file(django_file, name=None, showable=None):
        by default be displayed in browser. Other are forced to be downloaded.
        Using ``showable`` flag, default behaviour may be overriden in both
        directions.
+
+       If the ``request`` is given, a single byte range requested in its
+       ``Range`` header is honored.
     """
     if name is None:
         name = unicode(django_file.name.rsplit('/', 1)[-1])
     content_type = mimetypes.guess_type(name)[0] or \
         'application/octet-stream'
-    response = StreamingHttpResponse(FileWrapper(django_file),
-        content_type=content_type)
-    response['Content-Length'] = django_file.size
+    size = django_file.size
+    byte_range = None
+    if request is not None and 'HTTP_RANGE' in request.META:
+        byte_range = _parse_range(request.META['HTTP_RANGE'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */%d' % (size,)
+        return response
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _file_range(django_file, start, end - start + 1),
+            content_type=content_type, status=206)
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+        response['Content-Length'] = end - start + 1
+    else:
+        response = StreamingHttpResponse(FileWrapper(django_file),
+            content_type=content_type)
+        response['Content-Length'] = size
+    if request is not None:
+        response['Accept-Ranges'] = 'bytes'
     showable_exts = ['pdf', 'ps', 'txt']
     if showable is None:
         extension = name.rsplit('.')[-1]
@@ -1,6 +1,9 @@
 import datetime
 from django.db import models
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
@@ -49,6 +52,11 @@ class Category(models.Model):
     forum = models.ForeignKey(Forum, verbose_name=_("forum"))
     name = models.CharField(max_length=255, verbose_name=_("category"))
 
+    # Denormalized counters, maintained by update_counters()
+    threads_count = models.PositiveIntegerField(default=0, editable=False)
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
+    reported_count = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         verbose_name = _("category")
         verbose_name_plural = _("categories")
@@ -57,23 +65,31 @@ class Category(models.Model):
         return '%(name)s' % dict(name=self.name)
 
     def count_threads(self):
-        return self.thread_set.count()
+        return self.threads_count
     count_threads.short_description = _("Threads count")
 
     def count_posts(self):
-        ret = 0
-        for t in self.thread_set.all():
-            ret += t.count_posts()
-        return ret
+        return self.posts_count
     count_posts.short_description = _("Posts count")
 
     def count_reported(self):
-        ret = 0
-        for t in self.thread_set.all():
-            ret += t.count_reported()
-        return ret
+        return self.reported_count
     count_reported.short_description = _("Reported posts count")
 
+    @classmethod
+    def update_counters(cls, category_id):
+        """Recomputes the denormalized counters of the given category from
+           the counters of its threads.
+        """
+        counters = Thread.objects.filter(category=category_id) \
+                .aggregate(threads=models.Count('id'),
+                           posts=models.Sum('posts_count'),
+                           reported=models.Sum('reported_count'))
+        cls.objects.filter(id=category_id).update(
+                threads_count=counters['threads'],
+                posts_count=counters['posts'] or 0,
+                reported_count=counters['reported'] or 0)
+
     def get_admin_url(self):
         return reverse('oioioiadmin:forum_category_change', args=(self.id, ))
 
@@ -84,6 +100,10 @@ class Thread(models.Model):
     category = models.ForeignKey(Category, verbose_name=_("category"))
     name = models.CharField(max_length=255, verbose_name=_("thread"))
 
+    # Denormalized counters, maintained by update_counters()
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
+    reported_count = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         verbose_name = _("thread")
         verbose_name_plural = _("threads")
@@ -92,14 +112,21 @@ class Thread(models.Model):
         return '%(name)s' % dict(name=self.name)
 
     def count_posts(self):
-        return self.post_set.count()
+        return self.posts_count
     count_posts.short_description = _("Posts count")
 
     def count_reported(self):
-        p = self.post_set.filter(reported=True)
-        return p.count()
+        return self.reported_count
     count_reported.short_description = _("Reported posts count")
 
+    @classmethod
+    def update_counters(cls, thread_id):
+        """Recomputes the denormalized counters of the given thread."""
+        posts = Post.objects.filter(thread=thread_id)
+        cls.objects.filter(id=thread_id).update(
+                posts_count=posts.count(),
+                reported_count=posts.filter(reported=True).count())
+
     def get_admin_url(self):
         return reverse('oioioiadmin:forum_thread_change', args=(self.id, ))
 
@@ -135,3 +162,59 @@ class Post(models.Model):
     def can_be_removed(self):
         return bool((timezone.now() - self.add_date)
                     < datetime.timedelta(minutes=15))
+
+
+def forum_categories_cache_key(forum_id):
+    return 'forum_categories_%d' % (forum_id,)
+
+
+def _invalidate_forum_index(category_ids):
+    forum_ids = Category.objects.filter(id__in=category_ids) \
+            .values_list('forum_id', flat=True)
+    cache.delete_many([forum_categories_cache_key(forum_id)
+                       for forum_id in forum_ids])
+
+
+@receiver(pre_save, sender=Thread)
+@receiver(pre_save, sender=Post)
+def _remember_old_parent(sender, instance, raw, **kwargs):
+    """Remembers the category of the thread (or the thread of the post)
+       being moved, so that the counters of the old parent can be updated,
+       too.
+    """
+    parent_field = 'category_id' if sender is Thread else 'thread_id'
+    instance._old_parent_id = None
+    if not raw and instance.pk:
+        old = sender.objects.filter(pk=instance.pk) \
+                .values_list(parent_field, flat=True)
+        if old:
+            instance._old_parent_id = old[0]
+
+
+@receiver([post_save, post_delete], sender=Post)
+def _update_counters_on_post_change(sender, instance, **kwargs):
+    thread_ids = set([instance.thread_id,
+                      getattr(instance, '_old_parent_id', None)])
+    thread_ids.discard(None)
+    for thread_id in thread_ids:
+        Thread.update_counters(thread_id)
+    category_ids = set(Thread.objects.filter(id__in=thread_ids)
+            .values_list('category_id', flat=True))
+    for category_id in category_ids:
+        Category.update_counters(category_id)
+    _invalidate_forum_index(category_ids)
+
+
+@receiver([post_save, post_delete], sender=Thread)
+def _update_counters_on_thread_change(sender, instance, **kwargs):
+    category_ids = set([instance.category_id,
+                        getattr(instance, '_old_parent_id', None)])
+    category_ids.discard(None)
+    for category_id in category_ids:
+        Category.update_counters(category_id)
+    _invalidate_forum_index(category_ids)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def _invalidate_forum_index_on_category_change(sender, instance, **kwargs):
+    cache.delete(forum_categories_cache_key(instance.forum_id))
@@ -1,10 +1,13 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from oioioi.base.tests import fake_time
 from oioioi.contests.models import Contest
-from oioioi.forum.models import Category, Thread, Post
+from oioioi.forum.models import Category, Thread, Post, \
+        forum_categories_cache_key
 
 from datetime import timedelta
 
@@ -200,3 +203,62 @@ class TestThread(TestCase):
         # user tries to remove post p0 but cannot (added earlier than 15min ago)
         response = self.try_to_remove_post(p0)
         self.assertEqual(403, response.status_code)
+
+    def test_counters(self):
+        other_thr = Thread(category=self.cat, name='other_thread')
+        other_thr.save()
+        p0 = Post(thread=self.thr, content='test0', author=self.user)
+        p0.save()
+        p1 = Post(thread=self.thr, content='test1', author=self.user,
+                  reported=True)
+        p1.save()
+        Post(thread=other_thr, content='test2', author=self.user).save()
+
+        cat = Category.objects.get(id=self.cat.id)
+        thr = Thread.objects.get(id=self.thr.id)
+        self.assertEqual(cat.count_threads(), 2)
+        self.assertEqual(cat.count_posts(), 3)
+        self.assertEqual(cat.count_reported(), 1)
+        self.assertEqual(thr.count_posts(), 2)
+        self.assertEqual(thr.count_reported(), 1)
+
+        p1.reported = False
+        p1.thread = other_thr
+        p1.save()
+        p0.delete()
+        self.assertEqual(Thread.objects.get(id=self.thr.id).count_posts(), 0)
+        self.assertEqual(Thread.objects.get(id=other_thr.id).count_posts(), 2)
+        cat = Category.objects.get(id=self.cat.id)
+        self.assertEqual(cat.count_posts(), 2)
+        self.assertEqual(cat.count_reported(), 0)
+
+        other_thr.delete()
+        cat = Category.objects.get(id=self.cat.id)
+        self.assertEqual(cat.count_threads(), 1)
+        self.assertEqual(cat.count_posts(), 0)
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_forum_index(self):
+        Post(thread=self.thr, content='test0', author=self.user).save()
+        self.client.login(username='test_user')
+        url = reverse('forum', kwargs={'contest_id': self.cont.id})
+        response = self.client.get(url)
+        self.assertIn('test_category', response.content)
+        self.assertEqual([c.count_posts() for c in
+                          response.context['categories']], [1])
+        self.assertIsNotNone(cache.get(
+                forum_categories_cache_key(self.forum.id)))
+
+        Post(thread=self.thr, content='test1', author=self.user).save()
+        response = self.client.get(url)
+        self.assertEqual([c.count_posts() for c in
+                          response.context['categories']], [2])
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_forum_index_unshared_cache(self):
+        self.client.login(username='test_user')
+        url = reverse('forum', kwargs={'contest_id': self.cont.id})
+        response = self.client.get(url)
+        self.assertIn('test_category', response.content)
+        self.assertIsNone(cache.get(
+                forum_categories_cache_key(self.forum.id)))
@@ -1,8 +1,10 @@
-from django.shortcuts import get_object_or_404
+from django.core.cache import cache
+from django.http import Http404
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
-from oioioi.forum.models import Category, Post, Thread
-from oioioi.base.utils import request_cached
+from oioioi.forum.models import Category, Post, Thread, \
+        forum_categories_cache_key
+from oioioi.base.utils import request_cached, is_cache_shared
 from oioioi.base.permissions import make_condition, make_request_condition
 from oioioi.contests.utils import is_contest_admin
 
@@ -27,6 +29,46 @@ def forum_exists_and_visible(request):
              not request.contest.forum.visible)) or (is_contest_admin(request))
 
 
+@request_cached
+def resolve_forum_objects(request, category_id=None, thread_id=None,
+                          post_id=None):
+    """Fetches the category, thread and post with the given ids using
+       a single query for the deepest of them.
+
+       Returns a tuple ``(category, thread, post)`` with ``None`` in place
+       of objects which were not requested, or ``None`` if the objects do not
+       form a path in the forum of the current contest. Raises
+       :exc:`~django.http.Http404` if any of the objects does not exist.
+
+       The result is cached in the request, so that the view can reuse
+       objects already fetched by :func:`is_proper_forum`. The ids must be
+       passed as positional arguments.
+    """
+    category = thread = post = None
+    try:
+        if post_id is not None:
+            post = Post.objects.select_related('thread__category') \
+                    .get(id=post_id)
+            thread = post.thread
+            category = thread.category
+        elif thread_id is not None:
+            thread = Thread.objects.select_related('category') \
+                    .get(id=thread_id)
+            category = thread.category
+        elif category_id is not None:
+            category = Category.objects.get(id=category_id)
+    except (Post.DoesNotExist, Thread.DoesNotExist, Category.DoesNotExist):
+        raise Http404
+
+    result = (category, thread, post)
+    forum = request.contest.forum
+    if (category is not None and category.forum_id != forum.id) or \
+            (thread_id is not None and thread.id != int(thread_id)) or \
+            (category_id is not None and category.id != int(category_id)):
+        result = None
+    return result
+
+
 @make_condition()
 def is_proper_forum(request, *args, **kwargs):
     """Checks whether kwargs describe proper part of the forum,
@@ -34,20 +76,8 @@ def is_proper_forum(request, *args, **kwargs):
        Thread(thread_id) belongs to that particular category"""
     if not forum_exists(request):
         return False
-    forum = request.contest.forum
-    if 'category_id' in kwargs:
-        category = get_object_or_404(Category, id=kwargs['category_id'])
-        if not category.forum == forum:
-            return False
-    if 'thread_id' in kwargs:
-        thread = get_object_or_404(Thread, id=kwargs['thread_id'])
-        if not thread.category == category:
-            return False
-    if 'post_id' in kwargs:
-        post = get_object_or_404(Post, id=kwargs['post_id'])
-        if not post.thread == thread:
-            return False
-    return True
+    return resolve_forum_objects(request, kwargs.get('category_id'),
+            kwargs.get('thread_id'), kwargs.get('post_id')) is not None
 
 
 @make_request_condition
@@ -63,21 +93,36 @@ def get_forum_objects(request, cat_id=None, thread_id=None, post_id=None,
     ret = []
     forum = request.contest.forum
     ret.append(forum)
-    if cat_id:
-        cat = get_object_or_404(Category, id=cat_id)
-        ret.append(cat)
-    if thread_id:
-        thread = get_object_or_404(Thread, id=thread_id)
-        ret.append(thread)
-    if post_id:
-        post = get_object_or_404(Post, id=post_id)
-        ret.append(post)
+    objects = resolve_forum_objects(request, cat_id, thread_id, post_id)
+    if objects is None:
+        raise Http404
+    for obj_id, obj in zip((cat_id, thread_id, post_id), objects):
+        if obj_id:
+            ret.append(obj)
     if lock_required:
         is_locked = request.contest.forum.is_locked(request.timestamp)
         ret.append(is_locked)
     return ret
 
 
+def get_forum_categories(forum):
+    """Returns the list of categories of the forum, together with their
+       counters, as displayed on the forum index.
+
+       If the cache is shared by all processes (see
+       :func:`~oioioi.base.utils.is_cache_shared`), the list is cached and
+       invalidated whenever a category, thread or post of the forum changes.
+    """
+    if not is_cache_shared():
+        return list(forum.category_set.all())
+    key = forum_categories_cache_key(forum.id)
+    categories = cache.get(key)
+    if categories is None:
+        categories = list(forum.category_set.all())
+        cache.set(key, categories)
+    return categories
+
+
 def get_msgs(forum, request):
     now = timezone.now()
     if forum.is_locked(request.timestamp):
@@ -12,7 +12,7 @@ from oioioi.contests.utils import contest_exists, can_enter_contest, \
 from oioioi.contests.menu import contest_admin_menu_registry
 from oioioi.forum.forms import PostForm, NewThreadForm
 from oioioi.forum.utils import forum_exists_and_visible, is_proper_forum, \
-        is_not_locked, get_forum_objects, get_msgs
+        is_not_locked, get_forum_objects, get_forum_categories, get_msgs
 
 
 # registering forum
@@ -29,8 +29,8 @@ def forum_view(request, contest_id):
     (forum, lock) = get_forum_objects(request, lock_required=True)
     msgs = get_msgs(forum, request)
     return TemplateResponse(request, 'forum/forum.html', {'forum': forum,
-                                                          'msgs': msgs,
-                                                          'is_locked': lock})
+        'categories': get_forum_categories(forum), 'msgs': msgs,
+        'is_locked': lock})
 
 
 @enforce_condition(contest_exists & can_enter_contest)
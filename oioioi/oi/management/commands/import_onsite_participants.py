@@ -1,19 +1,18 @@
 from django.contrib.auth.models import User
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
 from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext as _
-from django.db import transaction, DatabaseError
+from oioioi.base.utils.csv_import import CSVImportCommand
 from oioioi.contests.models import Contest
 from oioioi.participants.models import Participant
 from oioioi.oi.models import Region, OIOnsiteRegistration
 from oioioi.oi.admin import OIOnsiteRegistrationParticipantAdmin
-import os
-import csv
-import urllib2
+from oioioi.rankings.utils import invalidate_rankings
 
 
-class Command(BaseCommand):
+class Command(CSVImportCommand):
     COLUMNS = ['number', 'username', 'region_short_name', 'local_number']
+    columns = COLUMNS
     columns_str = ', '.join(COLUMNS)
 
     args = _("<contest_id> <filename_or_url>")
@@ -24,9 +23,7 @@ class Command(BaseCommand):
              "(respectively %(columns)s) separeted by commas. Following rows "
              "should contain participants data.") % {'columns': columns_str}
 
-    requires_model_validation = True
-
-    def handle(self, *args, **options):
+    def prepare(self, *args):
         if len(args) != 2:
             raise CommandError(_("Expected two arguments"))
 
@@ -40,77 +37,86 @@ class Command(BaseCommand):
                           OIOnsiteRegistrationParticipantAdmin):
             raise CommandError(_("Wrong type of contest"))
 
-        arg = args[1]
-
-        if arg.startswith('http://') or arg.startswith('https://'):
-            self.stdout.write(_("Fetching %s...\n") % (arg,))
-            stream = urllib2.urlopen(arg)
-        else:
-            if not os.path.exists(arg):
-                raise CommandError(_("File not found: ") + arg)
-            stream = open(arg, 'r')
-
-        reader = csv.reader(stream)
-        header = reader.next()
-        if header != self.COLUMNS:
-            raise CommandError(_("Missing header or invalid columns: "
-                "%(header)s\nExpected: %(expected)s") % {
-                    'header': ', '.join(header),
-                    'expected': ', '.join(self.COLUMNS)})
-
-        with transaction.commit_on_success():
-            ok = True
-            all_count = 0
-            for row in reader:
-                all_count += 1
-
-                for i, column in enumerate(self.COLUMNS):
-                    row[i] = row[i].decode('utf8')
-
-                try:
-                    user = User.objects.get(username=row[1])
-                    region = Region.objects.get(short_name=row[2],
-                                                contest=contest)
-
-                    participant, created = Participant.objects \
-                            .get_or_create(contest=contest, user=user)
-
-                    reg = OIOnsiteRegistration(participant=participant,
-                            number=row[0], local_number=row[3], region=region)
-
-                    reg.full_clean()
-                    reg.save()
-                except User.DoesNotExist:
-                    self.stdout.write(_("Error for user=%(user)s: user does"
-                        " not exist\n") % {'user': row[1]})
-                    ok = False
-                except Region.DoesNotExist:
-                    self.stdout.write(_(
-                        "Error for user=%(user)s: region %(region)s does"
-                        " not exist\n") % {'user': row[1], 'region': row[2]})
-                    ok = False
-                except DatabaseError, e:
-                    self.stdout.write(_(
-                        "DB Error for user=%(user)s: %(message)s\n")
-                            % {'user': row[1], 'message': e.message})
-                    ok = False
-                except ValidationError, e:
-                    for k, v in e.message_dict.iteritems():
-                        for message in v:
-                            if k == '__all__':
-                                self.stdout.write(_(
-                                    "Error for user=%(user)s: %s\n")
-                                        % (row[1], message))
-                            else:
-                                self.stdout.write(
-                                        _("Error for user=%(user)s, "
-                                            "field %(field)s: %(message)s\n")
-                                        % {'user': row[1], 'field': k,
-                                            'message': message})
-                    ok = False
-
-            if ok:
-                self.stdout.write(_("Processed %d entries") % (all_count))
-            else:
-                raise CommandError(_("There were some errors. Database not "
-                    "changed.\n"))
+        self.contest = contest
+        self.regions = dict(Region.objects.filter(contest=contest)
+                .values_list('short_name', 'id'))
+        # Maps ids of users to ids of their participants.
+        self.participants = dict(Participant.objects.filter(contest=contest)
+                .values_list('user', 'id'))
+        registrations = OIOnsiteRegistration.objects \
+                .filter(participant__contest=contest)
+        self.registered = set(registrations.values_list('participant',
+                flat=True))
+        self.local_numbers = set(OIOnsiteRegistration.objects
+                .filter(region__contest=contest)
+                .values_list('region', 'local_number'))
+
+        return args[1]
+
+    def validate_chunk(self, rows):
+        users = dict(User.objects
+                .filter(username__in=set(row['username'] for _l, row in rows))
+                .values_list('username', 'id'))
+
+        registrations = []
+        errors = []
+        chunk_users = set()
+        chunk_local_numbers = set()
+        for line, row in rows:
+            user_id = users.get(row['username'])
+            if user_id is None:
+                errors.append((line, 'username', _("User %s does not exist")
+                        % (row['username'],)))
+                continue
+            region_id = self.regions.get(row['region_short_name'])
+            if region_id is None:
+                errors.append((line, 'region_short_name',
+                        _("Region %s does not exist")
+                            % (row['region_short_name'],)))
+                continue
+
+            reg = OIOnsiteRegistration(number=row['number'],
+                    region_id=region_id, local_number=row['local_number'])
+            try:
+                reg.clean_fields(exclude=['participant'])
+                reg.clean()
+            except ValidationError, e:
+                errors.extend(self.validation_errors(line, e))
+                continue
+
+            if user_id in chunk_users or \
+                    self.participants.get(user_id) in self.registered:
+                errors.append((line, 'username', reg.unique_error_message(
+                    OIOnsiteRegistration, ('participant',))))
+                continue
+            local_number = (region_id, reg.local_number)
+            if local_number in chunk_local_numbers or \
+                    local_number in self.local_numbers:
+                errors.append((line, None, reg.unique_error_message(
+                    OIOnsiteRegistration, ('region', 'local_number'))))
+                continue
+
+            chunk_users.add(user_id)
+            chunk_local_numbers.add(local_number)
+            registrations.append((user_id, reg))
+        return registrations, errors
+
+    def save_chunk(self, registrations):
+        new_users = [user_id for user_id, _reg in registrations
+                if user_id not in self.participants]
+        Participant.objects.bulk_create([Participant(contest=self.contest,
+            user_id=user_id) for user_id in new_users])
+        if new_users:
+            self.participants.update(Participant.objects
+                    .filter(contest=self.contest, user__in=new_users)
+                    .values_list('user', 'id'))
+            # bulk_create does not send the signals invalidating rankings.
+            invalidate_rankings(self.contest.id)
+
+        for user_id, reg in registrations:
+            reg.participant_id = self.participants[user_id]
+            self.registered.add(reg.participant_id)
+            self.local_numbers.add((reg.region_id, reg.local_number))
+        OIOnsiteRegistration.objects.bulk_create(
+                [reg for _user_id, reg in registrations])
+        return len(registrations)
@@ -1,17 +1,15 @@
-from django.core.management.base import BaseCommand, CommandError
 from django.core.exceptions import ValidationError
+from django.core.management.base import CommandError
 from django.utils.translation import ugettext as _
-from django.db import transaction
+from oioioi.base.utils.csv_import import CSVImportCommand
 from oioioi.oi.models import School
-import os
-import csv
-import urllib2
 
 COLUMNS = ['id', 'name', 'address', 'postal_code', 'city',
            'province', 'phone', 'email']
 
 
-class Command(BaseCommand):
+class Command(CSVImportCommand):
+    columns = COLUMNS
     columns_str = ', '.join(COLUMNS)
 
     DEFAULT_URL = 'https://docs.google.com/spreadsheet/pub?key=' + \
@@ -22,69 +20,60 @@ class Command(BaseCommand):
              "<filename or url>, with the following columns: %(columns)s.\n\n"
              "Given csv file should contain a header row with columns' names "
              "(respectively %(columns)s) separeted by commas. Following rows "
-             "should contain schools data.") % {'columns': columns_str}
+             "should contain schools data. Schools are identified by their "
+             "names and postal codes, the id column is ignored.") \
+                     % {'columns': columns_str}
 
-    requires_model_validation = True
-
-    def handle(self, *args, **options):
+    def prepare(self, *args):
         if len(args) > 1:
             raise CommandError(_("Expected no more than one argument"))
 
-        if not args:
-            arg = self.DEFAULT_URL
-        else:
-            arg = args[0]
-        if arg.startswith('http://') or arg.startswith('https://'):
-            self.stdout.write(_("Fetching %s...\n") % (arg,))
-            stream = urllib2.urlopen(arg)
-        else:
-            if not os.path.exists(arg):
-                raise CommandError(_("File not found: ") + arg)
-            stream = open(arg, 'r')
-
-        reader = csv.reader(stream)
-        header = reader.next()
-        if header != COLUMNS:
-            raise CommandError(_("Missing header or invalid columns: %(header)s\n"
-                "Expected: %(columns)s") % {'header': ', '.join(header), 'columns': ', '.join(COLUMNS)})
-
-        with transaction.commit_on_success():
-            ok = True
-            all_count = 0
-            created_count = 0
-            for row in reader:
-                all_count += 1
+        # Maps (name, postal_code) to a tuple of all the school's fields.
+        self.schools = {}
+        self._add_schools(School.objects.all())
 
-                for i, column in enumerate(COLUMNS):
-                    row[i] = row[i].decode('utf8')
-
-                school, created = School.objects.get_or_create(name=row[1],
-                    postal_code=row[3])
-
-                row[0] = school.id
+        if not args:
+            return self.DEFAULT_URL
+        return args[0]
 
-                if created:
-                    created_count += 1
-                for i, column in enumerate(COLUMNS):
-                    setattr(school, column, row[i])
-                try:
-                    school.full_clean()
-                    school.save()
-                except ValidationError, e:
-                    for k, v in e.message_dict.iteritems():
-                        for message in v:
-                            if k == '__all__':
-                                self.stdout.write(_("Error in ID=%(id)s: %(message)s\n")
-                                        % {'id': row[0], 'message': message})
-                            else:
-                                self.stdout.write(
-                                        _("Error in ID=%(id)s, field %(field)s: %(message)s\n")
-                                        % {'id': row[0], 'field': k, 'message': message})
-                    ok = False
+    def _add_schools(self, queryset):
+        for values in queryset.values_list(*COLUMNS):
+            self.schools[(values[1], values[3])] = values
 
-            if ok:
-                self.stdout.write(_("Processed %(all_count)d entries (%(new_count)d new)\n") %
-                        {'all_count': all_count, 'new_count': created_count})
+    def validate_chunk(self, rows):
+        # Later rows for the same school override the former ones.
+        new = {}
+        changed = {}
+        errors = []
+        for line, row in rows:
+            key = (row['name'], row['postal_code'])
+            existing = self.schools.get(key)
+            row['id'] = existing and existing[0]
+            school = School(**row)
+            # Otherwise the unique check of the id rejects existing schools.
+            school._state.adding = existing is None
+            try:
+                school.full_clean()
+            except ValidationError, e:
+                errors.extend(self.validation_errors(line, e))
+                continue
+            values = tuple(getattr(school, column) for column in COLUMNS)
+            if existing is None:
+                new[key] = school
+            elif values != existing:
+                changed[key] = school
             else:
-                raise CommandError(_("There were some errors. Database not "
-                    "changed\n"))
+                changed.pop(key, None)
+        return (new, changed), errors
+
+    def save_chunk(self, data):
+        new, changed = data
+        for school in changed.itervalues():
+            school.save(force_update=True)
+            self.schools[(school.name, school.postal_code)] = \
+                    tuple(getattr(school, column) for column in COLUMNS)
+        School.objects.bulk_create(new.values())
+        if new:
+            self._add_schools(School.objects.filter(
+                postal_code__in=set(key[1] for key in new)))
+        return len(new)
@@ -1,5 +1,8 @@
 from django.core.exceptions import ObjectDoesNotExist
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.utils.encoding import force_unicode
 from django.utils.timezone import utc
 from django.contrib.auth.models import User
@@ -8,13 +11,18 @@ from oioioi.base.tests import fake_time
 from oioioi.contests.handlers import update_user_results
 from oioioi.contests.models import Contest, Round, ProblemInstance
 from oioioi.contests.tests import SubmitFileMixin
+from oioioi.oi.controllers import OIOnsiteContestController
 from oioioi.participants.models import Participant
+from oioioi.participants.tests import ParticipantsRankingController
 from oioioi.oi.models import Region, OIOnsiteRegistration, School
 from oioioi.oi.management.commands import import_onsite_participants, \
         import_schools
 
 from datetime import datetime
+from StringIO import StringIO
+import csv
 import os
+import tempfile
 
 
 class TestOIAdmin(TestCase):
@@ -38,6 +46,45 @@ class TestOIAdmin(TestCase):
         manager.run_from_argv(['manage.py', 'import_schools', filename])
         self.assertEqual(School.objects.count(), 3)
 
+    def test_schools_import_twice(self):
+        filename = os.path.join(os.path.dirname(__file__), 'files',
+                                'schools.csv')
+        call_command('import_schools', filename, stdout=StringIO())
+        ids = list(School.objects.order_by('id').values_list('id', flat=True))
+        stdout = StringIO()
+        call_command('import_schools', filename, stdout=stdout)
+        self.assertIn('Processed 3 entries (0 new)', stdout.getvalue())
+        self.assertEqual(list(School.objects.order_by('id')
+                .values_list('id', flat=True)), ids)
+
+    def test_schools_import_checkpoint(self):
+        filename = os.path.join(os.path.dirname(__file__), 'files',
+                                'schools.csv')
+        checkpoint = tempfile.NamedTemporaryFile()
+        with open(checkpoint.name, 'w') as f:
+            f.write('2\n')
+        stdout = StringIO()
+        call_command('import_schools', filename, chunk_size=1,
+                checkpoint=checkpoint.name, stdout=stdout)
+        self.assertIn('Resuming after 2 entries', stdout.getvalue())
+        self.assertEqual(School.objects.get().name, 'Liceum')
+        self.assertEqual(open(checkpoint.name).read(), '3\n')
+
+    def test_schools_import_errors(self):
+        csv_file = tempfile.NamedTemporaryFile()
+        csv_file.write('id,name,address,postal_code,city,province,phone,'
+                'email\n1,Liceum,Pcim Dolny,02044,Zadupie,pomorskie,'
+                '004002004,a@a.pl\n')
+        csv_file.flush()
+        report = tempfile.NamedTemporaryFile()
+        with self.assertRaises(CommandError):
+            call_command('import_schools', csv_file.name,
+                    error_report=report.name, stdout=StringIO())
+        self.assertEqual(School.objects.count(), 0)
+        rows = list(csv.reader(open(report.name)))
+        self.assertEqual(rows[0], ['line', 'field', 'message'])
+        self.assertEqual(rows[1][:2], ['2', 'postal_code'])
+
 
 class TestOIOnsiteAdmin(TestCase):
     fixtures = ['test_users', 'test_contest']
@@ -102,6 +149,37 @@ class TestOIOnsiteAdmin(TestCase):
         self.assertEqual(force_unicode(p.registration_model), '1/waw/1')
 
 
+class OIOnsiteRankingContestController(OIOnsiteContestController):
+    def ranking_controller(self):
+        return ParticipantsRankingController(self.contest)
+
+
+class TestOIOnsiteParticipantsRanking(TestCase):
+    fixtures = ['test_users', 'test_contest', 'test_full_package',
+            'test_submission', 'test_extra_rounds', 'test_ranking_data']
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_participants_import(self):
+        contest = Contest.objects.get()
+        contest.controller_name = \
+                'oioioi.oi.tests.OIOnsiteRankingContestController'
+        contest.save()
+        Region(short_name='waw', name='Warszawa', contest=contest).save()
+        url = reverse('default_ranking', kwargs={'contest_id': contest.id})
+
+        self.client.login(username='test_admin')
+        with fake_time(datetime(2015, 8, 5, tzinfo=utc)):
+            response = self.client.get(url)
+            self.assertNotIn('<td>Test User</td>', response.content)
+
+            filename = os.path.join(os.path.dirname(__file__), 'files',
+                                    'onsite_participants.csv')
+            call_command('import_onsite_participants', str(contest.id),
+                    filename, stdout=StringIO())
+            response = self.client.get(url)
+            self.assertIn('<td>Test User</td>', response.content)
+
+
 class TestOIRegistration(TestCase):
     fixtures = ['test_users', 'test_contest']
 
@@ -18,10 +18,10 @@ from django.contrib.auth.models import User
 from django.http import Http404, HttpResponse
 
 from oioioi.base.permissions import enforce_condition
-from oioioi.base.utils.user_selection import get_user_q_expression
+from oioioi.base.utils.user_selection import search_users
 from oioioi.contests.menu import contest_admin_menu_registry
 from oioioi.filetracker.utils import stream_file
-from oioioi.contests.models import Round, UserResultForProblem, Submission
+from oioioi.contests.models import Round, UserResultForProblem
 from oioioi.contests.utils import is_contest_admin, contest_exists, \
         has_any_rounds
 from oioioi.oireports.forms import OIReportForm, CONTEST_REPORT_KEY
@@ -276,10 +276,7 @@ def get_report_users_view(request, contest_id):
     if len(request.REQUEST.get('substr', '')) < 2:
         raise Http404
 
-    q_expression = get_user_q_expression(request.REQUEST['substr'], 'user')
-    users = Submission.objects.filter(q_expression).order_by('user') \
-        .values('user').distinct().values_list('user__username',
-            'user__first_name', 'user__last_name')[:getattr(settings,
-            'NUM_HINTS', 10)]
+    users = search_users(request.REQUEST['substr'], User.objects
+            .filter(contestsubmitter__contest=request.contest))
     users = ['%s (%s %s)' % u for u in users]
     return HttpResponse(json.dumps(users), content_type='application/json')
@@ -5,7 +5,7 @@ from django.http import HttpResponse, HttpResponseServerError
 from django.template.response import TemplateResponse
 from django.views.decorators.csrf import csrf_exempt
 from oioioi.base.permissions import enforce_condition
-from oioioi.contests.models import Submission
+from oioioi.contests.models import SubmissionsCounter
 from oioioi.contests.utils import can_enter_contest, contest_exists
 from oioioi.oisubmit.forms import OISubmitSubmissionForm
 from oioioi.oisubmit.models import OISubmitExtraData
@@ -35,10 +35,8 @@ def oisubmit_view(request, contest_id):
             request.timestamp = submission_date
             pi = form.cleaned_data['problem_instance']
 
-            task_submission_no = Submission.objects \
-                .filter(user=request.user, problem_instance__id=pi.id) \
-                .filter(kind=form.cleaned_data['kind']) \
-                .count() + 1
+            task_submission_no = SubmissionsCounter.objects.get_count(
+                request.user, pi, form.cleaned_data['kind']) + 1
 
             submissions_limit = \
                 request.contest.controller.get_submissions_limit(request, pi)
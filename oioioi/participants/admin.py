@@ -5,6 +5,7 @@ from django.utils.translation import ugettext_lazy as _, ungettext_lazy
 from django.http import HttpResponseRedirect
 from django.template.response import TemplateResponse
 from oioioi.base import admin
+from oioioi.base.utils.bulk import bulk_add_missing, bulk_increment
 from oioioi.contests.admin import RoundTimeExtensionAdmin
 from oioioi.base.permissions import make_request_condition
 from oioioi.contests.menu import contest_admin_menu_registry
@@ -99,18 +100,13 @@ class ParticipantAdmin(admin.ModelAdmin):
                 round = form.cleaned_data['round']
                 extra_time = form.cleaned_data['extra_time']
 
-                users = [participant.user for participant in queryset]
-                existing_extensions = RoundTimeExtension.objects \
-                        .filter(round=round, user__in=users)
-                for extension in existing_extensions:
-                    extension.extra_time += extra_time
-                    extension.save()
-                existing_count = existing_extensions.count()
-
-                new_extensions = [RoundTimeExtension(user=user, round=round,
-                        extra_time=extra_time) for user in users
-                        if not existing_extensions.filter(user=user).exists()]
-                RoundTimeExtension.objects.bulk_create(new_extensions)
+                users = queryset.values_list('user', flat=True)
+                existing_count = bulk_increment(RoundTimeExtension.objects
+                        .filter(round=round, user__in=users),
+                        'extra_time', extra_time)
+                new_extensions = bulk_add_missing(RoundTimeExtension, 'user',
+                        users, defaults={'extra_time': extra_time},
+                        round=round)
 
                 if existing_count:
                     if existing_count > 1:
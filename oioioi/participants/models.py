@@ -1,9 +1,12 @@
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 from oioioi.base.fields import EnumRegistry, EnumField
 from oioioi.contests.models import Contest
+from oioioi.rankings.utils import invalidate_rankings
 
 participant_statuses = EnumRegistry()
 participant_statuses.register('ACTIVE', _("Active"))
@@ -32,6 +35,12 @@ class Participant(models.Model):
         return unicode(self.user)
 
 
+@receiver([post_save, post_delete], sender=Participant)
+def _invalidate_rankings_on_participant_change(sender, instance, **kwargs):
+    # Rankings of contests with registration show only participants.
+    invalidate_rankings(instance.contest_id)
+
+
 class RegistrationModel(models.Model):
     participant = models.OneToOneField(Participant,
             related_name='%(app_label)s_%(class)s')
@@ -7,12 +7,13 @@ from oioioi.base.tests import fake_time, check_not_accessible
 from oioioi.contestexcl.models import ExclusivenessConfig
 from oioioi.contestexcl.tests import ContestIdViewCheckMixin
 from oioioi.contests.models import Contest, Round, ProblemInstance, \
-    ContestPermission
+    ContestPermission, RoundTimeExtension
 from oioioi.contests.controllers import ContestController
 from oioioi.contests.tests import SubmitFileMixin
 from oioioi.participants.controllers import ParticipantsController
 from oioioi.participants.models import Participant
 from oioioi.programs.controllers import ProgrammingContestController
+from oioioi.rankings.controllers import DefaultRankingController
 from oioioi.test_settings import MIDDLEWARE_CLASSES
 
 from datetime import datetime
@@ -23,6 +24,17 @@ class ParticipantsContestController(ProgrammingContestController):
         return ParticipantsController(self.contest)
 
 
+class ParticipantsRankingController(DefaultRankingController):
+    def filter_users_for_ranking(self, request, key, queryset):
+        return request.contest.controller.registration_controller() \
+                .filter_participants(queryset)
+
+
+class ParticipantsRankingContestController(ParticipantsContestController):
+    def ranking_controller(self):
+        return ParticipantsRankingController(self.contest)
+
+
 class OpenRegistrationController(ParticipantsController):
     def anonymous_can_enter_contest(self):
         return True
@@ -215,6 +227,34 @@ class TestParticipantsRegistration(TestCase):
         self.assertEqual(Participant.objects.count(), 0)
 
 
+class TestParticipantsRanking(TestCase):
+    fixtures = ['test_users', 'test_contest', 'test_full_package',
+            'test_submission', 'test_extra_rounds', 'test_ranking_data']
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_ranking_cache_invalidation(self):
+        contest = Contest.objects.get()
+        contest.controller_name = \
+                'oioioi.participants.tests.ParticipantsRankingContestController'
+        contest.save()
+        url = reverse('default_ranking', kwargs={'contest_id': contest.id})
+
+        self.client.login(username='test_admin')
+        with fake_time(datetime(2015, 8, 5, tzinfo=utc)):
+            response = self.client.get(url)
+            self.assertNotIn('<td>Test User</td>', response.content)
+
+            p = Participant(contest=contest,
+                    user=User.objects.get(username='test_user'))
+            p.save()
+            response = self.client.get(url)
+            self.assertIn('<td>Test User</td>', response.content)
+
+            p.delete()
+            response = self.client.get(url)
+            self.assertNotIn('<td>Test User</td>', response.content)
+
+
 class NoAdminParticipantsRegistrationController(ParticipantsController):
     @property
     def participant_admin(self):
@@ -270,6 +310,30 @@ class TestParticipantsModelAdmin(TestCase):
         self.client.login(username='test_contest_admin')
         check_not_accessible(self, url)
 
+    def test_extend_round(self):
+        contest = Contest.objects.get()
+        contest.controller_name = \
+                'oioioi.participants.tests.ParticipantsContestController'
+        contest.save()
+        round = Round.objects.get()
+        user = User.objects.get(username='test_user')
+        user2 = User.objects.get(username='test_user2')
+        p = Participant.objects.create(contest=contest, user=user)
+        p2 = Participant.objects.create(contest=contest, user=user2)
+        RoundTimeExtension.objects.create(round=round, user=user,
+                extra_time=5)
+
+        url = reverse('oioioiadmin:participants_participant_changelist')
+        self.client.login(username='test_admin')
+        response = self.client.post(url, {'action': 'extend_round',
+            '_selected_action': [p.id, p2.id], 'round': round.id,
+            'extra_time': 10, 'submit': 'submit'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(RoundTimeExtension.objects
+                .get(round=round, user=user).extra_time, 15)
+        self.assertEqual(RoundTimeExtension.objects
+                .get(round=round, user=user2).extra_time, 10)
+
 
 @override_settings(MIDDLEWARE_CLASSES=MIDDLEWARE_CLASSES +
     ('oioioi.contestexcl.middleware.ExclusiveContestsMiddleware',))
@@ -0,0 +1,58 @@
+import os.path
+
+from django.db import models
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from django.utils.translation import ugettext_lazy as _
+from django.contrib.auth.models import User
+
+from oioioi.base.fields import EnumRegistry, EnumField
+from oioioi.contests.models import Contest
+from oioioi.filetracker.fields import FileField
+
+
+def make_print_job_filename(instance, filename):
+    return 'printing/%s/%s/%s' % (instance.contest_id, instance.user_id,
+            get_valid_filename(os.path.basename(filename)))
+
+
+print_job_statuses = EnumRegistry()
+print_job_statuses.register('QUEUED', _("Queued"))
+print_job_statuses.register('RENDERING', _("Rendering"))
+print_job_statuses.register('SPOOLING', _("Sent to printer"))
+print_job_statuses.register('DONE', _("Printed"))
+print_job_statuses.register('ERR', _("Error"))
+
+
+class PrintJob(models.Model):
+    """A file submitted for printing.
+
+       Print jobs are processed asynchronously by
+       :func:`oioioi.printing.tasks.render_print_job`, which renders the PDF,
+       and then :func:`oioioi.printing.tasks.spool_print_job`, which sends it
+       to the printer.
+    """
+    contest = models.ForeignKey(Contest, verbose_name=_("contest"))
+    user = models.ForeignKey(User, verbose_name=_("user"))
+    date = models.DateTimeField(default=timezone.now, editable=False,
+            verbose_name=_("date"))
+    source_file = FileField(upload_to=make_print_job_filename,
+            verbose_name=_("file"))
+    pdf_file = FileField(upload_to=make_print_job_filename, blank=True,
+            null=True, verbose_name=_("PDF file"))
+    status = EnumField(print_job_statuses, default='QUEUED',
+            verbose_name=_("status"))
+    error_message = models.TextField(blank=True,
+            verbose_name=_("error message"))
+
+    PENDING_STATUSES = ('QUEUED', 'RENDERING', 'SPOOLING')
+
+    class Meta:
+        verbose_name = _("print job")
+        verbose_name_plural = _("print jobs")
+        ordering = ('-date',)
+        index_together = (('contest', 'user', 'date'),)
+
+    def __unicode__(self):
+        return u'%s (%s)' % (os.path.basename(self.source_file.name),
+                self.user)
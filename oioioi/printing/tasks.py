@@ -0,0 +1,87 @@
+"""Asynchronous processing of print jobs.
+
+   Rendering and spooling are separate tasks, routed to the ``printing``
+   and ``printing-spooler`` queues respectively, so that a pool of workers
+   may render PDFs in parallel while the printer gets them one by one.
+"""
+
+import logging
+import os
+
+from celery.task import task
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils.translation import ugettext as _
+
+from oioioi.base.utils.execute import execute, ExecuteError
+from oioioi.printing.models import PrintJob
+from oioioi.printing.pdf import generator, PageLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+
+def _fail(job, message):
+    job.status = 'ERR'
+    job.error_message = message
+    job.save()
+
+
+@task(max_retries=5, default_retry_delay=1)
+def render_print_job(job_id):
+    """Renders the PDF of a print job and passes it to the spooler.
+
+       The page limit is checked while laying the file out, so rendering
+       stops as soon as it is exceeded.
+    """
+    try:
+        job = PrintJob.objects.select_related('user').get(id=job_id)
+    except PrintJob.DoesNotExist, e:
+        # The transaction which created the job may be not committed yet.
+        raise render_print_job.retry(exc=e)
+    job.status = 'RENDERING'
+    job.save()
+
+    try:
+        pdf = generator(source=job.source_file.read(),
+                header=unicode(job.user))
+    except PageLimitExceeded:
+        _fail(job, _("The page limit exceeded."))
+        return
+    except Exception:
+        logger.error("Rendering print job #%d failed", job_id, exc_info=True)
+        _fail(job, _("Could not render the file."))
+        return
+
+    job.pdf_file.save('%d.pdf' % (job.id,), ContentFile(pdf), save=False)
+    job.status = 'SPOOLING'
+    job.save()
+    spool_print_job.delay(job.id)
+
+
+def _spool_to_directory(job, pdf):
+    filename = os.path.join(settings.PRINTING_SPOOL_DIR, '%d.pdf' % (job.id,))
+    # The file is renamed when complete, so that whatever processes the
+    # directory never sees partially written files.
+    with open(filename + '.tmp', 'wb') as f:
+        f.write(pdf)
+    os.rename(filename + '.tmp', filename)
+
+
+@task
+def spool_print_job(job_id):
+    """Sends a rendered print job to ``settings.PRINTING_SPOOL_DIR``
+       if it is set, or to ``settings.PRINTING_COMMAND`` otherwise.
+    """
+    job = PrintJob.objects.get(id=job_id)
+    pdf = job.pdf_file.read()
+    try:
+        if settings.PRINTING_SPOOL_DIR:
+            _spool_to_directory(job, pdf)
+        else:
+            execute(settings.PRINTING_COMMAND, stdin=pdf)
+    except (ExecuteError, EnvironmentError), e:
+        _fail(job, unicode(e))
+        return
+
+    job.status = 'DONE'
+    job.save()
@@ -3,9 +3,13 @@ from django.test.utils import override_settings
 from django.core.urlresolvers import reverse
 from django.core.files.base import ContentFile
 from oioioi.printing.pdf import generator
+from oioioi.printing.models import PrintJob
 from oioioi.contests.models import Contest
 import slate
 from StringIO import StringIO
+import os
+import shutil
+import tempfile
 
 SAMPLE_TEXT = """Lorem ipsum dolor sit amet, consectetur adipiscing
         elit. Aenean aliquet commodo vulputate. Fusce vehicula tincidunt
@@ -43,19 +47,44 @@ class TestPrintingView(TestCase):
         post_data = {
             'file': file
         }
-        return self.client.post(self.url, post_data)
+        return self.client.post(self.url, post_data, follow=True)
 
     @override_settings(PRINTING_COMMAND=['grep', '%PDF-'])
     def test_print(self):
         response = self.print_file(SAMPLE_TEXT)
-        self.assertIn('File has been printed.', response.content)
+        self.assertIn('File has been sent to the printer queue.',
+                response.content)
+        self.assertIn('Printed', response.content)
         # The assert above should fail if there is no "%PDF-" in generated file
+        job = PrintJob.objects.get()
+        self.assertEqual(job.status, 'DONE')
+        self.assertEqual(job.error_message, '')
+
+    @override_settings(PRINTING_COMMAND=['false'])
+    def test_print_error(self):
+        response = self.print_file(SAMPLE_TEXT)
+        self.assertIn('Error', response.content)
+        self.assertEqual(PrintJob.objects.get().status, 'ERR')
+
+    def test_spool_dir(self):
+        spool_dir = tempfile.mkdtemp()
+        try:
+            with self.settings(PRINTING_SPOOL_DIR=spool_dir):
+                self.print_file(SAMPLE_TEXT)
+            job = PrintJob.objects.get()
+            self.assertEqual(job.status, 'DONE')
+            with open(os.path.join(spool_dir, '%d.pdf' % job.id)) as f:
+                self.assertTrue(f.read().startswith('%PDF-'))
+        finally:
+            shutil.rmtree(spool_dir)
 
     @override_settings(PRINTING_MAX_FILE_SIZE=2048 * 100)
     def test_page_limit(self):
         response = self.print_file(SAMPLE_TEXT * 2)
         self.assertIn('The page limit exceeded.', response.content)
+        self.assertEqual(PrintJob.objects.get().status, 'ERR')
 
     def test_file_size_limit(self):
         response = self.print_file(SAMPLE_TEXT * 2)
         self.assertIn('The file size limit exceeded.', response.content)
+        self.assertFalse(PrintJob.objects.exists())
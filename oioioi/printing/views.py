@@ -1,12 +1,14 @@
-from django.conf import settings
+from django.contrib import messages
 from django.core.urlresolvers import reverse
+from django.shortcuts import redirect
 from django.utils.translation import ugettext_lazy as _
 from django.template.response import TemplateResponse
 from oioioi.base.menu import menu_registry
 from oioioi.base.permissions import not_anonymous, enforce_condition
 from oioioi.contests.utils import has_any_submittable_problem, contest_exists
-from oioioi.base.utils.execute import execute, ExecuteError
 from oioioi.printing.forms import PrintForm
+from oioioi.printing.models import PrintJob
+from oioioi.printing.tasks import render_print_job
 
 
 @menu_registry.register_decorator(_("Print file"), lambda request:
@@ -16,23 +18,22 @@ from oioioi.printing.forms import PrintForm
 @enforce_condition(has_any_submittable_problem,
                    template='printing/nothing_to_print.html')
 def print_view(request, contest_id):
-    error_message = None
-    success_message = None
-
     if request.method == 'POST':
-        form = PrintForm(request.user, request.POST, request.FILES)
+        form = PrintForm(request.POST, request.FILES)
         if form.is_valid():
-            try:
-                execute(settings.PRINTING_COMMAND,
-                        stdin=form.cleaned_data['file'])
-            except ExecuteError as e:
-                error_message = unicode(e)
-            else:
-                success_message = _("File has been printed.")
-
+            job = PrintJob(contest=request.contest, user=request.user)
+            job.source_file.save(form.cleaned_data['file'].name,
+                    form.cleaned_data['file'])
+            render_print_job.delay(job.id)
+            messages.success(request, _("File has been sent to the printer "
+                "queue."))
+            return redirect('print_view', contest_id=contest_id)
     else:
-        form = PrintForm(request.user)
+        form = PrintForm()
 
+    jobs = PrintJob.objects.filter(contest=request.contest,
+            user=request.user)
     return TemplateResponse(request, 'printing/print.html',
-                    {'form': form, 'success_message': success_message,
-                     'error_message': error_message})
+                    {'form': form, 'jobs': jobs,
+                     'has_pending_jobs': jobs.filter(
+                         status__in=PrintJob.PENDING_STATUSES).exists()})
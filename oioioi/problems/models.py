@@ -1,10 +1,13 @@
+from django.contrib.auth.models import User
+from django.conf import settings
 from django.core.validators import validate_slug
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.utils.text import get_valid_filename
-from oioioi.base.fields import DottedNameField
+from oioioi.base.fields import DottedNameField, EnumRegistry, EnumField
 from oioioi.base.utils import get_object_by_dotted_name
 from oioioi.filetracker.fields import FileField
 
@@ -118,3 +121,74 @@ class ProblemAttachment(models.Model):
 
     def __unicode__(self):
         return '%s / %s' % (self.problem.name, self.filename)
+
+
+def make_package_filename(instance, filename):
+    return 'packages/%s/%s' % (timezone.now().strftime('%Y/%m/%d'),
+            get_valid_filename(os.path.basename(filename)))
+
+package_statuses = EnumRegistry()
+package_statuses.register('QUEUED', _("Queued"))
+package_statuses.register('PROCESSING', _("Processing"))
+package_statuses.register('OK', _("Uploaded"))
+package_statuses.register('ERR', _("Error"))
+
+
+class ProblemPackage(models.Model):
+    """Represents an uploaded problem package, which is unpacked by
+       :func:`oioioi.problems.tasks.process_problem_package`.
+
+       While the package is being processed, its current ``stage`` is saved
+       at once, although the changes made by the backend are committed only
+       at the end.
+    """
+    package_file = FileField(upload_to=make_package_filename,
+            verbose_name=_("package"))
+    contest = models.ForeignKey('contests.Contest', null=True, blank=True,
+            verbose_name=_("contest"))
+    problem = models.ForeignKey(Problem, null=True, blank=True,
+            verbose_name=_("problem"))
+    created_by = models.ForeignKey(User, null=True, blank=True,
+            verbose_name=_("created by"))
+    creation_date = models.DateTimeField(default=timezone.now,
+            verbose_name=_("creation date"))
+    status = EnumField(package_statuses, default='QUEUED',
+            verbose_name=_("status"))
+    processing_date = models.DateTimeField(null=True, blank=True,
+            verbose_name=_("processing start date"))
+    stage = models.CharField(max_length=255, blank=True,
+            verbose_name=_("stage"))
+    info = models.TextField(blank=True, verbose_name=_("information"))
+
+    #: Statuses of packages which have not been processed yet.
+    PENDING_STATUSES = ('QUEUED', 'PROCESSING')
+
+    class Meta:
+        verbose_name = _("problem package")
+        verbose_name_plural = _("problem packages")
+        ordering = ('-creation_date',)
+
+    @property
+    def filename(self):
+        return os.path.split(self.package_file.name)[1]
+
+    def can_retry(self, timestamp):
+        """Tells whether processing of the package may be started again,
+           because it has failed or because it has been queued or processed
+           for longer than ``settings.PROBLEM_PACKAGE_PROCESSING_TIMEOUT``,
+           so the task has probably been lost or the worker processing it
+           has died.
+
+           ``processing_date`` of a queued package is the time of queueing
+           it again, if it has been retried.
+        """
+        if self.status == 'ERR':
+            return True
+        if self.status not in self.PENDING_STATUSES:
+            return False
+        since = self.processing_date or self.creation_date
+        return (timestamp - since).total_seconds() > \
+                settings.PROBLEM_PACKAGE_PROCESSING_TIMEOUT
+
+    def __unicode__(self):
+        return self.filename
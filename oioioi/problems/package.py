@@ -36,6 +36,16 @@ class ProblemPackageBackend(RegisteredSubclassesBase, ObjectWithMixins):
         """
         raise NotImplementedError
 
+    def unpack_with_progress(self, path, progress, original_filename=None,
+            existing_problem=None):
+        """Works like :meth:`unpack`, but calls ``progress(description)``
+           whenever a new stage of unpacking starts.
+
+           Backends which do not report their progress need not override it.
+        """
+        return self.unpack(path, original_filename=original_filename,
+                existing_problem=existing_problem)
+
     def pack(self, problem):
         """Creates a package from problem, returns a
            :class:`django.http.HttpResponse` instance.
@@ -1,12 +1,15 @@
 from django.conf import settings
 from django import forms
+from django.core.files import File
 from django.db import transaction
 from django.template.response import TemplateResponse
 from django.utils.translation import ugettext_lazy as _
 from django.contrib import messages
 from oioioi.base.utils import uploaded_file_name, get_object_by_dotted_name, \
         memoized
+from oioioi.problems.models import ProblemPackage
 from oioioi.problems.package import backend_for_package
+from oioioi.problems.tasks import process_problem_package
 import logging
 
 logger = logging.getLogger(__name__)
@@ -46,6 +49,11 @@ class ProblemSource(object):
            should be redirected back to the list of problems (or asked to
            attach the new problem to some round).
 
+           May also return an instance of
+           :class:`~oioioi.problems.models.ProblemPackage`, which indicates
+           that the package will be processed in the background and the user
+           should be redirected to the page showing its progress.
+
            :param request: Django request
            :param round: :class:`~oioioi.contests.models.Round` where the
              problem is going to be attached (or is already attached); may be
@@ -72,8 +80,9 @@ class PackageSource(ProblemSource):
     #: Template to use for rendering the form.
     template_name = 'problems/package_source.html'
 
-    def process_package(self, request, contest, filename,
+    def unpack_package(self, request, contest, filename,
             original_filename, existing_problem=None):
+        """Unpacks the package immediately and returns the problem."""
         backend = backend_for_package(filename,
                 original_filename=original_filename)
         problem = backend.unpack(filename,
@@ -82,6 +91,20 @@ class PackageSource(ProblemSource):
         messages.success(request, _("Problem package uploaded."))
         return problem
 
+    def process_package(self, request, contest, filename,
+            original_filename, existing_problem=None):
+        """Stores the package and schedules unpacking it in the background.
+
+           Returns the :class:`~oioioi.problems.models.ProblemPackage`.
+        """
+        package = ProblemPackage(contest=contest, problem=existing_problem,
+                created_by=request.user)
+        package.package_file.save(original_filename,
+                File(open(filename, 'rb')), save=False)
+        package.save()
+        process_problem_package.delay(package.id)
+        return package
+
     def process_valid_form(self, request, contest, form,
             existing_problem=None):
         uploaded_file = request.FILES['package_file']
@@ -0,0 +1,115 @@
+"""Background processing of uploaded problem packages."""
+
+import logging
+import shutil
+import tempfile
+
+from celery.task import task
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.db.utils import load_backend
+from django.utils import timezone
+
+from oioioi.problems.models import ProblemPackage
+from oioioi.problems.package import backend_for_package
+from oioioi.problems.utils import add_problem_to_contest
+
+logger = logging.getLogger(__name__)
+
+
+def _unpack(package, filename, progress):
+    existing_problem = package.problem
+    backend = backend_for_package(filename,
+            original_filename=package.filename)
+    problem = backend.unpack_with_progress(filename, progress,
+            original_filename=package.filename,
+            existing_problem=existing_problem)
+    if not problem.package_backend_name:
+        raise AssertionError("Problem package backend (%r) did not set "
+                "Problem.package_backend_name. This is a bug in the problem "
+                "package backend." % (backend,))
+    if package.contest:
+        add_problem_to_contest(problem, package.contest, existing_problem)
+    return problem
+
+
+class _StageSaver(object):
+    """Saves the stage of processing a package at once, using a separate
+       database connection, as the changes of the problem are committed
+       only at the end.
+
+       The stage is saved only at the end when processing in a transaction
+       which may have locked the package (e.g. when run eagerly in
+       a request), and in SQLite, which allows only one writing transaction
+       at a time.
+    """
+
+    def __init__(self, package):
+        self.package = package
+        self.stages = []
+        self.connection = None
+        default = connections[DEFAULT_DB_ALIAS]
+        if default.vendor != 'sqlite' and not transaction.is_managed():
+            backend = load_backend(default.settings_dict['ENGINE'])
+            self.connection = backend.DatabaseWrapper(default.settings_dict)
+            qn = self.connection.ops.quote_name
+            self.sql = 'UPDATE %s SET %s = %%s WHERE %s = %%s' % (
+                    qn(ProblemPackage._meta.db_table), qn('stage'), qn('id'))
+
+    def __call__(self, description):
+        self.stages.append(description)
+        if self.connection is not None:
+            max_length = ProblemPackage._meta.get_field('stage').max_length
+            self.connection.cursor().execute(self.sql,
+                    [description[:max_length], self.package.id])
+            self.connection._commit()
+
+    def last_stage(self):
+        return self.stages and self.stages[-1] or ''
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+@task(max_retries=5, default_retry_delay=1)
+def process_problem_package(package_id):
+    """Unpacks a :class:`~oioioi.problems.models.ProblemPackage`.
+
+       All changes of the problem are made in a single transaction, so
+       that the problem is either updated completely or not at all, and
+       a failed or interrupted processing may be simply started again.
+    """
+    try:
+        package = ProblemPackage.objects \
+                .select_related('problem', 'contest').get(id=package_id)
+    except ProblemPackage.DoesNotExist, e:
+        # The transaction which created the package may be not committed
+        # yet.
+        raise process_problem_package.retry(exc=e)
+    if package.status not in ProblemPackage.PENDING_STATUSES:
+        return
+
+    package.status = 'PROCESSING'
+    package.processing_date = timezone.now()
+    package.stage = ''
+    package.info = ''
+    package.save()
+
+    progress = _StageSaver(package)
+    try:
+        with transaction.commit_on_success():
+            with tempfile.NamedTemporaryFile(suffix=package.filename) as f:
+                shutil.copyfileobj(package.package_file, f)
+                f.flush()
+                package.problem = _unpack(package, f.name, progress)
+        package.status = 'OK'
+        package.stage = ''
+    except Exception, e:
+        logger.error("Error processing package %s", package.filename,
+                exc_info=True)
+        package.status = 'ERR'
+        package.stage = progress.last_stage()
+        package.info = unicode(e)
+    finally:
+        progress.close()
+    package.save()
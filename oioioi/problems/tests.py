@@ -2,12 +2,15 @@ from django.contrib.auth.models import User, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.test import TestCase
 from django.core.urlresolvers import reverse
-from oioioi.base.tests import check_not_accessible
+from django.utils.timezone import utc
+from oioioi.base.tests import check_not_accessible, fake_time
 from oioioi.contests.models import Contest
 from oioioi.filetracker.tests import TestStreamingMixin
 from oioioi.problems.controllers import ProblemController
 from oioioi.problems.models import Problem, ProblemStatement, \
-        make_problem_filename
+        ProblemPackage, make_problem_filename
+
+from datetime import datetime
 
 
 class TestProblemController(ProblemController):
@@ -29,6 +32,98 @@ class TestModels(TestCase):
                 'problems/12/hej.txt')
 
 
+class TestProblemPackageViews(TestCase):
+    fixtures = ['test_users']
+
+    def test_invalid_package(self):
+        self.client.login(username='test_admin')
+        url = reverse('add_or_update_problem')
+        response = self.client.get(url, follow=True)
+        url = response.redirect_chain[-1][0]
+        response = self.client.post(url,
+                {'package_file': open(__file__, 'rb')}, follow=True)
+        package = ProblemPackage.objects.get()
+        package_url = reverse('problem_package',
+                kwargs={'package_id': package.id})
+        self.assertRedirects(response, package_url)
+        self.assertEqual(package.status, 'ERR')
+        self.assertIn('not recognized', package.info)
+        self.assertContains(response, 'not recognized')
+        self.assertEqual(Problem.objects.count(), 0)
+
+        retry_url = reverse('retry_problem_package',
+                kwargs={'package_id': package.id})
+        response = self.client.post(retry_url)
+        self.assertRedirects(response, package_url)
+        self.assertEqual(ProblemPackage.objects.get().status, 'ERR')
+
+        self.client.login(username='test_user')
+        check_not_accessible(self, package_url)
+        response = self.client.post(retry_url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_stale_package(self):
+        self.client.login(username='test_admin')
+        url = reverse('add_or_update_problem')
+        response = self.client.get(url, follow=True)
+        url = response.redirect_chain[-1][0]
+        self.client.post(url, {'package_file': open(__file__, 'rb')})
+
+        # The worker processing the package died.
+        package = ProblemPackage.objects.get()
+        package.status = 'PROCESSING'
+        package.processing_date = datetime(2014, 1, 1, 12, tzinfo=utc)
+        package.info = ''
+        package.save()
+
+        package_url = reverse('problem_package',
+                kwargs={'package_id': package.id})
+        retry_url = reverse('retry_problem_package',
+                kwargs={'package_id': package.id})
+        with fake_time(datetime(2014, 1, 1, 12, 30, tzinfo=utc)):
+            response = self.client.get(package_url)
+            self.assertNotContains(response, 'Process again')
+            self.client.post(retry_url)
+            self.assertEqual(ProblemPackage.objects.get().status,
+                    'PROCESSING')
+
+        with fake_time(datetime(2014, 1, 1, 14, tzinfo=utc)):
+            response = self.client.get(package_url)
+            self.assertContains(response, 'Process again')
+            self.client.post(retry_url)
+            package = ProblemPackage.objects.get()
+            self.assertEqual(package.status, 'ERR')
+            self.assertIn('not recognized', package.info)
+
+    def test_lost_queued_package(self):
+        self.client.login(username='test_admin')
+        url = reverse('add_or_update_problem')
+        response = self.client.get(url, follow=True)
+        url = response.redirect_chain[-1][0]
+        self.client.post(url, {'package_file': open(__file__, 'rb')})
+
+        # The task processing the package was lost.
+        package = ProblemPackage.objects.get()
+        package.status = 'QUEUED'
+        package.creation_date = datetime(2014, 1, 1, 12, tzinfo=utc)
+        package.processing_date = None
+        package.info = ''
+        package.save()
+
+        package_url = reverse('problem_package',
+                kwargs={'package_id': package.id})
+        with fake_time(datetime(2014, 1, 1, 12, 30, tzinfo=utc)):
+            response = self.client.get(package_url)
+            self.assertNotContains(response, 'Process again')
+
+        with fake_time(datetime(2014, 1, 1, 14, tzinfo=utc)):
+            response = self.client.get(package_url)
+            self.assertContains(response, 'Process again')
+            self.client.post(reverse('retry_problem_package',
+                    kwargs={'package_id': package.id}))
+            self.assertEqual(ProblemPackage.objects.get().status, 'ERR')
+
+
 class TestProblemViews(TestCase, TestStreamingMixin):
     fixtures = ['test_users', 'test_contest', 'test_full_package']
 
@@ -3,6 +3,10 @@ from django.conf.urls import patterns, include, url
 contest_patterns = patterns('oioioi.problems.views',
     url(r'^problems/add$', 'add_or_update_problem_view',
         name='add_or_update_contest_problem'),
+    url(r'^problems/package/(?P<package_id>\d+)/$', 'problem_package_view',
+        name='contest_problem_package'),
+    url(r'^problems/package/(?P<package_id>\d+)/retry/$',
+        'retry_problem_package_view', name='contest_retry_problem_package'),
 )
 
 urlpatterns = patterns('oioioi.problems.views',
@@ -13,5 +17,9 @@ urlpatterns = patterns('oioioi.problems.views',
 
     url(r'^problems/add$', 'add_or_update_problem_view',
         name='add_or_update_problem'),
+    url(r'^problems/package/(?P<package_id>\d+)/$', 'problem_package_view',
+        name='problem_package'),
+    url(r'^problems/package/(?P<package_id>\d+)/retry/$',
+        'retry_problem_package_view', name='retry_problem_package'),
     url(r'^c/(?P<contest_id>[a-z0-9_-]+)/', include(contest_patterns)),
 )
@@ -1,4 +1,5 @@
 from oioioi.base.utils import request_cached
+from oioioi.contests.models import ProblemInstance
 from oioioi.contests.utils import is_contest_admin
 
 
@@ -17,3 +18,24 @@ def can_change_problem(request, problem):
             problem.contest):
         return True
     return False
+
+
+def add_problem_to_contest(problem, contest, existing_problem=None):
+    """Creates a :class:`~oioioi.contests.models.ProblemInstance` of
+       the uploaded ``problem`` in ``contest``, unless it exists.
+
+       The problem instance is assigned to the only round of the contest,
+       if there is one.
+
+       :returns: the problem instance
+    """
+    if not existing_problem:
+        problem.contest = contest
+        problem.save()
+    pi, created = ProblemInstance.objects.get_or_create(
+            problem=problem, contest=contest,
+            submissions_limit=contest.default_submissions_limit)
+    if not pi.round and contest.round_set.count() == 1:
+        pi.round = contest.round_set.get()
+        pi.save()
+    return pi
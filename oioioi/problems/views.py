@@ -5,14 +5,18 @@ from django.shortcuts import get_object_or_404, redirect
 from django.template.response import TemplateResponse
 from django.http import Http404, HttpResponseRedirect
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.utils.safestring import mark_safe
 from django.utils.encoding import force_unicode
 from django.utils.translation import ugettext_lazy as _
+from django.views.decorators.http import require_POST
 
 from oioioi.problems.models import ProblemStatement, ProblemAttachment
 from oioioi.filetracker.utils import stream_file
-from oioioi.problems.models import Problem
-from oioioi.problems.utils import can_change_problem
+from oioioi.problems.models import Problem, ProblemPackage
+from oioioi.problems.tasks import process_problem_package
+from oioioi.problems.utils import can_change_problem, \
+        add_problem_to_contest
 from oioioi.problems.problem_sources import problem_sources
 from oioioi.contests.models import ProblemInstance
 from oioioi.contests.utils import is_contest_admin
@@ -67,6 +71,11 @@ def add_or_update_problem_view(request, contest_id=None):
     problem_or_content = current_source.view(request, contest,
             existing_problem)
 
+    if isinstance(problem_or_content, ProblemPackage):
+        messages.info(request, _("Problem package uploaded, it is being "
+            "processed in the background."))
+        return _redirect_to_package(problem_or_content)
+
     if isinstance(problem_or_content, Problem):
         problem = problem_or_content
         if not problem.package_backend_name:
@@ -74,22 +83,12 @@ def add_or_update_problem_view(request, contest_id=None):
                     "set Problem.package_backend_name. This is a bug in "
                     "the problem package backend." % (s,))
         if contest:
-            if not existing_problem:
-                problem.contest = contest
-                problem.save()
-            pi, created = ProblemInstance.objects.get_or_create(
-                    problem=problem, contest=contest,
-                    submissions_limit=contest.default_submissions_limit)
+            pi = add_problem_to_contest(problem, contest, existing_problem)
             if not pi.round:
-                if contest.round_set.count() == 1:
-                    pi.round = contest.round_set.get()
-                    pi.save()
-                else:
-                    messages.info(request, _("Please select the round for "
-                        "this problem."))
-                    return redirect(
-                            'oioioiadmin:contests_probleminstance_change',
-                            pi.id)
+                messages.info(request, _("Please select the round for "
+                    "this problem."))
+                return redirect('oioioiadmin:contests_probleminstance_change',
+                        pi.id)
             return redirect('oioioiadmin:contests_probleminstance_changelist')
         else:
             return redirect('oioioiadmin:problems_problem_changelist')
@@ -113,3 +112,51 @@ def add_or_update_problem_view(request, contest_id=None):
         'existing_problem': existing_problem,
     }
     return TemplateResponse(request, 'problems/add_or_update.html', context)
+
+
+def _redirect_to_package(package):
+    if package.contest:
+        return redirect('contest_problem_package',
+                contest_id=package.contest_id, package_id=package.id)
+    return redirect('problem_package', package_id=package.id)
+
+
+def _get_package(request, package_id, contest_id=None):
+    package = get_object_or_404(ProblemPackage, id=package_id)
+    if package.contest_id != contest_id:
+        raise Http404
+    if package.created_by_id != request.user.id and \
+            not request.user.has_perm('problems.problems_db_admin') and \
+            not (package.contest and request.user.has_perm(
+                'contests.contest_admin', package.contest)):
+        raise PermissionDenied
+    return package
+
+
+def problem_package_view(request, package_id, contest_id=None):
+    package = _get_package(request, package_id, contest_id)
+    problem_instance = None
+    if package.status == 'OK' and package.contest and package.problem:
+        instances = ProblemInstance.objects.filter(
+                problem=package.problem, contest=package.contest)[:1]
+        problem_instance = instances and instances[0] or None
+    return TemplateResponse(request, 'problems/package.html', {
+        'package': package,
+        'is_pending': package.status in ProblemPackage.PENDING_STATUSES,
+        'can_retry': package.can_retry(request.timestamp),
+        'problem_instance': problem_instance,
+    })
+
+
+@require_POST
+def retry_problem_package_view(request, package_id, contest_id=None):
+    package = _get_package(request, package_id, contest_id)
+    if package.can_retry(request.timestamp):
+        # The status must be committed before the task runs, as the task
+        # ignores packages which are not pending.
+        with transaction.commit_on_success():
+            package.status = 'QUEUED'
+            package.processing_date = request.timestamp
+            package.save()
+        process_problem_package.delay(package.id)
+    return _redirect_to_package(package)
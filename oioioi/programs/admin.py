@@ -1,5 +1,6 @@
 from django.contrib import admin, messages
 from django.template.response import TemplateResponse
+from django.http import HttpResponse
 from django.conf.urls import patterns, url
 from django.core.exceptions import PermissionDenied
 from django.utils.translation import ugettext_lazy as _
@@ -10,10 +11,11 @@ from django.utils.html import conditional_escape
 from django.utils.encoding import force_unicode
 from oioioi.base.utils import make_html_link
 from oioioi.contests.admin import ProblemInstanceAdmin, SubmissionAdmin
-from oioioi.contests.scores import IntegerScore
-from oioioi.programs.models import Test, ModelSolution, TestReport, \
-        GroupReport, ModelProgramSubmission, OutputChecker
-from collections import defaultdict
+from oioioi.programs.models import Test, ModelSolution, \
+        ModelProgramSubmission, ModelSolutionResults, \
+        ModelSolutionsEvaluation, OutputChecker
+import json
+import unicodecsv
 
 
 class TestInline(admin.TabularInline):
@@ -88,74 +90,115 @@ class ProgrammingProblemAdminMixin(object):
 
 
 class ProgrammingProblemInstanceAdminMixin(object):
-    def _is_partial_score(self, test_report):
-        if not test_report:
-            return False
-        if isinstance(test_report.score, IntegerScore):
-            return test_report.score.value != test_report.test_max_score
-        return False
-
-    def model_solutions_view(self, request, problem_instance_id):
+    def _get_problem_instance(self, request, problem_instance_id):
         problem_instance = self.get_object(request,
                 unquote(problem_instance_id))
-        contest = problem_instance.contest
-        if not request.user.has_perm('contests.contest_admin', contest):
+        if not request.user.has_perm('contests.contest_admin',
+                problem_instance.contest):
             raise PermissionDenied
-
-        test_reports = TestReport.objects \
-                .filter(submission_report__submission__problem_instance=problem_instance) \
-                .filter(submission_report__submission__programsubmission__modelprogramsubmission__isnull=False) \
-                .filter(test__isnull=False) \
-                .select_related()
-        group_reports = GroupReport.objects \
-                .filter(submission_report__submission__problem_instance=problem_instance) \
-                .filter(submission_report__submission__programsubmission__modelprogramsubmission__isnull=False) \
-                .select_related()
-        submissions = ModelProgramSubmission.objects \
-                .filter(problem_instance=problem_instance) \
-                .order_by('model_solution__name') \
-                .select_related('model_solution') \
-                .all()
+        return problem_instance
+
+    def _model_solutions_matrix(self, problem_instance):
+        """Returns the model submissions of ``problem_instance`` and rows
+           of their results, one for each test.
+
+           The results are read from the precomputed
+           :class:`~oioioi.programs.models.ModelSolutionResults`, which are
+           created here for the submissions judged before they existed.
+        """
+        submissions = list(ModelProgramSubmission.objects
+                .filter(problem_instance=problem_instance)
+                .order_by('model_solution__name')
+                .select_related('model_solution'))
+        columns = dict((c.submission_id, c.get_results()) for c
+                in ModelSolutionResults.objects
+                    .filter(submission__in=submissions))
+        for s in submissions:
+            if s.id not in columns:
+                ModelSolutionResults.objects.update_for_submission(s)
+                columns[s.id] = ModelSolutionResults.objects \
+                        .get(submission=s).get_results()
         tests = problem_instance.problem.test_set \
-                .order_by('order', 'group', 'name').all()
-
-        group_results = defaultdict(lambda: defaultdict(lambda: None))
-        for gr in group_reports:
-            group_results[gr.group][gr.submission_report.submission_id] = gr
-
-        test_results = defaultdict(lambda: defaultdict(lambda: None))
-        for tr in test_reports:
-            test_results[tr.test_id][tr.submission_report.submission_id] = tr
+                .order_by('order', 'group', 'name')
 
         rows = []
         for t in tests:
-            row_test_results = test_results[t.id]
-            row_group_results = group_results[t.group]
-            rows.append({
-                'test': t,
-                'results': [{
-                        'test_report': row_test_results[s.id],
-                        'group_report': row_group_results[s.id],
-                        'is_partial_score': self._is_partial_score(
-                            row_test_results[s.id])
-                    } for s in submissions]
+            results = []
+            for s in submissions:
+                status, time_used, score, is_partial_score = \
+                        columns[s.id].get(t.id, (None, None, None, False))
+                results.append({
+                    'status': status,
+                    'time_used': time_used,
+                    'score': score,
+                    'is_partial_score': is_partial_score,
                 })
+            rows.append({'test': t, 'results': results})
+        return submissions, rows
 
+    def model_solutions_view(self, request, problem_instance_id):
+        problem_instance = self._get_problem_instance(request,
+                problem_instance_id)
+        submissions, rows = self._model_solutions_matrix(problem_instance)
         context = {
                 'problem_instance': problem_instance,
                 'submissions': submissions,
-                'rows': rows
+                'rows': rows,
+                'evaluation_scheduled': ModelSolutionsEvaluation.objects
+                    .filter(problem_instance=problem_instance).exists(),
+                'pending_count': len([s for s in submissions
+                    if s.status == '?']),
         }
 
         return TemplateResponse(request, 'programs/admin/model_solutions.html',
                 context)
 
+    def model_solutions_csv_view(self, request, problem_instance_id):
+        problem_instance = self._get_problem_instance(request,
+                problem_instance_id)
+        submissions, rows = self._model_solutions_matrix(problem_instance)
+
+        response = HttpResponse(mimetype='text/csv')
+        response['Content-Disposition'] = \
+            'attachment; filename=%s-%s.csv' % \
+            ("model-solutions", problem_instance.id)
+        writer = unicodecsv.writer(response)
+
+        writer.writerow([force_unicode(_("Test")),
+                force_unicode(_("Time limit"))] +
+            [s.model_solution.name for s in submissions])
+        writer.writerow(['', ''] + [s.status for s in submissions])
+        writer.writerow(['', ''] + [unicode(s.score or '')
+            for s in submissions])
+        for row in rows:
+            writer.writerow([row['test'].name, row['test'].time_limit] +
+                [cell['status'] == 'OK' and cell['time_used']
+                    or cell['status'] or '' for cell in row['results']])
+        return response
+
+    def model_solutions_json_view(self, request, problem_instance_id):
+        problem_instance = self._get_problem_instance(request,
+                problem_instance_id)
+        submissions, rows = self._model_solutions_matrix(problem_instance)
+        data = {
+            'submissions': [{
+                'id': s.id,
+                'model_solution': s.model_solution.name,
+                'status': s.status,
+                'score': s.score is not None and unicode(s.score) or None,
+            } for s in submissions],
+            'tests': [{
+                'id': row['test'].id,
+                'name': row['test'].name,
+                'time_limit': row['test'].time_limit,
+                'results': row['results'],
+            } for row in rows],
+        }
+        return HttpResponse(json.dumps(data), content_type='application/json')
+
     def rejudge_model_solutions_view(self, request, problem_instance_id):
-        problem_instance = self.get_object(request,
-                unquote(problem_instance_id))
-        contest = problem_instance.contest
-        if not request.user.has_perm('contests.contest_admin', contest):
-            raise PermissionDenied
+        problem_instance = self._get_problem_instance(request,
+                problem_instance_id)
         ModelSolution.objects.recreate_model_submissions(problem_instance)
         messages.info(request, _("Model solutions sent for evaluation."))
         return redirect('oioioiadmin:contests_probleminstance_models',
@@ -166,6 +209,10 @@ class ProgrammingProblemInstanceAdminMixin(object):
         extra_urls = patterns('',
                 url(r'(\d+)/models/$', self.model_solutions_view,
                     name='contests_probleminstance_models'),
+                url(r'(\d+)/models/csv/$', self.model_solutions_csv_view,
+                    name='contests_probleminstance_models_csv'),
+                url(r'(\d+)/models/json/$', self.model_solutions_json_view,
+                    name='contests_probleminstance_models_json'),
                 url(r'(\d+)/models/rejudge/$',
                     self.rejudge_model_solutions_view,
                     name='contests_probleminstance_models_rejudge'),
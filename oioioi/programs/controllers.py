@@ -17,7 +17,7 @@ from oioioi.contests.models import SubmissionReport, ScoreReport
 from oioioi.contests.controllers import submission_template_context
 from oioioi.programs.models import ProgramSubmission, OutputChecker, \
         CompilationReport, TestReport, GroupReport, ModelProgramSubmission, \
-        Submission
+        Submission, ModelSolutionResults
 from oioioi.filetracker.utils import django_to_filetracker_path
 from oioioi.evalmgr import recipe_placeholder, add_before_placeholder, \
         extend_after_placeholder
@@ -47,6 +47,9 @@ class ProgrammingProblemController(ProblemController):
         else:
             environ['exec_mode'] = settings.SAFE_EXEC_MODE
 
+        environ['cache_test_results'] = \
+                getattr(settings, 'CACHE_TEST_RESULTS', False)
+
         if getattr(settings, 'USE_LOCAL_COMPILERS', False):
             environ['compiler'] = 'system-' + environ['language']
 
@@ -158,6 +161,22 @@ class ProgrammingContestController(ContestController):
 
         self.fill_evaluation_environ_post_problem(environ, submission)
 
+        # Model submissions are the only ones without an owner.
+        if submission.user_id is None:
+            self.fill_evaluation_environ_low_priority(environ)
+
+    def fill_evaluation_environ_low_priority(self, environ):
+        """Sends the evaluation to the low-priority queues, if split-priority
+           evaluation is enabled.
+        """
+        if settings.SPLITEVAL_EVALMGR:
+            environ['evalmgr_extra_args'] = {'queue': 'evalmgr-lowprio'}
+        if settings.ENABLE_SPLITEVAL:
+            extra_args = environ.setdefault('sioworkers_extra_args', {})
+            for kind in ('EXAMPLE', 'NORMAL'):
+                extra_args.setdefault(kind, {})['queue'] = \
+                        'sioworkers-lowprio'
+
     def fill_evaluation_environ_post_problem(self, environ, submission):
         """Run after ProblemController.fill_evaluation_environ."""
         if 'INITIAL' in environ['report_kinds']:
@@ -233,7 +252,7 @@ class ProgrammingContestController(ContestController):
         submission.source_file.save(file.name, file)
         submission.save()
         if judge_after_create:
-            self.judge(submission)
+            self.schedule_judging(submission)
         return submission
 
     def update_report_statuses(self, submission, queryset):
@@ -275,6 +294,10 @@ class ProgrammingContestController(ContestController):
             submission.score = None
         submission.save()
 
+        # Model submissions are the only ones without an owner.
+        if submission.user_id is None:
+            ModelSolutionResults.objects.update_for_submission(submission)
+
     def get_visible_reports_kinds(self, request, submission):
         if self.results_visible(request, submission):
             return ['INITIAL', 'NORMAL']
@@ -332,11 +355,12 @@ class ProgrammingContestController(ContestController):
                 .filter(problem_instance=submission.problem_instance) \
                 .exclude(pk=submission.pk) \
                 .order_by('-date') \
-                .select_related()
+                .select_related('problem_instance__contest',
+                                'problem_instance__problem')
         if not is_contest_admin(request):
             cc = request.contest.controller
             queryset = cc.filter_my_visible_submissions(request, queryset)
-        show_scores = bool(queryset.filter(score__isnull=False))
+        show_scores = queryset.filter(score__isnull=False).exists()
         if not queryset.exists():
             return super_footer
         return super_footer + render_to_string(
@@ -1,17 +1,19 @@
-from django.db import transaction
+from django.db import transaction, IntegrityError
 from oioioi.base.utils import get_object_by_dotted_name
 from oioioi.sioworkers.jobs import run_sioworkers_job, run_sioworkers_jobs
 from oioioi.contests.scores import ScoreValue
 from oioioi.contests.models import Submission, SubmissionReport, \
         ScoreReport
 from oioioi.programs.models import CompilationReport, TestReport, \
-        GroupReport, Test
+        GroupReport, Test, CachedTestResult
 from oioioi.programs.utils import slice_str
 from oioioi.problems.models import Problem
 from oioioi.filetracker.client import get_client
 from oioioi.filetracker.utils import django_to_filetracker_path
 import logging
 import functools
+import hashlib
+import json
 from collections import defaultdict
 import types
 
@@ -172,6 +174,12 @@ def run_tests(env, kind=None, **kwargs):
                ``env['save_outputs']`` was set)
 
            If the dictionary already exists, new test results are appended.
+
+       If ``env['cache_test_results']`` is set, results of runs which are
+       identical to the already performed ones (see
+       :func:`test_result_cache_key`) are taken from
+       :class:`~oioioi.programs.models.CachedTestResult` instead of running
+       the tests again. Such results have the ``reused`` key set.
     """
 
     jobs = dict()
@@ -189,14 +197,113 @@ def run_tests(env, kind=None, **kwargs):
             job['upload_out'] = True
         jobs[test_name] = job
 
+    cache_keys = {}
+    results = {}
+    if env.get('cache_test_results'):
+        cache_keys = dict((test_name, test_result_cache_key(env, job))
+                for test_name, job in jobs.iteritems()
+                if not job.get('upload_out'))
+        results = _get_cached_test_results(jobs, cache_keys)
+        for test_name in results:
+            del jobs[test_name]
+
     extra_args = env.get('sioworkers_extra_args', {}).get(kind, {})
     jobs = run_sioworkers_jobs(jobs, **extra_args)
+    if cache_keys:
+        _store_test_results(jobs, cache_keys)
+    results.update(jobs)
+
     env.setdefault('test_results', {})
-    for test_name, result in jobs.iteritems():
+    for test_name, result in results.iteritems():
         env['test_results'].setdefault(test_name, {}).update(result)
     return env
 
 
+# Only the keys produced by the ``exec`` job are cached.
+_CACHED_RESULT_KEYS = ('result_code', 'result_string', 'time_used',
+        'mem_used', 'num_syscalls')
+
+# Results which may be different when the run is repeated.
+_UNCACHEABLE_RESULT_CODES = ('SE', 'TLE')
+
+
+def _compiled_file_digest(env):
+    if 'compiled_file_digest' not in env:
+        reader, _version = get_client().get_stream(env['compiled_file'])
+        digest = hashlib.sha1()
+        try:
+            for chunk in iter(lambda: reader.read(65536), ''):
+                digest.update(chunk)
+        finally:
+            reader.close()
+        env['compiled_file_digest'] = digest.hexdigest()
+    return env['compiled_file_digest']
+
+
+def _file_version(path):
+    if not path:
+        return None
+    return path, get_client().file_version(path)
+
+
+def test_result_cache_key(env, job):
+    """Returns the key under which the result of running ``job``
+       is cached by :func:`run_tests`.
+
+       The key identifies the contents of the executable, the versions
+       of the input, hint and checker files, the limits and the execution
+       mode, i.e. everything the outcome of the ``exec`` job depends on.
+    """
+    key = [_compiled_file_digest(env), job['job_type'],
+            _file_version(job.get('in_file')),
+            _file_version(job.get('hint_file')),
+            _file_version(job.get('chk_file')),
+            job.get('exec_time_limit'), job.get('exec_mem_limit'),
+            job['check_output']]
+    return hashlib.sha1(repr(key)).hexdigest()
+
+
+def _get_cached_test_results(jobs, cache_keys):
+    cached = dict(CachedTestResult.objects
+            .filter(key__in=cache_keys.values())
+            .values_list('key', 'result'))
+    results = {}
+    for test_name, key in cache_keys.iteritems():
+        if key in cached:
+            result = jobs[test_name].copy()
+            result.update(json.loads(cached[key]))
+            result['reused'] = True
+            results[test_name] = result
+    if results:
+        logger.info("Reusing %d cached test results", len(results))
+    return results
+
+
+@transaction.commit_on_success
+def _create_cached_test_results(entries):
+    CachedTestResult.objects.bulk_create(entries)
+
+
+def _store_test_results(results, cache_keys):
+    entries = []
+    for test_name, result in results.iteritems():
+        if test_name not in cache_keys \
+                or result.get('result_code') in _UNCACHEABLE_RESULT_CODES:
+            continue
+        value = dict((k, result[k]) for k in _CACHED_RESULT_KEYS
+                if k in result)
+        entries.append(CachedTestResult(key=cache_keys[test_name],
+            result=json.dumps(value, separators=(',', ':'))))
+    if not entries:
+        return
+    try:
+        _create_cached_test_results(entries)
+    except IntegrityError:
+        # Some of the results have been just stored by another evaluation
+        # of the same executable.
+        pass
+
+
 @_if_compiled
 def grade_tests(env, **kwargs):
     """Grades tests using a scoring function.
@@ -380,8 +487,26 @@ def make_report(env, kind='NORMAL', **kwargs):
     if env['compilation_result'] != 'OK':
         return env
 
+    for result, test_report in _make_test_reports(env, submission_report):
+        test_report.save()
+        result['report_id'] = test_report.id
+
+    for group_result, group_report in \
+            _make_group_reports(env, submission_report):
+        group_report.save()
+        group_result['result_id'] = group_report.id
+
+    return env
+
+
+def _make_test_reports(env, submission_report):
+    """Returns pairs ``(test_result, test_report)`` with unsaved
+       :class:`~oioioi.programs.models.TestReport`\ s for test results
+       which have not been reported yet.
+    """
     tests = env['tests']
     test_results = env.get('test_results', {})
+    reports = []
     for test_name, result in test_results.iteritems():
         test = tests[test_name]
         if 'report_id' in result:
@@ -395,15 +520,23 @@ def make_report(env, kind='NORMAL', **kwargs):
         test_report.score = result['score']
         test_report.status = result['status']
         test_report.time_used = result['time_used']
+        test_report.reused = result.get('reused', False)
         comment = result.get('result_string', '')
         if comment.lower() == 'ok':  # Annoying
             comment = ''
         test_report.comment = \
             slice_str(comment, TestReport._meta.get_field('comment').max_length)
-        test_report.save()
-        result['report_id'] = test_report.id
+        reports.append((result, test_report))
+    return reports
 
+
+def _make_group_reports(env, submission_report):
+    """Returns pairs ``(group_result, group_report)`` with unsaved
+       :class:`~oioioi.programs.models.GroupReport`\ s for group results
+       which have not been reported yet.
+    """
     group_results = env.get('group_results', {})
+    reports = []
     for group_name, group_result in group_results.iteritems():
         if 'report_id' in group_result:
             continue
@@ -411,10 +544,8 @@ def make_report(env, kind='NORMAL', **kwargs):
         group_report.group = group_name
         group_report.score = group_result['score']
         group_report.status = group_result['status']
-        group_report.save()
-        group_result['result_id'] = group_report.id
-
-    return env
+        reports.append((group_result, group_report))
+    return reports
 
 
 def delete_executable(env, **kwargs):
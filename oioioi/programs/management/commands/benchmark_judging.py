@@ -0,0 +1,262 @@
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.utils.translation import ugettext as _
+from oioioi.contests.models import Contest, Round, ProblemInstance
+from oioioi.evalmgr import evalmgr_job
+from oioioi.problems.models import Problem
+from oioioi.programs.models import Test, ProgramSubmission
+from oioioi.sioworkers.backends import SimulatedBackend
+from optparse import make_option
+import json
+import math
+import time
+
+SOURCE = '#include <cstdio>\nint main() { int a, b; scanf("%d%d", &a, &b); ' \
+        'printf("%d\\n", a + b); }\n'
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = int(math.ceil(percent / 100. * len(values))) - 1
+    return values[max(0, min(index, len(values) - 1))]
+
+
+def _parse_latency(value):
+    try:
+        parts = [float(part) for part in value.split(',')]
+    except ValueError:
+        parts = []
+    if len(parts) == 1:
+        parts.append(0)
+    if len(parts) != 2:
+        raise CommandError(_("Invalid latency: %s, expected MEAN or "
+            "MEAN,STDDEV") % (value,))
+    return tuple(parts)
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('-n', '--submissions', metavar='N', dest='submissions',
+            type='int', default=100,
+            help=_("Number of judged submissions")),
+        make_option('-p', '--problems', metavar='M', dest='problems',
+            type='int', default=5, help=_("Number of problems")),
+        make_option('-t', '--tests', metavar='T', dest='tests',
+            type='int', default=10, help=_("Number of tests of a problem")),
+        make_option('-u', '--users', metavar='N', dest='users',
+            type='int', default=10, help=_("Number of submitting users")),
+        make_option('--compile-latency', metavar='MEAN[,STDDEV]',
+            dest='compile_latency', default='0',
+            help=_("Simulated compilation time in milliseconds")),
+        make_option('--exec-latency', metavar='MEAN[,STDDEV]',
+            dest='exec_latency', default='0',
+            help=_("Simulated time of running a test in milliseconds")),
+        make_option('--seed', metavar='N', dest='seed', type='int',
+            default=0, help=_("Seed of the simulated results")),
+        make_option('-o', '--output', metavar='FILE', dest='output',
+            default=None, help=_("Write the results to FILE in the JSON "
+                "format")),
+        make_option('-b', '--baseline', metavar='FILE', dest='baseline',
+            default=None, help=_("Compare the results with the ones "
+                "written earlier with --output to FILE")),
+        make_option('--keep', action='store_true', dest='keep',
+            default=False, help=_("Do not delete the generated contest")),
+    )
+
+    help = _("Measures the throughput of judging. Creates a contest with "
+             "generated problems and submissions, judges them with "
+             "a simulated sioworkers backend and reports the number of "
+             "submissions judged per second, percentiles of durations of "
+             "the evaluation phases and the numbers of database queries. "
+             "Submissions are judged one by one in this process.")
+
+    requires_model_validation = True
+
+    def _create_contest(self, options):
+        contest = Contest.objects.create(
+                id='benchmark_%d' % (time.time(),),
+                name='Judging benchmark',
+                controller_name='oioioi.programs.controllers.'
+                    'ProgrammingContestController')
+        round = Round.objects.create(contest=contest, name='Round',
+                start_date=timezone.now())
+        self.users = [User.objects.create(
+                username='%s_%d' % (contest.id[-20:], i))
+            for i in xrange(options['users'])]
+
+        self.problem_instances = []
+        for i in xrange(options['problems']):
+            problem = Problem.objects.create(name='Problem %d' % (i,),
+                    short_name='p%d' % (i,), contest=contest,
+                    controller_name='oioioi.programs.controllers.'
+                        'ProgrammingProblemController')
+            for j in xrange(options['tests']):
+                test = Test(problem=problem, name='%d' % (j,),
+                        kind=j and 'NORMAL' or 'EXAMPLE', group='%d' % (j,),
+                        time_limit=1000, memory_limit=65536,
+                        max_score=j and 10 or 0, order=j)
+                test.input_file.save('%d.in' % (j,),
+                        ContentFile('%d %d\n' % (i, j)), save=False)
+                test.output_file.save('%d.out' % (j,),
+                        ContentFile('%d\n' % (i + j,)), save=False)
+                test.save()
+            self.problem_instances.append(ProblemInstance.objects.create(
+                    contest=contest, round=round, problem=problem))
+        return contest
+
+    def _delete_contest(self, contest):
+        contest.delete()
+        User.objects.filter(id__in=[user.id for user in self.users]) \
+                .delete()
+
+    def _judge(self, i):
+        reset_queries()
+        start_time = time.time()
+        submission = ProgramSubmission(
+                problem_instance=self.problem_instances[
+                    i % len(self.problem_instances)],
+                user=self.users[i % len(self.users)])
+        submission.source_file.save('%d.cpp' % (i,), ContentFile(SOURCE),
+                save=False)
+        submission.save()
+        phases = [('submit', time.time() - start_time,
+            len(connection.queries))]
+
+        reset_queries()
+        start_time = time.time()
+        env = submission.problem_instance.contest.controller \
+                .judge(submission).get()
+        duration = time.time() - start_time
+        timings = env.get('phase_timings', [])
+        phases.append(('prepare',
+            duration - sum(timing[1] for timing in timings),
+            len(connection.queries) - sum(timing[2] for timing in timings)))
+        phases.extend(timings)
+        return phases
+
+    def _summarize(self, results, duration, options):
+        names = []
+        durations = {}
+        queries = {}
+        for phases in results:
+            # Phases run more than once in an evaluation are summed up.
+            submission_durations = {}
+            submission_queries = {}
+            for name, phase_duration, phase_queries in phases:
+                if name not in durations:
+                    names.append(name)
+                    durations[name] = []
+                    queries[name] = []
+                submission_durations[name] = \
+                        submission_durations.get(name, 0) + phase_duration
+                submission_queries[name] = \
+                        submission_queries.get(name, 0) + phase_queries
+            for name in submission_durations:
+                durations[name].append(submission_durations[name] * 1000)
+                queries[name].append(submission_queries[name])
+
+        all_queries = sum(sum(phase[2] for phase in phases)
+                for phases in results)
+        return {
+            'options': dict((key, options[key]) for key in ('submissions',
+                'problems', 'tests', 'users', 'compile_latency',
+                'exec_latency', 'seed')),
+            'duration': duration,
+            'throughput': len(results) / duration,
+            'queries_per_submission': float(all_queries) / len(results),
+            'phases': [{
+                'name': name,
+                'p50': _percentile(durations[name], 50),
+                'p90': _percentile(durations[name], 90),
+                'p99': _percentile(durations[name], 99),
+                'max': max(durations[name]),
+                'queries': float(sum(queries[name])) / len(queries[name]),
+            } for name in names],
+        }
+
+    def _print_summary(self, summary, baseline=None):
+        def compare(value, key, phase=None):
+            if baseline is None:
+                return ''
+            if phase is None:
+                old = baseline.get(key)
+            else:
+                old = dict((p['name'], p) for p in baseline['phases']) \
+                        .get(phase, {}).get(key)
+            if not old:
+                return ''
+            return ' (%+.1f%%)' % ((value - old) * 100. / old,)
+
+        self.stdout.write(_("Judged %(count)d submissions in %(duration).2f "
+            "s\n") % {'count': summary['options']['submissions'],
+                'duration': summary['duration']})
+        self.stdout.write(_("Throughput: %.2f submissions/s") %
+                (summary['throughput'],) +
+                compare(summary['throughput'], 'throughput') + '\n')
+        self.stdout.write(_("Queries per submission: %.1f") %
+                (summary['queries_per_submission'],) +
+                compare(summary['queries_per_submission'],
+                    'queries_per_submission') + '\n\n')
+        self.stdout.write('%-32s %10s %10s %10s %10s %8s\n' % (_("Phase"),
+            'p50 [ms]', 'p90 [ms]', 'p99 [ms]', 'max [ms]', _("Queries")))
+        for phase in summary['phases']:
+            self.stdout.write('%-32s %10.2f %10.2f %10.2f %10.2f %8.1f' % (
+                phase['name'], phase['p50'], phase['p90'], phase['p99'],
+                phase['max'], phase['queries']) +
+                compare(phase['p50'], 'p50', phase['name']) + '\n')
+
+    def handle(self, *args, **options):
+        if args:
+            raise CommandError(_("Expected no arguments"))
+        if min(options['submissions'], options['problems'],
+                options['users']) < 1:
+            raise CommandError(_("The numbers of submissions, problems and "
+                "users must be positive"))
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        latency = {
+            'compile': _parse_latency(options['compile_latency']),
+            'exec': _parse_latency(options['exec_latency']),
+        }
+
+        SimulatedBackend.seed(options['seed'])
+        # Evaluation runs in this process, so that its results and
+        # database queries can be collected.
+        evalmgr_job.app.conf.CELERY_ALWAYS_EAGER = True
+        use_debug_cursor = connection.use_debug_cursor
+        connection.use_debug_cursor = True
+
+        with override_settings(
+                SIOWORKERS_BACKEND='oioioi.sioworkers.backends.'
+                    'SimulatedBackend',
+                SIMULATED_SIOWORKERS_LATENCY=latency,
+                EVALMGR_MEASURE_PHASES=True,
+                MAIL_ADMINS_ON_GRADING_ERROR=False):
+            contest = self._create_contest(options)
+            try:
+                start_time = time.time()
+                results = [self._judge(i)
+                        for i in xrange(options['submissions'])]
+                duration = time.time() - start_time
+            finally:
+                connection.use_debug_cursor = use_debug_cursor
+                if not options['keep']:
+                    self._delete_contest(contest)
+
+        summary = self._summarize(results, duration, options)
+        if baseline and baseline['options'] != summary['options']:
+            self.stdout.write(_("Warning: the baseline was measured with "
+                "different options\n"))
+        self._print_summary(summary, baseline)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(summary, f, indent=4)
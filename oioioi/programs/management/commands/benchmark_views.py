@@ -0,0 +1,205 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import reverse, NoReverseMatch
+from django.db import connection, reset_queries
+from django.test.client import Client
+from django.test.utils import override_settings
+from django.utils.translation import ugettext as _
+from oioioi.contests.models import Contest
+from oioioi.programs.models import Test
+from optparse import make_option
+import json
+import time
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--admin', metavar='USERNAME', dest='admin',
+            default=None, help=_("Superuser viewing the admin pages "
+                "(<contest_id>_admin by default)")),
+        make_option('--user', metavar='USERNAME', dest='user',
+            default=None, help=_("Contestant viewing the contest pages "
+                "(<contest_id>_user0 by default)")),
+        make_option('--password', metavar='PASSWORD', dest='password',
+            default='benchmark', help=_("Password of both users")),
+        make_option('-n', '--repeat', metavar='N', dest='repeat',
+            type='int', default=3,
+            help=_("Number of measured requests of every page")),
+        make_option('-o', '--output', metavar='FILE', dest='output',
+            default=None, help=_("Write the results to FILE in the JSON "
+                "format")),
+        make_option('-b', '--baseline', metavar='FILE', dest='baseline',
+            default=None, help=_("Compare the results with the ones "
+                "written earlier with --output to FILE and fail if any page "
+                "makes more database queries")),
+        make_option('--max-queries', metavar='N', dest='max_queries',
+            type='int', default=None,
+            help=_("Fail if any page makes more than N database queries")),
+    )
+
+    args = _("<contest_id>")
+    help = _("Measures the time of rendering and the number of database "
+             "queries of the most frequently visited pages of <contest_id>: "
+             "the ranking, the dashboard, the list of messages, the "
+             "submissions in the admin panel and the reports. Every page is "
+             "measured with a cold cache, which is cleared before the "
+             "request, and then with a warm one. Meant to be run on "
+             "a contest created by the generate_contest command, as it "
+             "clears the whole cache. Pages of apps which are not installed "
+             "are skipped.")
+
+    requires_model_validation = True
+
+    def _oireports_data(self, contest):
+        data = {'report_round': 'all', 'report_region': 'all',
+                'form_type': 'xml_report'}
+        for test in Test.objects.filter(problem__contest=contest) \
+                .select_related('problem'):
+            data.setdefault('testgroup[%s]' % (test.problem.short_name,),
+                    []).append(test.group)
+        return data
+
+    def _pages(self, contest):
+        """Returns a list of tuples (name, url name, is admin, data)."""
+        return [
+            ('ranking', 'default_ranking', False, None),
+            ('ranking_admin', 'default_ranking', True, None),
+            ('ranking_csv', 'ranking_csv', True, None),
+            ('dashboard', 'contest_dashboard', False, None),
+            ('messages', 'contest_messages', False, None),
+            ('messages_admin', 'contest_messages', True, None),
+            ('submissions_admin',
+                'oioioiadmin:contests_submission_changelist', True, None),
+            ('oireports', 'oireports', True, None),
+            ('oireports_xml', 'oireports', True,
+                self._oireports_data(contest)),
+        ]
+
+    def _url(self, url_name, contest):
+        if url_name.startswith('oioioiadmin:'):
+            return reverse(url_name)
+        kwargs = {'contest_id': contest.id}
+        if url_name == 'ranking_csv':
+            kwargs['key'] = 'c'
+        return reverse(url_name, kwargs=kwargs)
+
+    def _request(self, client, url, data):
+        reset_queries()
+        start_time = time.time()
+        if data is None:
+            response = client.get(url)
+        else:
+            response = client.post(url, data)
+        # Streamed responses are rendered while being read.
+        content = ''.join(response)
+        duration = time.time() - start_time
+        if response.status_code != 200:
+            raise CommandError(_("%(url)s returned status %(status)d") %
+                    {'url': url, 'status': response.status_code})
+        return duration * 1000, len(connection.queries), len(content)
+
+    def _login(self, username, password):
+        client = Client()
+        if not client.login(username=username, password=password):
+            raise CommandError(_("Cannot log in as %s") % (username,))
+        return client
+
+    def _measure(self, contest, options):
+        admin_client = self._login(options['admin'] or
+                '%s_admin' % (contest.id,), options['password'])
+        user_client = self._login(options['user'] or
+                '%s_user0' % (contest.id,), options['password'])
+
+        results = []
+        for name, url_name, is_admin, data in self._pages(contest):
+            try:
+                url = self._url(url_name, contest)
+            except NoReverseMatch:
+                continue
+            client = is_admin and admin_client or user_client
+            # The first request activates the contest.
+            self._request(client, url, data)
+            cold = []
+            warm = []
+            for _i in xrange(options['repeat']):
+                # Pages served from the cache would hide the queries made
+                # when rendering them.
+                cache.clear()
+                cold.append(self._request(client, url, data))
+                warm.append(self._request(client, url, data))
+            durations = sorted(m[0] for m in cold)
+            warm_durations = sorted(m[0] for m in warm)
+            results.append({
+                'name': name,
+                'url': url,
+                'min': durations[0],
+                'median': durations[len(durations) // 2],
+                'queries': max(m[1] for m in cold),
+                'warm_min': warm_durations[0],
+                'warm_median': warm_durations[len(warm_durations) // 2],
+                'warm_queries': max(m[1] for m in warm),
+                'size': cold[-1][2],
+            })
+        return results
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError(_("Expected one argument"))
+        try:
+            contest = Contest.objects.get(id=args[0])
+        except Contest.DoesNotExist:
+            raise CommandError(_("Contest %s does not exist") % args[0])
+        if options['repeat'] < 1:
+            raise CommandError(_("The number of requests must be positive"))
+
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = dict((page['name'], page)
+                        for page in json.load(f)['pages'])
+
+        use_debug_cursor = connection.use_debug_cursor
+        connection.use_debug_cursor = True
+        try:
+            with override_settings(ALLOWED_HOSTS=['*']):
+                results = self._measure(contest, options)
+        finally:
+            connection.use_debug_cursor = use_debug_cursor
+
+        self.stdout.write('%-20s %12s %12s %8s %12s %8s %10s\n' % (_("Page"),
+            'min [ms]', 'median [ms]', _("Queries"), 'warm [ms]',
+            _("Warm"), _("Size")))
+        errors = []
+        for page in results:
+            line = '%-20s %12.1f %12.1f %8d %12.1f %8d %10d' % (page['name'],
+                    page['min'], page['median'], page['queries'],
+                    page['warm_median'], page['warm_queries'], page['size'])
+            old = baseline.get(page['name'])
+            if old:
+                line += ' (%+.1f%%, %+d %s)' % (
+                        (page['median'] - old['median']) * 100.
+                            / max(old['median'], 1),
+                        page['queries'] - old['queries'], _("queries"))
+                if page['queries'] > old['queries']:
+                    errors.append(_("%(page)s makes %(new)d queries instead "
+                        "of %(old)d") % {'page': page['name'],
+                            'new': page['queries'], 'old': old['queries']})
+                if 'warm_queries' in old and \
+                        page['warm_queries'] > old['warm_queries']:
+                    errors.append(_("%(page)s makes %(new)d queries instead "
+                        "of %(old)d with a warm cache") % {
+                            'page': page['name'], 'new': page['warm_queries'],
+                            'old': old['warm_queries']})
+            if options['max_queries'] is not None and \
+                    page['queries'] > options['max_queries']:
+                errors.append(_("%(page)s makes %(new)d queries") %
+                        {'page': page['name'], 'new': page['queries']})
+            self.stdout.write(line + '\n')
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'contest': contest.id, 'pages': results}, f,
+                        indent=4)
+
+        if errors:
+            raise CommandError('\n'.join(errors))
@@ -0,0 +1,291 @@
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import ugettext as _
+from oioioi.contests.models import Contest, Round, ProblemInstance, \
+        SubmissionReport, ScoreReport, UserResultForProblem, \
+        UserResultForRound, UserResultForContest
+from oioioi.contests.scores import IntegerScore
+from oioioi.problems.models import Problem
+from oioioi.programs.models import Test, ProgramSubmission, CompilationReport, \
+        TestReport, GroupReport
+from oioioi.questions.models import Message
+from optparse import make_option
+from datetime import timedelta
+import random
+
+FIRST_NAMES = ['Adam', 'Anna', 'Jan', 'Maria', 'Piotr', 'Katarzyna',
+        'Tomasz', 'Agnieszka', 'Marcin', 'Ewa', 'Jakub', 'Zofia']
+LAST_NAMES = ['Nowak', 'Kowalski', 'Wisniewski', 'Wojcik', 'Kowalczyk',
+        'Kaminski', 'Lewandowski', 'Zielinski', 'Szymanski', 'Wozniak']
+FAILURE_STATUSES = ['WA', 'TLE', 'RE']
+SOURCE = '#include <cstdio>\nint main() { int a, b; scanf("%d%d", &a, &b); ' \
+        'printf("%d\\n", a + b); }\n'
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('-u', '--users', metavar='N', dest='users', type='int',
+            default=1000, help=_("Number of contestants")),
+        make_option('-r', '--rounds', metavar='N', dest='rounds',
+            type='int', default=3, help=_("Number of rounds")),
+        make_option('-p', '--problems', metavar='N', dest='problems',
+            type='int', default=3, help=_("Number of problems in a round")),
+        make_option('-t', '--tests', metavar='N', dest='tests', type='int',
+            default=10, help=_("Number of tests of a problem")),
+        make_option('-s', '--submissions', metavar='N', dest='submissions',
+            type='int', default=3,
+            help=_("Number of submissions of a user to a problem")),
+        make_option('-m', '--messages', metavar='N', dest='messages',
+            type='int', default=200,
+            help=_("Number of questions, half of them answered")),
+        make_option('--controller', metavar='NAME', dest='controller',
+            default='oioioi.programs.controllers.'
+                'ProgrammingContestController',
+            help=_("Contest controller of the generated contest")),
+        make_option('--password', metavar='PASSWORD', dest='password',
+            default='benchmark',
+            help=_("Password of the generated users")),
+        make_option('--seed', metavar='N', dest='seed', type='int',
+            default=0, help=_("Seed of the generated data")),
+    )
+
+    args = _("<contest_id>")
+    help = _("Generates a large contest <contest_id> with users, rounds, "
+             "problems, judged submissions with their reports, results and "
+             "messages, for testing the performance of the views. The users "
+             "are named <contest_id>_user<number>, with the same password, "
+             "and <contest_id>_admin is a superuser. If the participants "
+             "app is installed, the users are also registered as "
+             "participants. No evaluation is run; the reports are made up.")
+
+    requires_model_validation = True
+
+    def _create_users(self, contest, count, password):
+        password = make_password(password)
+        admin = User.objects.create(username='%s_admin' % (contest.id,),
+                password=password, is_staff=True, is_superuser=True)
+        users = []
+        for i in xrange(count):
+            users.append(User.objects.create(
+                username='%s_user%d' % (contest.id, i),
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=self.random.choice(LAST_NAMES),
+                password=password))
+        if 'oioioi.participants' in settings.INSTALLED_APPS:
+            from oioioi.participants.models import Participant
+            Participant.objects.bulk_create([Participant(contest=contest,
+                user=user) for user in users])
+        return admin, users
+
+    def _create_problems(self, contest, options):
+        start_date = timezone.now() - timedelta(days=2 * options['rounds'])
+        problem_instances = []
+        for i in xrange(options['rounds']):
+            round = Round.objects.create(contest=contest,
+                    name='Round %d' % (i + 1,),
+                    start_date=start_date + timedelta(days=2 * i),
+                    end_date=start_date + timedelta(days=2 * i + 1),
+                    results_date=start_date + timedelta(days=2 * i + 1))
+            for j in xrange(options['problems']):
+                short_name = 'r%dp%d' % (i + 1, j + 1)
+                problem = Problem.objects.create(
+                        name='Problem %s' % (short_name,),
+                        short_name=short_name, contest=contest,
+                        controller_name='oioioi.programs.controllers.'
+                            'ProgrammingProblemController')
+                for k in xrange(options['tests']):
+                    test = Test(problem=problem, name=str(k), group=str(k),
+                            kind=k and 'NORMAL' or 'EXAMPLE',
+                            time_limit=1000, memory_limit=65536,
+                            max_score=k and 10 or 0, order=k)
+                    test.input_file.save('%s%d.in' % (short_name, k),
+                            ContentFile('%d %d\n' % (j, k)), save=False)
+                    test.output_file.save('%s%d.out' % (short_name, k),
+                            ContentFile('%d\n' % (j + k,)), save=False)
+                    test.save()
+                problem_instances.append(ProblemInstance.objects.create(
+                        contest=contest, round=round, problem=problem))
+        return problem_instances
+
+    def _judge(self, skill, tests):
+        """Makes up the results of tests for a contestant with the given
+           probability of passing a test.
+        """
+        results = []
+        for test in tests:
+            if self.random.random() < skill:
+                status = 'OK'
+                score = test.max_score
+                time_used = self.random.randint(0, test.time_limit // 2)
+            else:
+                status = self.random.choice(FAILURE_STATUSES)
+                score = 0
+                time_used = status == 'TLE' and test.time_limit or \
+                        self.random.randint(0, test.time_limit)
+            results.append((test, status, score, time_used))
+        return results
+
+    def _create_submissions(self, users, problem_instances, source_file,
+            count):
+        tests = dict((pi.id, list(Test.objects.filter(problem=pi.problem)
+            .order_by('order'))) for pi in problem_instances)
+
+        submissions = []
+        for user in users:
+            skill = self.random.random()
+            for pi in problem_instances:
+                round = pi.round
+                for _i in xrange(self.random.randint(0, count)):
+                    results = self._judge(skill, tests[pi.id])
+                    score = sum(result[2] for result in results)
+                    statuses = [result[1] for result in results
+                            if result[1] != 'OK']
+                    submission = ProgramSubmission(problem_instance=pi,
+                            user=user, score=IntegerScore(score),
+                            status=statuses and statuses[0] or 'OK',
+                            date=round.start_date + timedelta(
+                                seconds=self.random.randint(0, 86399)))
+                    submission.source_file = source_file
+                    submission.save()
+                    submissions.append((submission, results))
+
+        reports = [SubmissionReport(submission=submission, kind='NORMAL',
+            status='ACTIVE') for submission, _results in submissions]
+        SubmissionReport.objects.bulk_create(reports)
+        report_ids = dict(SubmissionReport.objects
+                .filter(submission__in=[s for s, _r in submissions])
+                .values_list('submission', 'id'))
+
+        score_reports = []
+        compilation_reports = []
+        test_reports = []
+        group_reports = []
+        for submission, results in submissions:
+            report_id = report_ids[submission.id]
+            submission.report_id = report_id
+            score_reports.append(ScoreReport(submission_report_id=report_id,
+                status=submission.status, score=submission.score))
+            compilation_reports.append(CompilationReport(
+                submission_report_id=report_id, status='OK',
+                compiler_output=''))
+            for test, status, score, time_used in results:
+                test_reports.append(TestReport(
+                    submission_report_id=report_id, status=status,
+                    comment=status != 'OK' and 'failed' or '',
+                    score=IntegerScore(score), time_used=time_used,
+                    test=test, test_name=test.name, test_group=test.group,
+                    test_time_limit=test.time_limit,
+                    test_max_score=test.max_score))
+                group_reports.append(GroupReport(
+                    submission_report_id=report_id, group=test.group,
+                    score=IntegerScore(score), status=status))
+        ScoreReport.objects.bulk_create(score_reports)
+        CompilationReport.objects.bulk_create(compilation_reports)
+        TestReport.objects.bulk_create(test_reports, batch_size=500)
+        GroupReport.objects.bulk_create(group_reports, batch_size=500)
+        return [submission for submission, _results in submissions]
+
+    def _create_results(self, contest, submissions):
+        # The last submission counts, as in OI.
+        latest = {}
+        for submission in submissions:
+            key = (submission.user_id, submission.problem_instance)
+            if key not in latest or latest[key].date < submission.date:
+                latest[key] = submission
+
+        round_scores = {}
+        contest_scores = {}
+        problem_results = []
+        for (user_id, pi), submission in latest.iteritems():
+            problem_results.append(UserResultForProblem(user_id=user_id,
+                problem_instance=pi, score=submission.score,
+                status=submission.status,
+                submission_report_id=submission.report_id))
+            key = (user_id, pi.round_id)
+            round_scores[key] = round_scores.get(key, 0) + \
+                    submission.score.value
+            contest_scores[user_id] = contest_scores.get(user_id, 0) + \
+                    submission.score.value
+        UserResultForProblem.objects.bulk_create(problem_results,
+                batch_size=500)
+        UserResultForRound.objects.bulk_create([UserResultForRound(
+            user_id=user_id, round_id=round_id, score=IntegerScore(score))
+            for (user_id, round_id), score in round_scores.iteritems()],
+            batch_size=500)
+        UserResultForContest.objects.bulk_create([UserResultForContest(
+            user_id=user_id, contest=contest, score=IntegerScore(score))
+            for user_id, score in contest_scores.iteritems()],
+            batch_size=500)
+
+    def _create_messages(self, contest, admin, users, problem_instances,
+            count):
+        questions = []
+        for _i in xrange(count):
+            pi = self.random.choice(problem_instances)
+            questions.append(Message(contest=contest, round=pi.round,
+                problem_instance=pi, author=self.random.choice(users),
+                kind='QUESTION', topic='Question about %s' % (pi.short_name,),
+                content='Is the input correct?',
+                date=pi.round.start_date + timedelta(
+                    seconds=self.random.randint(0, 86399))))
+        Message.objects.bulk_create(questions, batch_size=500)
+
+        answered = Message.objects.filter(contest=contest, kind='QUESTION') \
+                .order_by('id')[:count // 2]
+        Message.objects.bulk_create([Message(contest=contest,
+            round_id=question.round_id,
+            problem_instance_id=question.problem_instance_id,
+            top_reference=question, author=admin, kind='PRIVATE',
+            topic='Re: ' + question.topic, content='Yes.',
+            date=question.date + timedelta(minutes=10))
+            for question in answered], batch_size=500)
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError(_("Expected one argument"))
+        contest_id = args[0]
+        if Contest.objects.filter(id=contest_id).exists():
+            raise CommandError(_("Contest %s already exists") % contest_id)
+        if min(options['users'], options['rounds'],
+                options['problems'], options['tests']) < 1:
+            raise CommandError(_("The numbers of users, rounds, problems "
+                "and tests must be positive"))
+
+        self.random = random.Random(options['seed'])
+        with transaction.commit_on_success():
+            contest = Contest.objects.create(id=contest_id,
+                    name='Generated contest %s' % (contest_id,),
+                    controller_name=options['controller'])
+            admin, users = self._create_users(contest, options['users'],
+                    options['password'])
+            problem_instances = self._create_problems(contest, options)
+            # All the submissions share one source file.
+            source_file = default_storage.save(
+                    'submissions/%s/solution.cpp' % (contest.id,),
+                    ContentFile(SOURCE))
+
+        submissions = []
+        chunk_size = 100
+        for i in xrange(0, len(users), chunk_size):
+            with transaction.commit_on_success():
+                submissions.extend(self._create_submissions(
+                    users[i:i + chunk_size], problem_instances, source_file,
+                    options['submissions']))
+            self.stdout.write(_("Created submissions of %d users\n")
+                    % (min(i + chunk_size, len(users)),))
+
+        with transaction.commit_on_success():
+            self._create_results(contest, submissions)
+            self._create_messages(contest, admin, users, problem_instances,
+                    options['messages'])
+
+        self.stdout.write(_("Created contest %(contest)s with %(users)d "
+            "users and %(submissions)d submissions\n") % {
+                'contest': contest.id, 'users': len(users),
+                'submissions': len(submissions)})
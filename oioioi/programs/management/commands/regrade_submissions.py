@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import ugettext as _
+from oioioi.contests.models import Contest, Submission
+from oioioi.programs.regrade import regrade_submissions
+from optparse import make_option
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('-p', '--problem', metavar='SHORT_NAME',
+            dest='problem', default=None,
+            help=_("Regrade only the submissions to the problem with the "
+                "given short name")),
+        make_option('-b', '--batch-size', metavar='N', dest='batch_size',
+            type='int', default=500,
+            help=_("Number of submissions regraded in one transaction")),
+    )
+
+    args = _("<contest_id>")
+    help = _("Recomputes scores of the submissions in <contest_id> from "
+             "the already reported results of tests, without running them "
+             "again. Useful after changing only the scoring rules.")
+
+    requires_model_validation = True
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError(_("Expected one argument"))
+
+        try:
+            contest = Contest.objects.get(id=args[0])
+        except Contest.DoesNotExist:
+            raise CommandError(_("Contest %s does not exist") % args[0])
+
+        submissions = Submission.objects \
+                .filter(problem_instance__contest=contest)
+        if options['problem']:
+            submissions = submissions.filter(
+                    problem_instance__problem__short_name=options['problem'])
+
+        count = regrade_submissions(submissions,
+                batch_size=options['batch_size'])
+        self.stdout.write(_("Regraded %d submissions\n") % (count,))
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models, transaction
+from django.db.models import F
 from django.utils.translation import ugettext_lazy as _
 from django.dispatch import receiver
 from django.db.models.signals import post_save
@@ -8,7 +10,10 @@ from oioioi.filetracker.fields import FileField
 from oioioi.contests.models import Submission, SubmissionReport, \
         submission_statuses, submission_report_kinds, ProblemInstance
 from oioioi.contests.fields import ScoreField
+from oioioi.contests.scores import IntegerScore
 
+import hashlib
+import json
 import os.path
 
 test_kinds = EnumRegistry()
@@ -60,24 +65,85 @@ model_solution_kinds.register('SLOW', _("Slow solution"))
 model_solution_kinds.register('INCORRECT', _("Incorrect solution"))
 
 
+def _model_solution_fingerprint(model_solution, tests_fingerprint):
+    return hashlib.sha1(repr((model_solution.id,
+        model_solution.source_file.name, tests_fingerprint))).hexdigest()
+
+
+def _tests_fingerprint(problem):
+    checker = OutputChecker.objects.filter(problem=problem) \
+            .values_list('exe_file', flat=True)
+    tests = Test.objects.filter(problem=problem).order_by('id') \
+            .values_list('id', 'name', 'kind', 'group', 'input_file',
+                'output_file', 'time_limit', 'memory_limit', 'max_score')
+    return repr((list(checker), list(tests)))
+
+
 class ModelSolutionsManager(models.Manager):
-    def recreate_model_submissions(self, problem_instance):
-        with transaction.commit_on_success():
-            for model_submission in ModelProgramSubmission.objects.filter(
-                    problem_instance=problem_instance):
-                model_submission.delete()
+    def recreate_model_submissions(self, problem_instance, force=True):
+        """Creates and judges model submissions of ``problem_instance``.
+
+           Unless ``force`` is set, only the model solutions whose source,
+           tests or checker changed since they were last judged are judged
+           again.
+
+           :returns: the number of submissions sent for evaluation
+        """
         if not problem_instance.round:
-            return
-        controller = problem_instance.contest.controller
-        for model_solution in self.filter(problem=problem_instance.problem):
             with transaction.commit_on_success():
+                ModelProgramSubmission.objects \
+                        .filter(problem_instance=problem_instance).delete()
+            return 0
+
+        tests_fingerprint = _tests_fingerprint(problem_instance.problem)
+        existing = dict((s.model_solution_id, s) for s
+                in ModelProgramSubmission.objects
+                    .filter(problem_instance=problem_instance))
+        submissions = []
+        with transaction.commit_on_success():
+            for model_solution in self.filter(
+                    problem=problem_instance.problem):
+                fingerprint = _model_solution_fingerprint(model_solution,
+                        tests_fingerprint)
+                old_submission = existing.get(model_solution.id)
+                if old_submission is not None:
+                    if not force and old_submission.fingerprint == fingerprint:
+                        continue
+                    old_submission.delete()
                 submission = ModelProgramSubmission(
                         model_solution=model_solution,
                         problem_instance=problem_instance,
                         source_file=model_solution.source_file,
+                        fingerprint=fingerprint,
                         kind='IGNORED')
                 submission.save()
+                submissions.append(submission)
+
+        controller = problem_instance.contest.controller
+        for submission in submissions:
             controller.judge(submission)
+        return len(submissions)
+
+    def schedule_model_submissions(self, problem_instance, force=False):
+        """Schedules :meth:`recreate_model_submissions` of
+           ``problem_instance`` in ``settings.MODEL_SOLUTIONS_DELAY``
+           seconds.
+
+           Each call postpones the evaluation scheduled before, so that
+           a burst of changes of a problem results in a single evaluation.
+        """
+        from oioioi.programs.tasks import evaluate_model_solutions
+        evaluation, _created = ModelSolutionsEvaluation.objects \
+                .get_or_create(problem_instance=problem_instance)
+        update = {'token': F('token') + 1}
+        if force:
+            update['force'] = True
+        ModelSolutionsEvaluation.objects.filter(id=evaluation.id) \
+                .update(**update)
+        token = ModelSolutionsEvaluation.objects.filter(id=evaluation.id) \
+                .values_list('token', flat=True).get()
+        evaluate_model_solutions.apply_async((problem_instance.id, token),
+                countdown=settings.MODEL_SOLUTIONS_DELAY)
 
 
 class ModelSolution(models.Model):
@@ -98,7 +164,7 @@ class ModelSolution(models.Model):
 def _autocreate_model_submissions_for_problem_instance(sender, instance,
         created, raw, **kwargs):
     if not raw:
-        ModelSolution.objects.recreate_model_submissions(instance)
+        ModelSolution.objects.schedule_model_submissions(instance)
 
 
 @receiver(post_save, sender=ModelSolution)
@@ -107,7 +173,7 @@ def _autocreate_model_submissions_for_model_solutions(sender, instance,
     if created and not raw:
         pis = ProblemInstance.objects.filter(problem=instance.problem)
         for pi in pis:
-            ModelSolution.objects.recreate_model_submissions(pi)
+            ModelSolution.objects.schedule_model_submissions(pi)
 
 
 def make_submission_filename(instance, filename):
@@ -123,6 +189,21 @@ class ProgramSubmission(Submission):
 
 class ModelProgramSubmission(ProgramSubmission):
     model_solution = models.ForeignKey(ModelSolution)
+    # Identifies the source, tests and checker the submission was judged
+    # with.
+    fingerprint = models.CharField(max_length=40, blank=True)
+
+
+class ModelSolutionsEvaluation(models.Model):
+    """A scheduled evaluation of model solutions of a problem instance.
+
+       ``token`` is increased whenever the evaluation is postponed,
+       so that only the last scheduled task runs it.
+    """
+    problem_instance = models.OneToOneField(ProblemInstance,
+            related_name='model_solutions_evaluation')
+    token = models.IntegerField(default=0)
+    force = models.BooleanField(default=False)
 
 submission_statuses.register('CE', _("Compilation failed"))
 submission_statuses.register('RE', _("Runtime error"))
@@ -160,6 +241,7 @@ class TestReport(models.Model):
     test_group = models.CharField(max_length=30)
     test_time_limit = models.IntegerField(null=True, blank=True)
     test_max_score = models.IntegerField(null=True, blank=True)
+    reused = models.BooleanField(default=False)
 
 
 class GroupReport(models.Model):
@@ -167,3 +249,68 @@ class GroupReport(models.Model):
     group = models.CharField(max_length=30)
     score = ScoreField()
     status = EnumField(submission_statuses)
+
+
+class CachedTestResult(models.Model):
+    """Result of running an executable on a single test.
+
+       Used by :func:`~oioioi.programs.handlers.run_tests` to avoid running
+       the same binary on the same test again, see
+       :func:`~oioioi.programs.handlers.test_result_cache_key`.
+    """
+    key = models.CharField(max_length=40, primary_key=True)
+    result = models.TextField()
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+
+class ModelSolutionResultsManager(models.Manager):
+    def update_for_submission(self, submission):
+        """Stores the results of the active reports of the given
+           :class:`ModelProgramSubmission`. Does nothing if ``submission``
+           is not a model submission.
+        """
+        if not ModelProgramSubmission.objects.filter(id=submission.id) \
+                .exists():
+            return
+        score_field = TestReport._meta.get_field('score')
+        results = []
+        for test_id, status, time_used, score, max_score in TestReport \
+                .objects.filter(submission_report__submission=submission.id,
+                    submission_report__status='ACTIVE',
+                    submission_report__kind__in=['INITIAL', 'NORMAL',
+                        'HIDDEN'],
+                    test__isnull=False) \
+                .values_list('test', 'status', 'time_used', 'score',
+                    'test_max_score'):
+            score = score_field.to_python(score)
+            partial = isinstance(score, IntegerScore) and \
+                    score.value != max_score
+            results.append([test_id, status, time_used,
+                score is not None and unicode(score) or None, partial])
+        column, _created = self.get_or_create(submission_id=submission.id,
+                defaults={'results': '[]'})
+        column.results = json.dumps(results)
+        column.save()
+
+
+class ModelSolutionResults(models.Model):
+    """Results of a model submission on all tests, i.e. a column of
+       the model solutions matrix of a problem instance.
+
+       They are stored as a JSON list of ``[test_id, status, time_used,
+       score, is_partial_score]`` entries and updated whenever the score
+       of the submission is, so that the matrix is read without touching
+       the reports.
+    """
+    objects = ModelSolutionResultsManager()
+
+    submission = models.OneToOneField(ModelProgramSubmission,
+            related_name='results')
+    results = models.TextField()
+
+    def get_results(self):
+        """Returns a dict mapping test ids to ``(status, time_used, score,
+           is_partial_score)`` tuples.
+        """
+        return dict((entry[0], tuple(entry[1:]))
+                for entry in json.loads(self.results))
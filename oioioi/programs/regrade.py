@@ -0,0 +1,174 @@
+"""Recomputing scores of program submissions without running them again.
+
+   This is useful when only the scoring functions (``test_scorer``,
+   ``group_scorer`` or ``score_aggregator``) have changed. The results of
+   tests are taken from the active
+   :class:`~oioioi.programs.models.TestReport`\ s, so a submission is
+   regraded in the same way it would be by
+   :meth:`~oioioi.contests.controllers.ContestController.judge`, except
+   that the test statuses are those already reported (e.g. a test scored
+   as ``TLE`` by
+   :func:`~oioioi.programs.utils.threshold_linear_test_scorer` stays
+   ``TLE``).
+"""
+
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+
+from oioioi.contests.models import Submission, SubmissionReport, ScoreReport
+from oioioi.programs.handlers import grade_tests, grade_groups, \
+        grade_submission, _make_test_reports, _make_group_reports
+from oioioi.programs.models import CompilationReport, TestReport, \
+        GroupReport
+
+logger = logging.getLogger(__name__)
+
+# Maps kinds of reports to the kinds of tests passed to grade_submission,
+# as in ProgrammingProblemController.generate_recipe.
+REGRADED_REPORT_KINDS = {
+    'INITIAL': 'EXAMPLE',
+    'NORMAL': 'NORMAL',
+    'HIDDEN': None,
+}
+
+SCORING_ENVIRON_KEYS = ('test_scorer', 'group_scorer', 'score_aggregator')
+
+
+def _scoring_environ(submission):
+    environ = {'extra_args': {}}
+    submission.problem_instance.contest.controller \
+            .fill_evaluation_environ(environ, submission)
+    return dict((key, environ[key]) for key in SCORING_ENVIRON_KEYS
+            if key in environ)
+
+
+def _report_environ(scoring_environ, report, compilation, test_rows):
+    env = scoring_environ.copy()
+    env['submission_id'] = report.submission_id
+    env['compilation_result'], env['compilation_message'] = compilation
+    env['tests'] = {}
+    env['test_results'] = {}
+    for (test_id, test_kind, name, group, time_limit, max_score, status,
+            time_used, comment) in test_rows:
+        if test_kind is None:
+            test_kind = report.kind == 'INITIAL' and 'EXAMPLE' or 'NORMAL'
+        env['tests'][name] = {
+            'id': test_id,
+            'name': name,
+            'kind': test_kind,
+            'group': group,
+            'max_score': max_score,
+            'exec_time_limit': time_limit,
+        }
+        env['test_results'][name] = {
+            'result_code': status,
+            'result_string': comment,
+            'time_used': time_used,
+        }
+    return env
+
+
+@transaction.commit_on_success
+def _regrade_batch(submissions, scoring_environs):
+    submissions = dict((s.id, s) for s in submissions)
+    reports = list(SubmissionReport.objects
+            .filter(submission__in=submissions.keys(), status='ACTIVE',
+                kind__in=REGRADED_REPORT_KINDS.keys()))
+    report_ids = [r.id for r in reports]
+
+    compilations = dict((report_id, (status, message))
+            for report_id, status, message in CompilationReport.objects
+                .filter(submission_report__in=report_ids)
+                .values_list('submission_report', 'status',
+                    'compiler_output'))
+    test_rows = defaultdict(list)
+    for row in TestReport.objects.filter(submission_report__in=report_ids) \
+            .values_list('submission_report', 'test', 'test__kind',
+                'test_name', 'test_group', 'test_time_limit',
+                'test_max_score', 'status', 'time_used', 'comment'):
+        test_rows[row[0]].append(row[1:])
+
+    graded = []
+    for report in reports:
+        compilation = compilations.get(report.id)
+        # Nothing to regrade in submissions which did not compile.
+        if compilation is None or compilation[0] != 'OK':
+            continue
+        submission = submissions[report.submission_id]
+        pi_id = submission.problem_instance_id
+        if pi_id not in scoring_environs:
+            scoring_environs[pi_id] = _scoring_environ(submission)
+        env = _report_environ(scoring_environs[pi_id], report, compilation,
+                test_rows[report.id])
+        grade_tests(env)
+        grade_groups(env)
+        grade_submission(env, kind=REGRADED_REPORT_KINDS[report.kind])
+        graded.append((report, env))
+
+    score_reports = []
+    compilation_reports = []
+    test_reports = []
+    group_reports = []
+    for report, env in graded:
+        submission_report = SubmissionReport(
+                submission_id=report.submission_id, kind=report.kind,
+                status='ACTIVE')
+        submission_report.save()
+        score_reports.append(ScoreReport(submission_report=submission_report,
+                status=env['status'], score=env['score']))
+        compilation_reports.append(CompilationReport(
+                submission_report=submission_report,
+                status=env['compilation_result'],
+                compiler_output=env['compilation_message']))
+        test_reports.extend(test_report for _result, test_report
+                in _make_test_reports(env, submission_report))
+        group_reports.extend(group_report for _result, group_report
+                in _make_group_reports(env, submission_report))
+
+    SubmissionReport.objects.filter(id__in=[r.id for r, _env in graded]) \
+            .update(status='SUPERSEDED')
+    ScoreReport.objects.bulk_create(score_reports)
+    CompilationReport.objects.bulk_create(compilation_reports)
+    TestReport.objects.bulk_create(test_reports)
+    GroupReport.objects.bulk_create(group_reports)
+
+    regraded = [submissions[submission_id] for submission_id
+            in set(r.submission_id for r, _env in graded)]
+    for submission in regraded:
+        submission.problem_instance.contest.controller \
+                .update_submission_score(submission)
+    return regraded
+
+
+def regrade_submissions(submissions, batch_size=500):
+    """Recomputes scores of the given submissions from the results
+       of tests stored in their active reports.
+
+       New reports are created for the regraded ones, which become
+       superseded. Then submission scores and user results are updated,
+       one batch of ``batch_size`` submissions at a time.
+
+       :param submissions: a queryset of
+                           :class:`~oioioi.contests.models.Submission`\ s
+       :returns: the number of regraded submissions
+    """
+    ids = list(submissions.order_by('id').values_list('id', flat=True))
+    scoring_environs = {}
+    count = 0
+    for start in xrange(0, len(ids), batch_size):
+        batch = Submission.objects \
+                .filter(id__in=ids[start:start + batch_size]) \
+                .select_related('user', 'problem_instance__contest',
+                    'problem_instance__round')
+        regraded = _regrade_batch(batch, scoring_environs)
+        count += len(regraded)
+
+        user_results = dict(((s.user_id, s.problem_instance_id),
+                (s.user, s.problem_instance)) for s in regraded if s.user)
+        for user, problem_instance in user_results.itervalues():
+            problem_instance.contest.controller \
+                    .update_user_results(user, problem_instance)
+        logger.info("Regraded %d of %d submissions", count, len(ids))
+    return count
@@ -0,0 +1,44 @@
+import logging
+
+from celery.task import task
+from django.conf import settings
+
+from oioioi.contests.models import ProblemInstance
+from oioioi.programs.models import ModelSolution, ModelSolutionsEvaluation
+
+logger = logging.getLogger(__name__)
+
+
+@task(max_retries=10)
+def evaluate_model_solutions(problem_instance_id, token):
+    """Runs the evaluation of model solutions scheduled by
+       :meth:`~oioioi.programs.models.ModelSolutionsManager.schedule_model_submissions`,
+       unless it has been postponed since.
+    """
+    try:
+        evaluation = ModelSolutionsEvaluation.objects \
+                .select_related('problem_instance') \
+                .get(problem_instance=problem_instance_id, token=token)
+    except ModelSolutionsEvaluation.DoesNotExist, e:
+        if ModelSolutionsEvaluation.objects.filter(
+                problem_instance=problem_instance_id,
+                token__gt=token).exists():
+            # Postponed by a later change.
+            return
+        if not ProblemInstance.objects.filter(id=problem_instance_id) \
+                .exists():
+            return
+        # The transaction which scheduled the evaluation (e.g. processing
+        # a whole problem package) may be not committed yet.
+        raise evaluate_model_solutions.retry(exc=e,
+                countdown=settings.MODEL_SOLUTIONS_DELAY)
+
+    count = ModelSolution.objects.recreate_model_submissions(
+            evaluation.problem_instance, force=evaluation.force)
+    # Deleted only now, so that if creating the submissions fails, the
+    # evaluation is still shown as pending and runs when scheduled again.
+    # It is kept if it has been postponed in the meantime.
+    ModelSolutionsEvaluation.objects.filter(id=evaluation.id, token=token) \
+            .delete()
+    logger.info("Sent %d model solutions of problem instance %d for "
+            "evaluation", count, problem_instance_id)
@@ -1,13 +1,23 @@
+import json
+import tempfile
+from cStringIO import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.utils.html import strip_tags, escape
 from django.core.urlresolvers import reverse
 
 from oioioi.filetracker.tests import TestStreamingMixin
 from oioioi.programs import utils
 from oioioi.base.tests import check_not_accessible
-from oioioi.contests.models import Submission, ProblemInstance, Contest
+from oioioi.contests.models import Submission, ProblemInstance, Contest, \
+        SubmissionReport, UserResultForContest
 from oioioi.contests.tests import PrivateRegistrationController
-from oioioi.programs.models import Test, ModelSolution
+from oioioi.programs.models import Test, ModelSolution, TestReport, \
+        CachedTestResult, ModelSolutionResults, ModelProgramSubmission, \
+        ModelSolutionsEvaluation
+from oioioi.programs.tasks import evaluate_model_solutions
 from oioioi.programs.controllers import ProgrammingContestController
 from oioioi.sinolpack.tests import get_test_filename
 from oioioi.contests.scores import IntegerScore
@@ -103,6 +113,108 @@ class TestProgramsViews(TestCase, TestStreamingMixin):
         self.assertEqual(response.content.count('subm_status subm_CE'), 2)
         self.assertEqual(response.content.count('>10.00s<'), 5)
 
+    def test_model_solutions_export(self):
+        pi = ProblemInstance.objects.get()
+        ModelSolution.objects.recreate_model_submissions(pi)
+        self.assertEqual(ModelSolutionResults.objects.count(),
+                ModelSolution.objects.count())
+        self.client.login(username='test_admin')
+
+        url = reverse('oioioiadmin:contests_probleminstance_models_json',
+                args=(pi.id,))
+        data = json.loads(self.client.get(url).content)
+        self.assertEqual(len(data['submissions']),
+                ModelSolution.objects.count())
+        self.assertEqual(len(data['tests']), Test.objects.count())
+        statuses = [cell['status'] for test in data['tests']
+                for cell in test['results']]
+        for status in ['OK', 'WA']:
+            self.assertEqual(statuses.count(status), TestReport.objects
+                    .filter(status=status, submission_report__status='ACTIVE')
+                    .count())
+
+        url = reverse('oioioiadmin:contests_probleminstance_models_csv',
+                args=(pi.id,))
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(len(response.content.strip().splitlines()),
+                3 + Test.objects.count())
+
+        # Columns missing for old submissions are recomputed on display.
+        url = reverse('oioioiadmin:contests_probleminstance_models',
+                args=(pi.id,))
+        content = self.client.get(url).content
+        ModelSolutionResults.objects.all().delete()
+        self.assertEqual(self.client.get(url).content, content)
+        self.assertEqual(ModelSolutionResults.objects.count(),
+                ModelSolution.objects.count())
+
+    def test_model_solutions_evaluation(self):
+        pi = ProblemInstance.objects.get()
+        ModelSolution.objects.recreate_model_submissions(pi)
+
+        def submission_ids():
+            return set(ModelProgramSubmission.objects
+                    .values_list('id', flat=True))
+        ids = submission_ids()
+
+        # Unchanged solutions are not judged again.
+        pi.save()
+        self.assertEqual(submission_ids(), ids)
+        self.assertFalse(ModelSolutionsEvaluation.objects.exists())
+        self.assertEqual(ModelSolution.objects
+                .recreate_model_submissions(pi, force=False), 0)
+
+        test = Test.objects.filter(problem=pi.problem)[0]
+        test.time_limit += 1
+        test.save()
+        self.assertEqual(ModelSolution.objects
+                .recreate_model_submissions(pi, force=False), len(ids))
+        self.assertFalse(submission_ids() & ids)
+        ids = submission_ids()
+
+        # Only the last scheduled task runs the evaluation.
+        ModelSolutionsEvaluation.objects.create(problem_instance=pi,
+                token=2, force=True)
+        evaluate_model_solutions(pi.id, 1)
+        self.assertEqual(submission_ids(), ids)
+        evaluate_model_solutions(pi.id, 2)
+        self.assertFalse(submission_ids() & ids)
+        self.assertFalse(ModelSolutionsEvaluation.objects.exists())
+
+        # An evaluation which is not committed yet is retried (which
+        # raises the original exception when the task is called directly).
+        self.assertRaises(ModelSolutionsEvaluation.DoesNotExist,
+                evaluate_model_solutions, pi.id, 3)
+
+        # A failed evaluation stays pending.
+        ModelSolutionsEvaluation.objects.create(problem_instance=pi, token=3)
+        recreate = ModelSolution.objects.recreate_model_submissions
+
+        def fail(*args, **kwargs):
+            raise RuntimeError
+        ModelSolution.objects.recreate_model_submissions = fail
+        try:
+            self.assertRaises(RuntimeError, evaluate_model_solutions, pi.id,
+                    3)
+        finally:
+            ModelSolution.objects.recreate_model_submissions = recreate
+        self.assertTrue(ModelSolutionsEvaluation.objects.exists())
+
+    @override_settings(CACHE_TEST_RESULTS=True)
+    def test_reusing_test_results(self):
+        pi = ProblemInstance.objects.get()
+        ModelSolution.objects.recreate_model_submissions(pi)
+        self.assertTrue(CachedTestResult.objects.exists())
+        self.assertFalse(TestReport.objects.filter(reused=True).exists())
+        statuses = sorted(TestReport.objects.values_list('test_name',
+            'status'))
+
+        ModelSolution.objects.recreate_model_submissions(pi)
+        self.assertTrue(TestReport.objects.filter(reused=True).exists())
+        self.assertEqual(statuses, sorted(TestReport.objects
+            .values_list('test_name', 'status')))
+
 
 class TestProgramsXssViews(TestCase, TestStreamingMixin):
     fixtures = ['test_users', 'test_contest', 'test_full_package',
@@ -251,6 +363,19 @@ class TestSubmissionAdmin(TestCase):
         self.assertIn('subm_status subm_OK', response.content)
         self.assertIn('submission_diff_action', response.content)
 
+    def test_user_hints(self):
+        self.client.login(username='test_admin')
+        url = reverse('oioioiadmin:contests_submission_user_hints')
+        response = self.client.get(url, {'substr': 'test_u'})
+        self.assertEqual(json.loads(response.content),
+                ['test_user (Test User)'])
+        response = self.client.get(url, {'substr': 'test_a'})
+        self.assertEqual(json.loads(response.content), [])
+
+        self.client.login(username='test_user')
+        response = self.client.get(url, {'substr': 'test_u'})
+        self.assertEqual(response.status_code, 403)
+
 
 class TestSubmittingAsAdmin(TestCase):
     fixtures = ['test_users', 'test_contest', 'test_full_package']
@@ -501,3 +626,100 @@ class TestScorers(TestCase):
                 utils.sum_score_aggregator(self.g_results_ok))
         self.assertEqual((349, 'WA'),
                 utils.sum_score_aggregator(self.g_results_wrong))
+
+
+class SumGroupsProgrammingContestController(ProgrammingContestController):
+    def fill_evaluation_environ(self, environ, submission):
+        environ['group_scorer'] = 'oioioi.programs.utils.sum_group_scorer'
+        super(SumGroupsProgrammingContestController, self) \
+                .fill_evaluation_environ(environ, submission)
+
+
+class TestRegrading(TestCase):
+    fixtures = ['test_users', 'test_contest', 'test_full_package',
+            'test_submission']
+
+    def test_regrade(self):
+        call_command('regrade_submissions', 'c')
+        submission = Submission.objects.get()
+        self.assertEqual(submission.score, IntegerScore(34))
+        self.assertEqual(SubmissionReport.objects
+                .filter(submission=submission, status='SUPERSEDED').count(), 2)
+        report = SubmissionReport.objects.get(submission=submission,
+                status='ACTIVE', kind='NORMAL')
+        self.assertEqual(TestReport.objects
+                .filter(submission_report=report).count(), 4)
+
+        contest = Contest.objects.get()
+        contest.controller_name = \
+                'oioioi.programs.tests.SumGroupsProgrammingContestController'
+        contest.save()
+        call_command('regrade_submissions', 'c', problem='sum')
+        submission = Submission.objects.get()
+        self.assertEqual(submission.score, IntegerScore(67))
+        result = UserResultForContest.objects.get(user__username='test_user')
+        self.assertEqual(result.score, IntegerScore(67))
+
+
+class TestJudgingBenchmark(TestCase):
+    def test_benchmark_judging(self):
+        output = tempfile.NamedTemporaryFile(suffix='.json')
+        stdout = StringIO()
+        call_command('benchmark_judging', submissions=4, problems=2,
+                tests=3, users=2, output=output.name, stdout=stdout)
+        summary = json.load(open(output.name))
+        self.assertEqual(summary['options']['submissions'], 4)
+        self.assertGreater(summary['throughput'], 0)
+        phases = [phase['name'] for phase in summary['phases']]
+        for name in ('submit', 'prepare', 'compile', 'collect_tests',
+                'update_user_results'):
+            self.assertIn(name, phases)
+        self.assertIn('Throughput', stdout.getvalue())
+        self.assertEqual(Contest.objects.count(), 0)
+        self.assertEqual(Submission.objects.count(), 0)
+
+        stdout = StringIO()
+        call_command('benchmark_judging', submissions=4, problems=2,
+                tests=3, users=2, baseline=output.name, stdout=stdout)
+        self.assertIn('%', stdout.getvalue())
+        self.assertNotIn('different options', stdout.getvalue())
+
+
+class TestViewsBenchmark(TestCase):
+    def test_generate_contest_and_benchmark_views(self):
+        call_command('generate_contest', 'big', users=5, rounds=2,
+                problems=2, tests=3, submissions=2, messages=4,
+                stdout=StringIO())
+        contest = Contest.objects.get(id='big')
+        self.assertEqual(contest.round_set.count(), 2)
+        self.assertEqual(ProblemInstance.objects
+                .filter(contest=contest).count(), 4)
+        submissions = Submission.objects \
+                .filter(problem_instance__contest=contest)
+        self.assertEqual(TestReport.objects.filter(
+            submission_report__submission__in=submissions).count(),
+            3 * submissions.count())
+        self.assertTrue(UserResultForContest.objects
+                .filter(contest=contest).exists())
+
+        output = tempfile.NamedTemporaryFile(suffix='.json')
+        stdout = StringIO()
+        call_command('benchmark_views', 'big', repeat=1, output=output.name,
+                stdout=stdout)
+        pages = dict((page['name'], page)
+                for page in json.load(open(output.name))['pages'])
+        for name in ('ranking', 'ranking_csv', 'messages',
+                'submissions_admin'):
+            self.assertIn(name, pages)
+            self.assertGreater(pages[name]['queries'], 0)
+        self.assertIn('submissions_admin', stdout.getvalue())
+
+        # Cached rankings are still rendered in the cold requests.
+        with self.settings(CACHE_IS_SHARED=True):
+            call_command('benchmark_views', 'big', repeat=1,
+                    output=output.name, baseline=output.name,
+                    stdout=StringIO())
+        pages = dict((page['name'], page)
+                for page in json.load(open(output.name))['pages'])
+        self.assertGreater(pages['ranking']['queries'],
+                pages['ranking']['warm_queries'])
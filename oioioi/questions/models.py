@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver, Signal
 from django.core.validators import MaxLengthValidator
 from django.utils import timezone
@@ -8,7 +9,8 @@ from django.contrib.auth.models import User
 from oioioi.contests.models import Contest, Round, ProblemInstance
 from oioioi.base.fields import EnumRegistry, EnumField
 from oioioi.base.utils.validators import validate_whitespaces
-from oioioi.questions.utils import send_email_about_new_question
+from oioioi.questions.utils import send_email_about_new_question, \
+        invalidate_unread_counters
 
 message_kinds = EnumRegistry()
 message_kinds.register('QUESTION', _("Question"))
@@ -53,6 +55,17 @@ class MessageView(models.Model):
         unique_together = ('message', 'user')
 
 
+@receiver([post_save, post_delete], sender=Message)
+def _invalidate_unread_counters_on_message_change(sender, instance,
+        **kwargs):
+    invalidate_unread_counters(instance.contest_id)
+
+
+@receiver(post_save, sender=MessageView)
+def _invalidate_unread_counters_on_view(sender, instance, **kwargs):
+    invalidate_unread_counters(instance.message.contest_id, instance.user_id)
+
+
 class MessageNotifierConfig(models.Model):
     contest = models.ForeignKey(Contest)
     user = models.ForeignKey(User, verbose_name=_("username"))
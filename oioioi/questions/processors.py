@@ -1,12 +1,35 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.utils.translation import ungettext
 from django.utils.functional import lazy
-from oioioi.base.utils import make_navbar_badge
+from oioioi.base.utils import make_navbar_badge, is_cache_shared
 from oioioi.contests.utils import can_enter_contest, is_contest_admin
-from oioioi.questions.utils import unanswered_questions
+from oioioi.questions.utils import unanswered_questions, \
+        unread_counter_cache_key
 from oioioi.questions.views import new_messages, visible_messages
 
 
+def _count_unread_messages(request):
+    """Returns a pair ``(count, message_id)``, where ``message_id`` is the id
+       of the message the badge should link to if there is exactly one new
+       message, and ``None`` otherwise.
+    """
+    messages = visible_messages(request)
+    if is_contest_admin(request):
+        unread = unanswered_questions(messages)
+    else:
+        unread = new_messages(request, messages)
+    count = unread.count()
+    if count != 1:
+        return count, None
+    m = unread.get()
+    if m.top_reference_id is not None and \
+            messages.filter(id=m.top_reference_id).exists():
+        return count, m.top_reference_id
+    return count, m.id
+
+
 def navbar_tip_processor(request):
     if not getattr(request, 'contest', None):
         return {}
@@ -16,24 +39,26 @@ def navbar_tip_processor(request):
         return {}
 
     def generator():
-        is_admin = is_contest_admin(request)
-        messages = visible_messages(request)
-        visible_ids = messages.values_list('id', flat=True)
-        if is_admin:
-            messages = unanswered_questions(messages)
+        # Messages added through other processes would not invalidate
+        # counters kept in a per-process cache.
+        if is_cache_shared():
+            key = unread_counter_cache_key(request)
+            counter = cache.get(key)
+            if counter is None:
+                counter = _count_unread_messages(request)
+                cache.set(key, counter,
+                        settings.QUESTIONS_UNREAD_CACHE_TIMEOUT)
         else:
-            messages = new_messages(request, messages)
-        count = messages.count()
+            counter = _count_unread_messages(request)
+        count, message_id = counter
         if count:
             text = ungettext('%(count)d NEW MESSAGE', '%(count)d NEW MESSAGES',
                     count) % {'count': count}
 
             if count == 1:
-                m = messages.get()
                 link = reverse('message', kwargs={
                         'contest_id': request.contest.id,
-                        'message_id': m.top_reference_id
-                            if m.top_reference_id in visible_ids else m.id
+                        'message_id': message_id,
                     })
             else:
                 link = reverse('contest_messages', kwargs={'contest_id':
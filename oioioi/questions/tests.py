@@ -1,5 +1,6 @@
 import json
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.core.urlresolvers import reverse
 from oioioi.base.tests import check_not_accessible
 from oioioi.contests.models import Contest, ProblemInstance
@@ -46,6 +47,46 @@ class TestQuestions(TestCase):
         response = self.client.get(list_url)
         self.assertEqual(response.content.count('>NEW<'), 1)
 
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_navbar_badge(self):
+        self.client.login(username='test_user')
+        contest = Contest.objects.get()
+        list_url = reverse('contest_messages',
+                kwargs={'contest_id': contest.id})
+        response = self.client.get(list_url)
+        self.assertIn('2 NEW MESSAGES', response.content)
+        public_answer = Message.objects.get(topic='public-answer')
+        self.client.get(reverse('message', kwargs={
+            'contest_id': contest.id, 'message_id': public_answer.id}))
+        response = self.client.get(list_url)
+        self.assertIn('1 NEW MESSAGE<', response.content)
+        private_answer = Message.objects.get(topic='private-answer')
+        self.assertIn(reverse('message', kwargs={'contest_id': contest.id,
+            'message_id': private_answer.top_reference_id}),
+            response.content)
+
+        private_answer.delete()
+        response = self.client.get(list_url)
+        self.assertNotIn('NEW MESSAGE', response.content)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_navbar_badge_unshared_cache(self):
+        self.client.login(username='test_user')
+        contest = Contest.objects.get()
+        list_url = reverse('contest_messages',
+                kwargs={'contest_id': contest.id})
+        response = self.client.get(list_url)
+        self.assertIn('2 NEW MESSAGES', response.content)
+
+        # A message added through another process, whose signals are not
+        # received here.
+        message = Message.objects.get(topic='public-answer')
+        message.id = None
+        message.topic = 'another-answer'
+        Message.objects.bulk_create([message])
+        response = self.client.get(list_url)
+        self.assertIn('3 NEW MESSAGES', response.content)
+
     def test_ask_and_reply(self):
         self.client.login(username='test_user2')
         contest = Contest.objects.get()
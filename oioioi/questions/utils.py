@@ -1,12 +1,17 @@
+import hashlib
+import uuid
+
 from django.contrib.admin.models import LogEntry, ADDITION
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.mail import EmailMessage
 from django.core.urlresolvers import reverse
 from django.template.loader import render_to_string
 from django.utils.encoding import force_unicode
 from django.utils.translation import ugettext_lazy as _
 
-from oioioi.contests.utils import visible_rounds, visible_problem_instances
+from oioioi.contests.utils import visible_rounds, visible_problem_instances, \
+        is_contest_admin
 
 
 # taken from django.contrib.admin.options.ModelAdmin
@@ -49,3 +54,54 @@ def get_categories(request):
 def unanswered_questions(messages):
     return messages.filter(message__isnull=True, top_reference__isnull=True,
                            kind='QUESTION')
+
+
+# The counters of unread messages (or unanswered questions for admins) shown
+# in the navbar are cached per user. Cache keys contain two generation tokens:
+# one for the contest, changed whenever a message is added, and one for the
+# user, changed whenever the user reads a message.
+#
+# The counters are cached only if the cache is shared by all processes.
+
+
+def _contest_generation_key(contest_id):
+    return 'questions_generation_%s' % (contest_id,)
+
+
+def _user_generation_key(contest_id, user_id):
+    return 'questions_generation_%s_%d' % (contest_id, user_id)
+
+
+def _new_generation(key):
+    token = uuid.uuid4().hex
+    cache.set(key, token)
+    return token
+
+
+def invalidate_unread_counters(contest_id, user_id=None):
+    """Invalidates the cached counters of unread messages of all users in the
+       contest or, if ``user_id`` is given, of the given user only.
+    """
+    if user_id is None:
+        _new_generation(_contest_generation_key(contest_id))
+    else:
+        _new_generation(_user_generation_key(contest_id, user_id))
+
+
+def unread_counter_cache_key(request):
+    """Returns the cache key for the counter shown to the current user.
+
+       Apart from the generation tokens, the key depends on everything which
+       affects :func:`~oioioi.questions.views.visible_messages` and may
+       change without adding or reading messages, i.e. the set of visible
+       rounds and being an admin.
+    """
+    keys = [_contest_generation_key(request.contest.id),
+            _user_generation_key(request.contest.id, request.user.id)]
+    generations = cache.get_many(keys)
+    tokens = [generations.get(key) or _new_generation(key) for key in keys]
+    rounds_ids = sorted(round.id for round in visible_rounds(request))
+    visibility = hashlib.md5(repr((rounds_ids,
+        is_contest_admin(request)))).hexdigest()
+    return 'questions_unread_%s_%d_%s_%s_%s' % (request.contest.id,
+            request.user.id, tokens[0], tokens[1], visibility)
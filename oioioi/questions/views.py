@@ -1,5 +1,6 @@
 import json
 from django.conf import settings
+from django.contrib.auth.models import User
 from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
 from django.db.models import Q
@@ -10,7 +11,7 @@ from django.template.response import TemplateResponse
 from django.utils.translation import ugettext_lazy as _
 from oioioi.base.menu import menu_registry
 from oioioi.base.permissions import enforce_condition, not_anonymous
-from oioioi.base.utils.user_selection import get_user_q_expression
+from oioioi.base.utils.user_selection import search_users
 from oioioi.contests.utils import can_enter_contest, is_contest_admin, \
         visible_rounds, contest_exists
 from oioioi.questions.utils import log_addition, unanswered_questions
@@ -53,21 +54,25 @@ def new_messages(request, messages=None):
 
 
 def messages_template_context(request, messages):
-    replied_ids = frozenset(m.top_reference_id for m in messages)
-    new_ids = new_messages(request, messages).values_list('id', flat=True)
+    records = list(messages)
+    messages_ids = frozenset(m.id for m in records)
+    replied_ids = frozenset(m.top_reference_id for m in records)
+    new_ids = frozenset(new_messages(request, messages)
+            .values_list('id', flat=True))
 
     if is_contest_admin(request):
-        unanswered = unanswered_questions(messages)
+        unanswered_ids = frozenset(unanswered_questions(messages)
+                .values_list('id', flat=True))
     else:
-        unanswered = []
+        unanswered_ids = frozenset()
 
     to_display = [{
             'message': m,
             'link_message': m.top_reference
-                    if m.top_reference in messages else m,
-            'needs_reply': m in unanswered,
+                    if m.top_reference_id in messages_ids else m,
+            'needs_reply': m.id in unanswered_ids,
             'read': m.id not in new_ids,
-        } for m in messages if m.id not in replied_ids]
+        } for m in records if m.id not in replied_ids]
 
     def key(entry):
         return entry['needs_reply'], entry['message'].date
@@ -190,10 +195,7 @@ def get_messages_authors_view(request, contest_id):
     if len(request.REQUEST.get('substr', '')) < 1:
         raise Http404
 
-    q_expression = get_user_q_expression(request.REQUEST['substr'], 'author')
-    users = visible_messages(request).filter(q_expression).order_by('author') \
-        .values('author').distinct().values_list('author__username',
-        'author__first_name', 'author__last_name')[:getattr(settings,
-                                                            'NUM_HINTS', 10)]
+    users = search_users(request.REQUEST['substr'], User.objects
+            .filter(id__in=visible_messages(request).values('author')))
     users = ['%s (%s %s)' % u for u in users]
     return HttpResponse(json.dumps(users), content_type='application/json')
@@ -2,6 +2,7 @@ from collections import defaultdict
 from operator import itemgetter
 import unicodecsv
 
+from django.core.exceptions import ObjectDoesNotExist
 from django.http import HttpResponse
 from django.template import RequestContext
 from django.template.loader import render_to_string
@@ -13,6 +14,7 @@ from oioioi.base.utils import RegisteredSubclassesBase, ObjectWithMixins
 from oioioi.contests.models import ProblemInstance, UserResultForProblem
 from oioioi.contests.controllers import ContestController
 from oioioi.contests.utils import is_contest_admin, is_contest_observer
+from oioioi.rankings.utils import RankingIndex
 
 
 CONTEST_RANKING_KEY = 'c'
@@ -40,7 +42,16 @@ class RankingController(RegisteredSubclassesBase, ObjectWithMixins):
         """
         raise NotImplementedError
 
-    def render_ranking(self, request, key):
+    def build_ranking_index(self, request, key):
+        """Returns a :class:`~oioioi.rankings.utils.RankingIndex` with all
+           the rows of the ranking.
+        """
+        raise NotImplementedError
+
+    def render_ranking(self, request, key, index, positions):
+        """Renders the rows of the ranking at the given ``positions`` of
+           its ``index``.
+        """
         raise NotImplementedError
 
     def render_ranking_to_csv(self, request, key):
@@ -76,10 +87,38 @@ class DefaultRankingController(RankingController):
             return rankings[:1]
         return rankings
 
-    def render_ranking(self, request, key):
+    def _column_name(self, pi):
+        # The template used to swallow a missing problem, so do we.
+        try:
+            return pi.get_short_name_display()
+        except ObjectDoesNotExist:
+            return pi.short_name
+
+    def build_ranking_index(self, request, key):
         data = self.serialize_ranking(request, key)
+        columns = [{'name': self._column_name(pi),
+                    'trial': pi.round.is_trial}
+                   for pi in data['problem_instances']]
+        rows = [{'place': row['place'],
+                 'user_id': row['user'].id,
+                 'name': row['user'].get_full_name(),
+                 'last_name': row['user'].last_name,
+                 'results': [unicode(r.score) if r and r.score is not None
+                     else '' for r in row['results']],
+                 'sum': unicode(row['sum'])}
+                for row in data['rows']]
+        return RankingIndex(columns, rows)
+
+    def render_ranking(self, request, key, index, positions):
+        rows = []
+        for position in positions:
+            row = index.rows[position]
+            rows.append(dict(row, position=position,
+                cells=[{'score': score, 'trial': column['trial']}
+                    for score, column in zip(row['results'], index.columns)]))
         return render_to_string('rankings/default_ranking.html',
-                context_instance=RequestContext(request, data))
+                context_instance=RequestContext(request,
+                    {'columns': index.columns, 'rows': rows}))
 
     def render_ranking_to_csv(self, request, key):
         data = self.serialize_ranking(request, key)
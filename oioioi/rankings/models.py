@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from oioioi.contests.models import Contest, Round, ProblemInstance, \
+        UserResultForProblem
+from oioioi.problems.models import Problem
+from oioioi.rankings.utils import invalidate_rankings
+
+
+@receiver(post_save, sender=UserResultForProblem)
+@receiver(post_delete, sender=UserResultForProblem)
+def _invalidate_rankings_on_result_change(sender, instance, **kwargs):
+    try:
+        contest_id = instance.problem_instance.contest_id
+    except ProblemInstance.DoesNotExist:
+        # Deleted together with the problem instance, which invalidates
+        # the rankings by itself.
+        return
+    invalidate_rankings(contest_id)
+
+
+@receiver(post_save, sender=Round)
+@receiver(post_delete, sender=Round)
+@receiver(post_save, sender=ProblemInstance)
+@receiver(post_delete, sender=ProblemInstance)
+def _invalidate_rankings_on_contest_change(sender, instance, **kwargs):
+    invalidate_rankings(instance.contest_id)
+
+
+@receiver(post_save, sender=Contest)
+def _invalidate_rankings_on_controller_change(sender, instance, **kwargs):
+    invalidate_rankings(instance.id)
+
+
+@receiver(post_save, sender=Problem)
+def _invalidate_rankings_on_problem_change(sender, instance, **kwargs):
+    # Rankings show short names of problems.
+    for contest_id in ProblemInstance.objects.filter(problem=instance) \
+            .values_list('contest_id', flat=True).distinct():
+        invalidate_rankings(contest_id)
+
+
+@receiver(post_save, sender=User)
+def _invalidate_rankings_on_user_change(sender, instance, update_fields=None,
+        **kwargs):
+    # Rankings show names of users and leave out superusers.
+    if update_fields is not None and not set(update_fields) \
+            & set(['first_name', 'last_name', 'is_superuser']):
+        return
+    for contest_id in UserResultForProblem.objects.filter(user=instance) \
+            .values_list('problem_instance__contest_id', flat=True) \
+            .distinct():
+        invalidate_rankings(contest_id)
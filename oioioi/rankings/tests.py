@@ -1,16 +1,21 @@
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.core.urlresolvers import reverse
 from django.utils.timezone import utc
 from django.contrib.auth.models import User
 from oioioi.base.tests import fake_time, check_not_accessible
-from oioioi.contests.models import Contest
+from oioioi.contests.models import Contest, UserResultForProblem
+from oioioi.contests.scores import IntegerScore
+from oioioi.rankings.utils import RankingIndex
 from datetime import datetime
+import json
 
 
 class TestRankingViews(TestCase):
     fixtures = ['test_users', 'test_contest', 'test_full_package',
             'test_submission', 'test_extra_rounds', 'test_ranking_data']
 
+    @override_settings(CACHE_IS_SHARED=True)
     def test_ranking_view(self):
         contest = Contest.objects.get()
         url = reverse('default_ranking', kwargs={'contest_id': contest.id})
@@ -57,6 +62,133 @@ class TestRankingViews(TestCase):
                 kwargs={'contest_id': contest.id, 'key': '1'}))
             self.assertEqual(response.content.count('<td>Test User'), 1)
 
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_conditional_get(self):
+        contest = Contest.objects.get()
+        url = reverse('default_ranking', kwargs={'contest_id': contest.id})
+
+        with fake_time(datetime(2015, 8, 5, tzinfo=utc)):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Test User', response.content)
+            etag = response['ETag']
+            self.assertTrue(response.has_header('Last-Modified'))
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+            result = UserResultForProblem.objects \
+                    .filter(user__username='test_user')[0]
+            result.score = IntegerScore(1000)
+            result.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('1000', response.content)
+
+            self.client.login(username='test_user')
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.has_header('ETag'))
+
+    def test_cache_invalidation(self):
+        contest = Contest.objects.get()
+        url = reverse('default_ranking', kwargs={'contest_id': contest.id})
+        results = UserResultForProblem.objects \
+                .filter(user__username='test_user')
+
+        self.client.login(username='test_admin')
+        with fake_time(datetime(2015, 8, 5, tzinfo=utc)):
+            # Without a shared cache nothing is cached.
+            self.client.get(url)
+            results.update(score=IntegerScore(1000))
+            self.assertIn('1000', self.client.get(url).content)
+
+            with self.settings(CACHE_IS_SHARED=True):
+                self.client.get(url)
+                results.update(score=IntegerScore(2000))
+                response = self.client.get(url)
+                self.assertIn('1000', response.content)
+                self.assertNotIn('2000', response.content)
+
+                user = User.objects.get(username='test_user')
+                user.last_name = 'Renamed'
+                user.save()
+                response = self.client.get(url)
+                self.assertIn('<td>Test Renamed</td>', response.content)
+                self.assertIn('2000', response.content)
+
+                problem = results[0].problem_instance.problem
+                problem.short_name = 'ZAD1'
+                problem.save()
+                self.assertIn('>ZAD1<', self.client.get(url).content)
+
+    @override_settings(RANKING_ROWS_ON_PAGE=1)
+    def test_pages_and_search(self):
+        contest = Contest.objects.get()
+        url = reverse('default_ranking', kwargs={'contest_id': contest.id})
+        json_url = reverse('ranking_json', kwargs={'contest_id': contest.id,
+            'key': 'c'})
+
+        self.client.login(username='test_user2')
+        with fake_time(datetime(2015, 8, 5, tzinfo=utc)):
+            response = self.client.get(url)
+            self.assertEqual(response.content.count('<td>Test User'), 1)
+            self.assertIn('Page 1 of 2', response.content)
+            self.assertIn('?page=2#ranking-row-1', response.content)
+
+            response = self.client.get(url, {'page': 2})
+            self.assertIn('<td>Test User 2</td>', response.content)
+
+            response = self.client.get(url, {'q': 'user 2'})
+            self.assertIn('<td>Test User 2</td>', response.content)
+            self.assertNotIn('Page 1 of', response.content)
+
+            response = self.client.get(json_url, {'page': 2})
+            data = json.loads(response.content)
+            self.assertEqual(data['count'], 2)
+            self.assertEqual(data['num_pages'], 2)
+            self.assertEqual(data['my_page'], 2)
+            self.assertEqual([row['name'] for row in data['rows']],
+                    ['Test User 2'])
+
+            response = self.client.get(json_url, {'q': 'test'})
+            data = json.loads(response.content)
+            self.assertEqual(len(data['rows']), 1)
+            self.assertEqual(data['rows'][0]['position'], 0)
+
+    def test_empty_ranking(self):
+        contest = Contest.objects.get()
+        UserResultForProblem.objects.all().delete()
+        url = reverse('default_ranking', kwargs={'contest_id': contest.id})
+        json_url = reverse('ranking_json', kwargs={'contest_id': contest.id,
+            'key': 'c'})
+
+        self.client.login(username='test_user')
+        with fake_time(datetime(2015, 8, 5, tzinfo=utc)):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('there is no one in this ranking',
+                    response.content)
+
+            response = self.client.get(json_url)
+            data = json.loads(response.content)
+            self.assertEqual(data['count'], 0)
+            self.assertEqual(data['rows'], [])
+            self.assertIsNone(data['my_position'])
+
+    def test_ranking_index(self):
+        rows = [{'user_id': i, 'name': name, 'last_name': name.split()[-1]}
+                for i, name in enumerate(['Anna Nowak', 'Jan Kowalski',
+                    'Anna Kowalska'])]
+        index = RankingIndex([], rows)
+        self.assertEqual(index.position(1), 1)
+        self.assertIsNone(index.position(5))
+        self.assertEqual(index.search('anna', 10), [0, 2])
+        self.assertEqual(index.search('kowal', 10), [1, 2])
+        self.assertEqual(index.search('kowal', 1), [1])
+        self.assertEqual(index.search('Jan K', 10), [1])
+        self.assertEqual(index.search('x', 10), [])
+
     def test_ranking_csv_view(self):
         contest = Contest.objects.get()
         url = reverse('ranking_csv', kwargs={'contest_id': contest.id,
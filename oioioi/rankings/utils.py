@@ -0,0 +1,122 @@
+import bisect
+import hashlib
+import itertools
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from oioioi.base.utils import is_cache_shared
+from oioioi.contests.utils import is_contest_admin, is_contest_observer
+
+
+# Indexes of rankings are cached per contest, ranking key and visibility class
+# of the user. Cache keys contain a generation token of the contest, changed
+# whenever results, rounds, problems, participants or users of the contest
+# change, and the list of rankings available to the user, which changes when
+# results of a round become visible.
+#
+# Results are updated by celery workers, so the rankings are cached only if
+# the cache is shared by all processes.
+
+
+def _generation_key(contest_id):
+    return 'rankings_generation_%s' % (contest_id,)
+
+
+def _new_generation(key):
+    token = uuid.uuid4().hex
+    cache.set(key, token)
+    return token
+
+
+def invalidate_rankings(contest_id):
+    """Invalidates the cached rankings of the contest."""
+    _new_generation(_generation_key(contest_id))
+
+
+def ranking_visibility(request):
+    """Returns the class of users which see the same rankings as the
+       current user: ``'admin'`` (including observers), ``'anonymous'``
+       or ``'participant'``.
+    """
+    if is_contest_admin(request) or is_contest_observer(request):
+        return 'admin'
+    if not request.user.is_authenticated():
+        return 'anonymous'
+    return 'participant'
+
+
+def ranking_cache_key(request, key, choices):
+    """Returns the cache key of the ranking ``key`` rendered for the current
+       user, who may see the rankings ``choices``.
+    """
+    generation_key = _generation_key(request.contest.id)
+    token = cache.get(generation_key) or _new_generation(generation_key)
+    visibility = hashlib.md5(repr([choice[0] for choice in choices])) \
+            .hexdigest()
+    return 'rankings_%s_%s_%s_%s_%s' % (request.contest.id, key,
+            ranking_visibility(request), token, visibility)
+
+
+class RankingIndex(object):
+    """Rows of a ranking in the order of places, with indexes for finding
+       the row of a user and the rows of users whose names start with
+       a given prefix.
+
+       ``columns`` is a list of dictionaries with the ``name`` of a problem
+       and the ``trial`` flag of its round. Each row is a dictionary with
+       the ``place``, ``user_id``, ``name``, ``last_name``, ``results`` (a
+       list of scores as strings, one for each column) and ``sum``.
+       ``built_at`` is the Unix timestamp of building the index.
+    """
+
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+        self.built_at = int(time.time())
+        self._positions = dict((row['user_id'], i)
+                for i, row in enumerate(rows))
+        names = set()
+        for i, row in enumerate(rows):
+            names.add((row['name'].lower(), i))
+            names.add((row['last_name'].lower(), i))
+        self._names = sorted(names)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def position(self, user_id):
+        """Returns the position of the row of the given user, counted from
+           zero, or ``None`` if the user is not in the ranking.
+        """
+        return self._positions.get(user_id)
+
+    def search(self, prefix, limit):
+        """Returns the positions of at most ``limit`` first rows of users
+           whose full or last names start with ``prefix`` (ignoring case).
+        """
+        prefix = prefix.lower()
+        positions = set()
+        for name, position in itertools.islice(self._names,
+                bisect.bisect_left(self._names, (prefix,)), None):
+            if not name.startswith(prefix):
+                break
+            positions.add(position)
+        return sorted(positions)[:limit]
+
+
+def get_ranking_index(request, key, choices, build):
+    """Returns the :class:`RankingIndex` of the ranking ``key`` built by
+       ``build`` for the current user or taken from the cache, if it is
+       shared.
+    """
+    if not is_cache_shared():
+        return build()
+    cache_key = ranking_cache_key(request, key, choices)
+    index = cache.get(cache_key)
+    if index is None:
+        index = build()
+        cache.set(cache_key, index, settings.RANKINGS_CACHE_TIMEOUT)
+    return index
@@ -1,17 +1,131 @@
-from django.http import Http404
+from datetime import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
+from django.http import Http404, HttpResponse
 from django.template.response import TemplateResponse
 from django.core.urlresolvers import reverse
 from django.utils.translation import ugettext_lazy as _
+from django.views.decorators.http import condition
 from oioioi.base.permissions import enforce_condition, make_request_condition
 from oioioi.base.menu import menu_registry
+from oioioi.base.utils import request_cached
 from oioioi.contests.utils import can_enter_contest, is_contest_admin, \
     contest_exists
+from oioioi.rankings.utils import get_ranking_index
+
+
+@request_cached
+def _available_rankings(request):
+    rcontroller = request.contest.controller.ranking_controller()
+    return rcontroller.available_rankings(request)
 
 
 @make_request_condition
 def has_any_ranking_visible(request):
+    return bool(_available_rankings(request))
+
+
+def _resolve_ranking_key(request, key):
+    choices = _available_rankings(request)
+    if key is None and choices:
+        key = choices[0][0]
+    if not choices or key not in zip(*choices)[0]:
+        raise Http404
+    return key
+
+
+def _ranking_index(request, key):
     rcontroller = request.contest.controller.ranking_controller()
-    return bool(rcontroller.available_rankings(request))
+    return get_ranking_index(request, key, _available_rankings(request),
+            lambda: rcontroller.build_ranking_index(request, key))
+
+
+def _ranking_rows(request, index):
+    """Returns a pair ``(positions, page)`` with the positions of the rows
+       requested in the ``q`` (a prefix of a name) or ``page`` GET
+       parameter. ``page`` is ``None`` for searches.
+    """
+    per_page = settings.RANKING_ROWS_ON_PAGE
+    query = request.GET.get('q', '').strip()
+    if query:
+        return index.search(query, per_page), None
+    paginator = Paginator(index.rows, per_page)
+    try:
+        page = paginator.page(request.GET.get('page', 1))
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+    if not len(index):
+        # start_index() of the only, empty page is 0, not 1.
+        return [], page
+    return range(page.start_index() - 1, page.end_index()), page
+
+
+def _my_position(request, index):
+    """Returns a pair ``(position, page number)`` of the row of the current
+       user, or ``(None, None)``.
+    """
+    if not request.user.is_authenticated():
+        return None, None
+    position = index.position(request.user.id)
+    if position is None:
+        return None, None
+    return position, position // settings.RANKING_ROWS_ON_PAGE + 1
+
+
+def _rendered_ranking(request, key):
+    """Returns a dictionary with the requested rows of the ranking ``key``
+       rendered as ``ranking``, once per request.
+    """
+    key = _resolve_ranking_key(request, key)
+    if not hasattr(request, '_rankings'):
+        request._rankings = {}
+    if key not in request._rankings:
+        rcontroller = request.contest.controller.ranking_controller()
+        index = _ranking_index(request, key)
+        positions, page = _ranking_rows(request, index)
+        my_position, my_page = _my_position(request, index)
+        request._rankings[key] = {
+            'key': key,
+            'ranking': rcontroller.render_ranking(request, key, index,
+                positions),
+            'built_at': index.built_at,
+            'page': page,
+            'query': request.GET.get('q', '').strip(),
+            'my_position': my_position,
+            'my_page': my_page,
+        }
+    return request._rankings[key]
+
+
+# Pages of anonymous users differ only by the ranking (and the CSRF token of
+# the login box, so they are not cached on the server), so they support
+# conditional requests. Pages of logged in users contain also other
+# information, like notifications, which may change at any time.
+
+
+def _ranking_etag(request, contest_id, key=None):
+    if request.user.is_authenticated():
+        return None
+    try:
+        html = _rendered_ranking(request, key)['ranking']
+    except Http404:
+        return None
+    return hashlib.md5(html.encode('utf-8')).hexdigest()
+
+
+def _ranking_last_modified(request, contest_id, key=None):
+    if request.user.is_authenticated():
+        return None
+    try:
+        built_at = _rendered_ranking(request, key)['built_at']
+    except Http404:
+        return None
+    return datetime.utcfromtimestamp(built_at)
 
 
 @menu_registry.register_decorator(_("Ranking"), lambda request:
@@ -20,16 +134,43 @@ def has_any_ranking_visible(request):
 @enforce_condition(contest_exists & can_enter_contest)
 @enforce_condition(has_any_ranking_visible,
                    template='rankings/no_rankings.html')
+@condition(etag_func=_ranking_etag,
+        last_modified_func=_ranking_last_modified)
 def ranking_view(request, contest_id, key=None):
-    rcontroller = request.contest.controller.ranking_controller()
-    choices = rcontroller.available_rankings(request)
-    if key is None:
-        key = choices[0][0]
-    if key not in zip(*choices)[0]:
-        raise Http404
-    ranking = rcontroller.render_ranking(request, key)
-    return TemplateResponse(request, 'rankings/ranking_view.html',
-                {'choices': choices, 'ranking': ranking, 'key': key})
+    context = dict(_rendered_ranking(request, key),
+            choices=_available_rankings(request))
+    return TemplateResponse(request, 'rankings/ranking_view.html', context)
+
+
+@enforce_condition(contest_exists & can_enter_contest)
+@enforce_condition(has_any_ranking_visible)
+def ranking_json_view(request, contest_id, key):
+    """Returns one page of rows of the ranking in the JSON format.
+
+       The rows are chosen like in :func:`ranking_view`, by the ``page`` or
+       ``q`` GET parameter.
+    """
+    key = _resolve_ranking_key(request, key)
+    index = _ranking_index(request, key)
+    positions, page = _ranking_rows(request, index)
+    my_position, my_page = _my_position(request, index)
+    rows = []
+    for position in positions:
+        row = index.rows[position]
+        rows.append({'position': position, 'place': row['place'],
+            'name': row['name'], 'results': row['results'],
+            'sum': row['sum']})
+    response = {
+        'key': key,
+        'columns': index.columns,
+        'count': len(index),
+        'page': page.number if page is not None else None,
+        'num_pages': page.paginator.num_pages if page is not None else None,
+        'rows': rows,
+        'my_position': my_position,
+        'my_page': my_page,
+    }
+    return HttpResponse(json.dumps(response), content_type='application/json')
 
 
 @enforce_condition(contest_exists & is_contest_admin)
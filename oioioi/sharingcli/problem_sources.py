@@ -51,7 +51,7 @@ class RemoteSource(PackageSource):
         with tempfile.NamedTemporaryFile(suffix='.zip') as f:
             shutil.copyfileobj(response, f)
             f.flush()
-            problem = self.process_package(request, contest, f.name,
+            problem = self.unpack_package(request, contest, f.name,
                     f.name, existing_problem)
             if isinstance(problem, Problem):
                 purl, created = RemoteProblemURL.objects.get_or_create(
@@ -52,8 +52,9 @@ def _decode(title, file):
 
 
 class SinolPackage(object):
-    def __init__(self, path, original_filename=None):
+    def __init__(self, path, original_filename=None, progress=None):
         self.filename = original_filename or path
+        self.progress = progress
         if self.filename.lower().endswith('.tar.gz'):
             ext = '.tar.gz'
         else:
@@ -90,6 +91,11 @@ class SinolPackage(object):
     def identify(self):
         return self._find_main_folder() is not None
 
+    def _stage(self, description):
+        logger.info('%s: %s', self.filename, description)
+        if self.progress:
+            self.progress(description)
+
     def _process_config_yml(self):
         config_file = os.path.join(self.rootdir, 'config.yml')
         instance, created = \
@@ -365,17 +371,24 @@ class SinolPackage(object):
         tmpdir = tempfile.mkdtemp()
         logger.info('%s: tmpdir is %s', self.filename, tmpdir)
         try:
+            self._stage(_("Extracting the package"))
             self.archive.extract(to_path=tmpdir)
             self.rootdir = os.path.join(tmpdir, self.short_name)
             self._process_config_yml()
             self._detect_full_name()
             self._extract_makefiles()
+            self._stage(_("Processing statements"))
             self._process_statements()
+            self._stage(_("Generating tests"))
             self._generate_tests()
+            self._stage(_("Uploading tests"))
             self._process_tests()
+            self._stage(_("Compiling checkers"))
             self._process_checkers()
+            self._stage(_("Uploading model solutions"))
             self._process_extra_files()
             self._process_model_solutions()
+            self._stage(_("Saving the original package"))
             self._save_original_package()
             return self.problem
         finally:
@@ -460,5 +473,10 @@ class SinolPackageBackend(ProblemPackageBackend):
         return SinolPackage(path, original_filename) \
                 .unpack(existing_problem)
 
+    def unpack_with_progress(self, path, progress, original_filename=None,
+            existing_problem=None):
+        return SinolPackage(path, original_filename, progress) \
+                .unpack(existing_problem)
+
     def pack(self, problem):
         return SinolPackageCreator(problem).pack()
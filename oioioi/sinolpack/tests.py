@@ -9,7 +9,7 @@ from oioioi.sinolpack.package import SinolPackageBackend, \
 from oioioi.contests.models import ProblemInstance, Contest, Round, \
         Submission, UserResultForContest
 from oioioi.contests.scores import IntegerScore
-from oioioi.problems.models import Problem, ProblemStatement
+from oioioi.problems.models import Problem, ProblemStatement, ProblemPackage
 from oioioi.programs.models import Test, OutputChecker, ModelSolution, \
         TestReport
 from oioioi.sinolpack.models import ExtraConfig, ExtraFile
@@ -131,9 +131,11 @@ class TestSinolPackage(TestCase):
         response = self.client.post(url,
             {'package_file': open(filename, 'rb')}, follow=True)
         self.assertEqual(response.status_code, 200)
-        url = reverse('oioioiadmin:problems_problem_changelist')
-        print response.content
+        package = ProblemPackage.objects.get()
+        url = reverse('problem_package', kwargs={'package_id': package.id})
         self.assertRedirects(response, url)
+        self.assertEqual(package.status, 'OK')
+        self.assertEqual(package.problem, problem)
 
     def test_title_in_config_yml(self):
         filename = get_test_filename('test_simple_package.zip')
@@ -179,8 +181,14 @@ class TestSinolPackageInContest(TestCase, TestStreamingMixin):
         response = self.client.post(url,
                 {'package_file': open(filename, 'rb')}, follow=True)
         self.assertEqual(response.status_code, 200)
+        self.assertIn('problems/package.html',
+                [getattr(t, 'name', None) for t in response.templates])
         self.assertEqual(Problem.objects.count(), 1)
         self.assertEqual(ProblemInstance.objects.count(), 1)
+        self.assertEqual(ProblemInstance.objects.get().round, round)
+        package = ProblemPackage.objects.get()
+        self.assertEqual(package.status, 'OK')
+        self.assertEqual(package.contest, contest)
 
         # Delete tests and check if re-uploading will fix it.
         problem = Problem.objects.get()
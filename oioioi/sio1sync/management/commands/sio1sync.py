@@ -1,173 +1,248 @@
 import logging
 import logging.config
+import os
 import time
 import MySQLdb
 import ConfigParser
 
-from django.contrib.auth.models import User
+from django.contrib.auth.models import User, UserManager
 from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand, CommandError
 from django.utils.timezone import LocalTimezone
 from django.utils.dateparse import parse_datetime
 
+from oioioi.base.models import UserSearchToken
 from oioioi.contests.models import Contest, Round, ProblemInstance
-from oioioi.problems.models import Problem
 from oioioi.programs.models import ProgramSubmission
 
 from optparse import make_option
 from registration.models import RegistrationProfile
 
 
-def get_sio1_user(sio1_user_id):
-    """Returns dict with user's (sio1_user_id) data in SIO 1"""
+SIO1_USER_COLUMNS = 'u.id, u.login, u.first_name, u.last_name, u.e_mail, ' \
+        'u.pass'
 
-    sql = 'SELECT login, first_name, last_name, e_mail, pass \
-            FROM users WHERE id = %s'
 
-    sync_env['sioCursor'].execute(sql, (sio1_user_id,))
-    result = sync_env['sioCursor'].fetchone()
+def _sio1_user(row):
+    return {'id': row[0], 'username': row[1],
+            'first_name': row[2].decode('latin2'),
+            'last_name': row[3].decode('latin2'), 'email': row[4],
+            'password': row[5]}
 
-    return {'username': result[0], 'first_name': result[1].decode('latin2'),
-            'last_name': result[2].decode('latin2'), 'email': result[3],
-            'password': result[4]}
 
-
-def sync_user(sio1_user):
-    """Sync user (sio1_user) to SIO2 unless such user already exists.
-       Returns corresponding SIO2 User object.
+def _keyset_batches(sql, params, batch_size, after=0):
+    """Yields batches of rows returned by ``sql``, which should select the
+       key as the first column and contain a ``%(after)s`` placeholder
+       for the condition on it and a ``%(limit)s`` one for the limit.
     """
 
-    try:
-        sio2_user = User.objects.get(username=sio1_user['username'])
-        if sio1_user['first_name'] != sio2_user.first_name or \
-           sio1_user['last_name'] != sio2_user.last_name:
-            logger.warning("User already exists, but names differ."
-                           " SIO1: (%(login1)s, %(fname1)s %(lname1)s),"
-                           " SIO2: (%(login2)s, %(fname2)s %(lname2)s)",
-                           {'login1': sio1_user['username'],
-                            'fname1': sio1_user['first_name'],
-                            'lname1': sio1_user['last_name'],
-                            'login2': sio2_user.username,
-                            'fname2': sio2_user.first_name,
-                            'lname2': sio2_user.last_name})
-        else:
-            logger.debug("User (%(login)s, %(fname)s %(lname)s) exists.",
-                         {'login': sio2_user.username,
-                          'fname': sio2_user.first_name,
-                          'lname': sio2_user.last_name})
-
-    except User.DoesNotExist:
-        sio2_user = User.objects.create_user(sio1_user['username'],
-                                             sio1_user['email'], '')
-        sio2_user.first_name = sio1_user['first_name']
-        sio2_user.last_name = sio1_user['last_name']
-        sio2_user.password = sio1_user['password']
-        sio2_user.is_active = True
-        sio2_user.save()
-
-        reg_profile = RegistrationProfile.objects.create_profile(sio2_user)
-        reg_profile.activation_key = RegistrationProfile.ACTIVATED
-        reg_profile.save()
-
-        logger.info("User (%(login)s, %(fname)s %(lname)s) synced.",
-                    {'login': sio2_user.username,
-                     'fname': sio2_user.first_name,
-                     'lname': sio2_user.last_name})
-
-    return sio2_user
-
-
-def get_sio1_users_ids():
-    """Returns list of id's of all non-blocked users in sio1."""
-
-    sql = 'SELECT id FROM users WHERE pass is not NULL AND (user_type = 0 \
-            OR user_type = 1 OR user_type = 1000)'
-    sync_env['sioCursor'].execute(sql)
-    return [x[0] for x in sync_env['sioCursor'].fetchall()]
-
-
-def get_sio1_participants_ids():
-    """Returns list of id's of all participants (in sio1_contest)."""
-
-    sql = 'SELECT user FROM participants WHERE contest = %s'
-    sync_env['sioCursor'].execute(sql, (sync_env['sio1_contest'], ))
-    return [x[0] for x in sync_env['sioCursor'].fetchall()]
+    sql = sql % {'after': '%s', 'limit': '%s'}
+    while True:
+        sync_env['sioCursor'].execute(sql,
+                tuple(params) + (after, batch_size))
+        rows = sync_env['sioCursor'].fetchall()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        after = rows[-1][0]
 
 
-def sync_users(sio1_users_ids):
-    """Sync all users on sio1_users_ids list."""
+def get_sio1_users(sio1_users_ids):
+    """Returns list of dicts with data of the given users in SIO 1."""
 
-    for uid in sio1_users_ids:
-        sio1_user = get_sio1_user(uid)
-        sync_user(sio1_user)
+    if not sio1_users_ids:
+        return []
+    sql = 'SELECT ' + SIO1_USER_COLUMNS + ' FROM users AS u WHERE u.id' \
+          ' IN (' + ', '.join(['%s'] * len(sio1_users_ids)) + ')'
+    sync_env['sioCursor'].execute(sql, tuple(sio1_users_ids))
+    return [_sio1_user(row) for row in sync_env['sioCursor'].fetchall()]
 
 
-def get_sio1_submissions_ids(sio1_submission_type=1):
-    """Returns list of id's of all non-synced submissions in sio1, that
-       respond to one of sync_env['problems']
+def sync_users(sio1_users):
+    """Sync users (list of sio1_users) to SIO2, creating those which
+       do not exist yet with a constant number of queries.
+       Returns a dict mapping SIO1 ids of the users to SIO2 ids.
     """
 
-    if not sync_env['problems']:
-        return []
+    by_username = dict((u['username'], u) for u in sio1_users)
+    existing = dict((username, (user_id, first_name, last_name))
+            for username, user_id, first_name, last_name
+            in User.objects.filter(username__in=by_username.keys())
+                .values_list('username', 'id', 'first_name', 'last_name'))
 
-    sql = 'SELECT id FROM submits WHERE in_sio2 = 0 AND task' \
-          ' IN (' + ', '.join(y for (x, y) in sync_env['problems']) + ')' \
-          ' AND type = %s'
+    for username, (_id, first_name, last_name) in existing.iteritems():
+        sio1_user = by_username[username]
+        if sio1_user['first_name'] != first_name or \
+           sio1_user['last_name'] != last_name:
+            logger.warning("User already exists, but names differ."
+                           " SIO1: (%(login1)s, %(fname1)s %(lname1)s),"
+                           " SIO2: (%(login2)s, %(fname2)s %(lname2)s)",
+                           {'login1': username,
+                            'fname1': sio1_user['first_name'],
+                            'lname1': sio1_user['last_name'],
+                            'login2': username,
+                            'fname2': first_name,
+                            'lname2': last_name})
+
+    new_users = [u for username, u in by_username.iteritems()
+            if username not in existing]
+    if new_users:
+        User.objects.bulk_create([User(username=u['username'],
+                email=UserManager.normalize_email(u['email']),
+                first_name=u['first_name'], last_name=u['last_name'],
+                password=u['password'], is_active=True)
+            for u in new_users])
+        created_users = list(User.objects
+                .filter(username__in=[u['username'] for u in new_users])
+                .only('id', 'username', 'first_name', 'last_name'))
+        created = dict((user.username, user.id) for user in created_users)
+        UserSearchToken.objects.create_for_users(created_users)
+        RegistrationProfile.objects.bulk_create([RegistrationProfile(
+                user_id=user_id,
+                activation_key=RegistrationProfile.ACTIVATED)
+            for user_id in created.itervalues()])
+        existing.update((username, (user_id, None, None))
+                for username, user_id in created.iteritems())
+        for u in new_users:
+            logger.info("User (%(login)s, %(fname)s %(lname)s) synced.",
+                        {'login': u['username'], 'fname': u['first_name'],
+                         'lname': u['last_name']})
+
+    return dict((u['id'], existing[u['username']][0]) for u in sio1_users)
+
+
+def sync_all_users():
+    """Sync all non-blocked users in sio1."""
+
+    sql = 'SELECT ' + SIO1_USER_COLUMNS + ' FROM users AS u' \
+          ' WHERE u.pass is not NULL AND (u.user_type = 0' \
+          ' OR u.user_type = 1 OR u.user_type = 1000) AND u.id > %(after)s' \
+          ' ORDER BY u.id LIMIT %(limit)s'
+    for rows in _keyset_batches(sql, (), sync_env['batch_size']):
+        sync_users([_sio1_user(row) for row in rows])
+
+
+def sync_participants():
+    """Sync all participants (in sio1_contest)."""
+
+    sql = 'SELECT ' + SIO1_USER_COLUMNS + ' FROM users AS u, participants' \
+          ' AS p WHERE p.user = u.id AND p.contest = %%s' \
+          ' AND u.id > %(after)s ORDER BY u.id LIMIT %(limit)s'
+    for rows in _keyset_batches(sql, (sync_env['sio1_contest'],),
+            sync_env['batch_size']):
+        sync_users([_sio1_user(row) for row in rows])
+
+
+def get_problem_instances():
+    """Returns dict mapping ids of SIO1 problems to the corresponding
+       ProblemInstances in SIO2.
+    """
 
-    sync_env['sioCursor'].execute(sql, (sio1_submission_type))
-    return [x[0] for x in sync_env['sioCursor'].fetchall()]
+    c = Contest.objects.get(id=sync_env['sio2_contest'])
+    r = Round.objects.get(contest=c, name=sync_env['sio2_round'])
+    pis = dict((pi.problem_id, pi) for pi in ProblemInstance.objects
+            .filter(contest=c, round=r).select_related('contest'))
+    return dict((sio1_id, pis[int(sio2_id)])
+            for sio2_id, sio1_id in sync_env['problems'])
 
 
-def sync_submission(sio1_submission_id):
-    """Sync submission (sio1_submission_id) to SIO2."""
+def read_high_water_mark():
+    """Returns the id of the last synced SIO1 submission stored in
+       the state_file, or 0 if there is none.
+    """
 
-    sql = 'SELECT s.task, s.user, s.date, s.data, b.body FROM submits as s,' \
-          ' submits_bodies as b WHERE s.id = b.id AND b.id = %s'
+    state_file = sync_env.get('state_file')
+    if not state_file or not os.path.exists(state_file):
+        return 0
+    with open(state_file) as f:
+        return int(f.read().strip() or 0)
 
-    sync_env['sioCursor'].execute(sql, (sio1_submission_id,))
 
-    sio1_problem_id, sio1_user_id, sio1_date, sio1_filename, sio1_source \
-        = sync_env['sioCursor'].fetchone()
+def write_high_water_mark(sio1_submission_id):
+    state_file = sync_env.get('state_file')
+    if not state_file:
+        return
+    with open(state_file + '.tmp', 'w') as f:
+        f.write('%d\n' % (sio1_submission_id,))
+    os.rename(state_file + '.tmp', state_file)
 
-    problem_id = sync_env['reversed_problems'][str(sio1_problem_id)]
-    problem = Problem.objects.get(id=problem_id)
-    c = Contest.objects.get(id=sync_env['sio2_contest'])
-    r = Round.objects.get(name=sync_env['sio2_round'])
 
-    pi = ProblemInstance.objects.get(problem=problem, contest=c, round=r)
+def sync_submission(row, pi, sio2_user_id):
+    """Sync submission (row from SIO1) to SIO2."""
 
-    sio1_user = get_sio1_user(sio1_user_id)
-    sio2_user = sync_user(sio1_user)
+    sio1_submission_id, _problem_id, _user_id, sio1_date, sio1_filename, \
+        sio1_source = row
 
     submission_file = ContentFile(sio1_source, name=sio1_filename)
     sio1_date = parse_datetime(str(sio1_date)).replace(tzinfo=LocalTimezone())
 
-    submission = ProgramSubmission(user=sio2_user, problem_instance=pi)
+    submission = ProgramSubmission(user_id=sio2_user_id,
+                                   problem_instance=pi)
     submission.source_file.save(sio1_filename, submission_file)
     submission.date = sio1_date
     submission.save()
-    c.controller.judge(submission)
+    pi.contest.controller.judge(submission)
 
+    # Marked one by one, so that a crash never makes a submission synced
+    # twice.
     sql = 'UPDATE submits SET in_sio2 = %s WHERE id = %s'
     sync_env['sioCursor'].execute(sql, (submission.id, sio1_submission_id))
 
-    logger.info("Submission (id: %(id1)s, u: %(login)s, p: %(pshortname)s)"
+    logger.info("Submission (id: %(id1)s, u: %(uid)s, p: %(pshortname)s)"
                 " synced to SIO2 (id: %(id2)s).",
-                {'id1': sio1_submission_id, 'login': sio1_user['username'],
+                {'id1': sio1_submission_id, 'uid': sio2_user_id,
                  'pshortname': pi.short_name, 'id2': submission.id})
 
 
-def sync_submissions():
-    """Every wait_time seconds try to sync new submissions."""
+def sync_new_submissions(problem_instances, sio1_submission_type=1):
+    """Sync submissions made in SIO1 after the high-water mark, which
+       respond to one of problem_instances. Returns the number of synced
+       submissions.
+    """
 
-    while True:
-        new_submits = get_sio1_submissions_ids()
-        new_submits.sort()
-        logger.info(new_submits)
-        for s in new_submits:
-            sync_submission(s)
+    if not problem_instances:
+        return 0
+
+    sql = 'SELECT s.id, s.task, s.user, s.date, s.data, b.body' \
+          ' FROM submits AS s, submits_bodies AS b WHERE s.id = b.id' \
+          ' AND s.in_sio2 = 0 AND s.task IN (' + \
+          ', '.join(['%%s'] * len(problem_instances)) + ')' \
+          ' AND s.type = %%s AND s.id > %(after)s' \
+          ' ORDER BY s.id LIMIT %(limit)s'
+    params = tuple(problem_instances.keys()) + (sio1_submission_type,)
+
+    count = 0
+    users = sync_env['users']
+    for rows in _keyset_batches(sql, params, sync_env['batch_size'],
+            sync_env['high_water_mark']):
+        missing_users = set(row[2] for row in rows) - set(users)
+        users.update(sync_users(get_sio1_users(list(missing_users))))
+
+        for row in rows:
+            sync_submission(row, problem_instances[str(row[1])],
+                            users[row[2]])
+        count += len(rows)
+        sync_env['high_water_mark'] = rows[-1][0]
+        write_high_water_mark(rows[-1][0])
+    return count
+
+
+def sync_submissions(once=False):
+    """Sync new submissions, then, unless once is set, keep syncing
+       them as they come. Sleeps wait_time seconds only when there was
+       nothing to sync.
+    """
 
-        time.sleep(int(sync_env['wait_time']))
+    problem_instances = get_problem_instances()
+    while True:
+        count = sync_new_submissions(problem_instances)
+        logger.debug("Synced %d submissions", count)
+        if once:
+            return
+        if not count:
+            time.sleep(int(sync_env['wait_time']))
 
 
 class Command(BaseCommand):
@@ -187,7 +262,24 @@ class Command(BaseCommand):
                     action='store_true',
                     dest='no-submissions',
                     default=False,
-                    help='Do not sync submissions')
+                    help='Do not sync submissions'),
+        make_option('--once',
+                    action='store_true',
+                    dest='once',
+                    default=False,
+                    help='Sync new submissions once and exit, instead of '
+                         'syncing them continuously'),
+        make_option('--batch-size',
+                    type='int',
+                    dest='batch_size',
+                    default=None,
+                    help='Number of rows fetched from SIO1 at once'),
+        make_option('--reset',
+                    action='store_true',
+                    dest='reset',
+                    default=False,
+                    help='Ignore the stored high-water mark and look for '
+                         'non-synced submissions from the beginning')
     )
 
     args = 'config_file.conf'
@@ -195,7 +287,10 @@ class Command(BaseCommand):
            "Requires a configuration file that contains problems mapping\n" \
            "and ids of contests and rounds in both systems. See example:\n\n" \
            " oioioi/sio1sync/sio1sync.conf.example\n\n" \
-           "Works with SIO1 with in_sio2 column in submits table (v031)."
+           "Works with SIO1 with in_sio2 column in submits table (v031).\n\n" \
+           "Submissions are fetched in batches, starting after the last\n" \
+           "synced one, whose id is stored in state_file if it is given\n" \
+           "in the configuration file."
 
     def handle(self, *args, **options):
         if len(args) != 1:
@@ -221,18 +316,21 @@ class Command(BaseCommand):
         sioCursor.execute('SET NAMES latin1')
 
         problems = cfg.items('problems')
-        reversed_problems = dict((s1_id, s2_id) for s2_id, s1_id in problems)
 
         global sync_env
         sync_env = dict(cfg.items('sync'))
         sync_env.update({'sioCursor': sioCursor, 'problems': problems,
-                         'reversed_problems': reversed_problems})
+                         'users': {}})
+        sync_env['batch_size'] = options['batch_size'] or \
+                int(sync_env.get('batch_size', 1000))
+        sync_env['high_water_mark'] = 0 if options['reset'] \
+                else read_high_water_mark()
 
         if options['users']:
-            sync_users(get_sio1_users_ids())
+            sync_all_users()
 
         if options['participants']:
-            sync_users(get_sio1_participants_ids())
+            sync_participants()
 
         if not options['no-submissions']:
-            sync_submissions()
+            sync_submissions(options['once'])
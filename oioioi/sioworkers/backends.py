@@ -1,6 +1,12 @@
 import sio.workers.runner
 import sio.celery.job
 
+from django.conf import settings
+from oioioi.filetracker.client import get_client
+import random
+import tempfile
+import time
+
 # This is a workaround for SIO-915. We assume that other parts of OIOIOI code
 # do not rely on particular directory being the current directory. Without
 # this assumption, even a single call to LocalClient.build would break that
@@ -45,3 +51,93 @@ class CeleryBackend(object):
         for key, async_job in async_jobs.iteritems():
             results[key] = async_job.get()
         return results
+
+
+_simulated_random = random.Random()
+
+
+class SimulatedBackend(object):
+    """A backend which does not run anything, but returns synthetic
+       results after a simulated delay.
+
+       Used to benchmark the evaluation stack without real sioworkers,
+       see the ``benchmark_judging`` management command. The delays and
+       the frequencies of results other than ``OK`` are configured by
+       ``settings.SIMULATED_SIOWORKERS_LATENCY`` and
+       ``settings.SIMULATED_SIOWORKERS_FAILURES``.
+
+       Compilation creates a small file in the Filetracker in place of
+       the executable, as the later phases of evaluation expect it.
+    """
+
+    @staticmethod
+    def seed(value):
+        """Makes the subsequent results and delays reproducible."""
+        _simulated_random.seed(value)
+
+    def _sleep(self, kind):
+        mean, stddev = settings.SIMULATED_SIOWORKERS_LATENCY.get(kind,
+                (0, 0))
+        delay = max(0, _simulated_random.gauss(mean, stddev))
+        if delay:
+            time.sleep(delay / 1000.)
+
+    def _result_code(self, codes):
+        failures = settings.SIMULATED_SIOWORKERS_FAILURES
+        value = _simulated_random.random()
+        for code in codes:
+            value -= failures.get(code, 0)
+            if value < 0:
+                return code
+        return 'OK'
+
+    def _put_file(self, path, content):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(content)
+            f.flush()
+            get_client().put_file(path, f.name)
+
+    def _compile(self, env):
+        self._sleep('compile')
+        env['result_code'] = self._result_code(['CE'])
+        if env['result_code'] == 'OK':
+            env['compiler_output'] = ''
+            self._put_file(env['out_file'], 'simulated executable')
+        else:
+            env['compiler_output'] = 'simulated compilation error'
+        return env
+
+    def _exec(self, env):
+        self._sleep('exec')
+        env['result_code'] = self._result_code(['WA', 'TLE', 'RE'])
+        limit = env.get('exec_time_limit', 10000)
+        if env['result_code'] == 'TLE':
+            env['time_used'] = limit
+        else:
+            env['time_used'] = _simulated_random.randint(0, limit)
+        env['mem_used'] = _simulated_random.randint(1024,
+                env.get('exec_mem_limit', 65536))
+        env['num_syscalls'] = 0
+        env['result_string'] = env['result_code'] != 'OK' \
+                and 'simulated failure' or 'ok'
+        if env.get('upload_out'):
+            self._put_file(env['out_file'], 'simulated output')
+        return env
+
+    def run_job(self, job, **kwargs):
+        env = job.copy()
+        if env['job_type'] == 'compile':
+            return self._compile(env)
+        elif env['job_type'].endswith('exec'):
+            return self._exec(env)
+        elif env['job_type'] == 'ping':
+            env['pong'] = env['ping']
+            return env
+        raise RuntimeError("Job type %r is not simulated"
+                % (env['job_type'],))
+
+    def run_jobs(self, dict_of_jobs, **kwargs):
+        results = {}
+        for key in sorted(dict_of_jobs):
+            results[key] = self.run_job(dict_of_jobs[key], **kwargs)
+        return results
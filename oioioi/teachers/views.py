@@ -11,10 +11,12 @@ from django.contrib import messages
 from django.views.decorators.http import require_POST
 
 from oioioi.base.menu import account_menu_registry
+from oioioi.base.utils.bulk import bulk_add_missing
 from oioioi.base.utils.confirmation import confirmation_view
 from oioioi.contests.menu import contest_admin_menu_registry
 from oioioi.contests.models import Contest
 from oioioi.participants.models import Participant
+from oioioi.rankings.utils import invalidate_rankings
 from oioioi.teachers.models import RegistrationConfig, ContestTeacher, Teacher
 from oioioi.teachers.controllers import TeacherContestController
 from oioioi.teachers.forms import AddTeacherForm
@@ -202,10 +204,12 @@ def bulk_add_pupils_view(request, contest_id, other_contest_id):
     other_contest = get_object_or_404(Contest, id=other_contest_id)
     if not request.user.has_perm('contests.contest_admin', other_contest):
         raise PermissionDenied
-    for p in Participant.objects.filter(contest=other_contest):
-        Participant.objects.get_or_create(contest=request.contest,
-                user=p.user)
-    for ct in ContestTeacher.objects.filter(contest=other_contest):
-        ContestTeacher.objects.get_or_create(contest=request.contest,
-                teacher=ct.teacher)
+    bulk_add_missing(Participant, 'user', Participant.objects
+            .filter(contest=other_contest).values_list('user', flat=True),
+            contest=request.contest)
+    # bulk_create does not send the signals invalidating rankings.
+    invalidate_rankings(request.contest.id)
+    bulk_add_missing(ContestTeacher, 'teacher', ContestTeacher.objects
+            .filter(contest=other_contest).values_list('teacher', flat=True),
+            contest=request.contest)
     return redirect_to_pupils(request)
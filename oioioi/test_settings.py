@@ -10,6 +10,15 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# The cache is not rolled back between tests together with the database.
+NOSE_PLUGINS = ['oioioi.base.tests.plugins.ClearCache']
+
 # Enable optional modules.
 INSTALLED_APPS = (
     'oioioi.contestlogo',
@@ -4,6 +4,7 @@ from oioioi.programs.handlers import _if_compiled, _make_base_report
 from oioioi.programs.utils import slice_str
 from oioioi.testrun.models import TestRunProgramSubmission, TestRunConfig, \
     TestRunReport
+from oioioi.testrun.utils import fill_output_preview
 from oioioi.filetracker.utils import django_to_filetracker_path, \
     filetracker_to_django_file
 from oioioi.filetracker.client import get_client
@@ -100,6 +101,11 @@ def make_report(env, **kwargs):
     testrun_report.test_time_limit = test.get('exec_time_limit')
     testrun_report.output_file = filetracker_to_django_file(
                                                     test_result['out_file'])
+    stream, _version = get_client().get_stream(test_result['out_file'])
+    try:
+        fill_output_preview(testrun_report, stream)
+    finally:
+        stream.close()
     testrun_report.save()
 
     return env
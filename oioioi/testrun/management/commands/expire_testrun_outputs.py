@@ -0,0 +1,59 @@
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.translation import ugettext as _
+from oioioi.testrun.models import TestRunReport
+from oioioi.testrun.utils import fill_output_preview
+from optparse import make_option
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('-d', '--days', metavar='N', dest='days', type='int',
+            default=None,
+            help=_("Delete outputs older than N days instead of "
+                "TESTRUN_OUTPUT_LIFETIME")),
+    )
+
+    help = _("Deletes the full outputs of old test runs, leaving only the "
+             "previews stored in the reports. Should be run periodically, "
+             "e.g. from cron.")
+
+    requires_model_validation = True
+
+    def handle(self, *args, **options):
+        if args:
+            raise CommandError(_("Expected no arguments"))
+
+        days = options['days']
+        if days is None:
+            days = settings.TESTRUN_OUTPUT_LIFETIME
+        if days is None:
+            return
+
+        reports = TestRunReport.objects.exclude(output_file='') \
+                .filter(submission_report__creation_date__lt=
+                    timezone.now() - timedelta(days=days))
+        count = 0
+        for report in reports.iterator():
+            try:
+                if report.output_size is None:
+                    fill_output_preview(report, report.output_file)
+                report.output_file.delete(save=False)
+            except Exception:
+                logger.warning("Could not delete the output of test run "
+                        "report #%d", report.id, exc_info=True)
+                continue
+            TestRunReport.objects.filter(id=report.id).update(
+                    output_file='', output_size=report.output_size,
+                    output_head=report.output_head,
+                    output_tail=report.output_tail,
+                    output_omitted=report.output_omitted,
+                    output_decode_error=report.output_decode_error)
+            count += 1
+        self.stdout.write(_("Deleted %d outputs\n") % (count,))
@@ -50,9 +50,23 @@ def make_custom_output_filename(instance, filename):
 
 
 class TestRunReport(models.Model):
+    """Report of a test run.
+
+       The beginning and the end of the program's output are stored in
+       ``output_head`` and ``output_tail``, so that they may be shown
+       without reading the whole ``output_file``, which may be expired
+       (i.e. deleted) later. ``output_size`` is ``None`` for reports
+       without a stored preview.
+    """
     submission_report = models.ForeignKey(SubmissionReport)
     status = EnumField(submission_statuses)
     comment = models.CharField(max_length=255, blank=True)
     time_used = models.IntegerField(blank=True)
     test_time_limit = models.IntegerField(null=True, blank=True)
-    output_file = FileField(upload_to=make_custom_output_filename)
+    output_file = FileField(upload_to=make_custom_output_filename,
+            blank=True)
+    output_size = models.IntegerField(null=True, blank=True)
+    output_head = models.TextField(blank=True)
+    output_tail = models.TextField(blank=True)
+    output_omitted = models.IntegerField(default=0)
+    output_decode_error = models.BooleanField(default=False)
@@ -2,6 +2,7 @@
 from datetime import datetime
 
 from django.test import TestCase
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
 from django.core.files.base import ContentFile
 from django.utils.timezone import utc
@@ -82,6 +83,68 @@ class TestTestrunViews(TestCase):
                 kwargs=kwargs), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
             self.assertContains(show_output, '18')
 
+    def test_output_range_download(self):
+        self.client.login(username='test_user')
+        submission = TestRunProgramSubmission.objects.get(pk=1)
+        url = reverse('download_testrun_output', kwargs={
+            'contest_id': submission.problem_instance.contest.id,
+            'submission_id': submission.id})
+
+        with fake_time(datetime(2011, 8, 5, tzinfo=utc)):
+            response = self.client.get(url)
+            self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+            response = self.client.get(url, HTTP_RANGE='bytes=1-')
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response['Content-Range'], 'bytes 1-2/3')
+            self.assertEqual(''.join(response.streaming_content), '8\n')
+
+            response = self.client.get(url, HTTP_RANGE='bytes=-1')
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(''.join(response.streaming_content), '\n')
+
+            response = self.client.get(url, HTTP_RANGE='bytes=5-')
+            self.assertEqual(response.status_code, 416)
+
+    def test_output_preview(self):
+        self.client.login(username='test_user')
+        submission = TestRunProgramSubmission.objects.get(pk=1)
+        kwargs = {'contest_id': submission.problem_instance.contest.id,
+                'submission_id': submission.id}
+        TestRunReport.objects.update(output_size=5000, output_head='begin',
+                output_tail='end', output_omitted=4992)
+
+        with fake_time(datetime(2011, 8, 5, tzinfo=utc)):
+            show_output = self.client.get(reverse('get_testrun_output',
+                kwargs=kwargs), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            self.assertContains(show_output, 'begin')
+            self.assertContains(show_output, 'end')
+            self.assertContains(show_output, 'Bytes truncated: 4992')
+            self.assertNotContains(show_output, '18')
+
+    def test_expire_outputs(self):
+        self.client.login(username='test_user')
+        submission = TestRunProgramSubmission.objects.get(pk=1)
+        kwargs = {'contest_id': submission.problem_instance.contest.id,
+                'submission_id': submission.id}
+
+        call_command('expire_testrun_outputs', days=36500)
+        self.assertTrue(TestRunReport.objects.get().output_file)
+
+        call_command('expire_testrun_outputs', days=0)
+        report = TestRunReport.objects.get()
+        self.assertFalse(report.output_file)
+        self.assertEqual(report.output_size, 3)
+        self.assertEqual(report.output_head, '18\n')
+
+        with fake_time(datetime(2011, 8, 5, tzinfo=utc)):
+            show_output = self.client.get(reverse('get_testrun_output',
+                kwargs=kwargs), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            self.assertContains(show_output, '18')
+            download_response = self.client.get(reverse(
+                'download_testrun_output', kwargs=kwargs))
+            self.assertEqual(download_response.status_code, 404)
+
     def test_submit_view(self):
         self.client.login(username='test_user')
         kwargs = {'contest_id': Contest.objects.get().id}
@@ -192,6 +255,9 @@ class TestHandlers(TestCase):
             self.assertEqual(111, report.time_used)
             self.assertEqual('', report.comment)
             self.assertEqual('o', report.output_file.read())
+            self.assertEqual(1, report.output_size)
+            self.assertEqual('o', report.output_head)
+            self.assertEqual('', report.output_tail)
 
             handlers.delete_output(environ)
         except:
@@ -1,5 +1,8 @@
+from django.conf import settings
+
 from oioioi.base.permissions import make_request_condition
 from oioioi.contests.utils import submittable_problem_instances
+from oioioi.programs.utils import decode_str
 from oioioi.testrun.models import TestRunConfig
 from oioioi.problems.models import Problem
 
@@ -28,3 +31,38 @@ def testrun_problem_instances(request):
 @make_request_condition
 def has_any_testrun_problem(request):
     return len(testrun_problem_instances(request)) > 0
+
+
+def read_head_and_tail(stream, preview_size, chunk_size=65536):
+    """Reads the whole ``stream``, keeping only the preview and a single
+       chunk in memory.
+
+       :returns: a tuple ``(head, tail, size)``, where ``head`` and
+                 ``tail`` are respectively the first and the last (at most)
+                 ``preview_size`` bytes of the stream, not overlapping each
+                 other, and ``size`` is the size of the whole stream
+    """
+    head = stream.read(preview_size)
+    size = len(head)
+    tail = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        tail = (tail + chunk)[-preview_size:]
+    return head, tail, size
+
+
+def fill_output_preview(testrun_report, stream):
+    """Sets the output preview fields of a
+       :class:`~oioioi.testrun.models.TestRunReport` from the output read
+       from ``stream``.
+    """
+    head, tail, size = read_head_and_tail(stream,
+            settings.TESTRUN_OUTPUT_PREVIEW_SIZE)
+    testrun_report.output_size = size
+    testrun_report.output_omitted = size - len(head) - len(tail)
+    testrun_report.output_head, head_error = decode_str(head)
+    testrun_report.output_tail, tail_error = decode_str(tail)
+    testrun_report.output_decode_error = head_error or tail_error
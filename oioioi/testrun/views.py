@@ -2,6 +2,7 @@ from django.core.urlresolvers import reverse
 from django.template.response import TemplateResponse
 from django.utils.translation import ugettext_lazy as _
 from django.shortcuts import redirect, get_object_or_404
+from django.http import Http404
 
 from oioioi.base.menu import menu_registry
 from oioioi.contests.utils import can_enter_contest, is_contest_admin, \
@@ -75,7 +76,8 @@ def download_input_file_view(request, contest_id, submission_id):
     submission = get_submission_or_404(request, contest_id, submission_id,
                                        TestRunProgramSubmission)
 
-    return stream_file(submission.input_file, name='input.in')
+    return stream_file(submission.input_file, name='input.in',
+                       request=request)
 
 
 @enforce_condition(contest_exists & can_enter_contest)
@@ -84,19 +86,33 @@ def show_output_file_view(request, contest_id, submission_id,
     submission = get_submission_or_404(request, contest_id, submission_id,
                                        TestRunProgramSubmission)
     result = get_testrun_report_or_404(request, submission, testrun_report_id)
-    data = result.output_file.read(get_preview_size_limit())
-    data, decode_error = decode_str(data)
-    size = result.output_file.size
-    download_url = reverse('download_testrun_output',
-            kwargs={'contest_id': request.contest.id,
-                    'submission_id': submission_id})
-    return TemplateResponse(request, 'testrun/data.html', {
+    if testrun_report_id is not None:
+        download_url = reverse('download_specific_testrun_output',
+                kwargs={'contest_id': request.contest.id,
+                        'submission_id': submission_id,
+                        'testrun_report_id': testrun_report_id})
+    else:
+        download_url = reverse('download_testrun_output',
+                kwargs={'contest_id': request.contest.id,
+                        'submission_id': submission_id})
+    context = {
         'header': _("Output"),
-        'data': data,
-        'left': size - get_preview_size_limit(),
-        'decode_error': decode_error,
-        'download_url': download_url
-    })
+        'download_url': download_url,
+        'expired': not result.output_file,
+    }
+    if result.output_size is not None:
+        # The preview stored in the report, no need to touch the file.
+        context.update({
+            'data': result.output_head,
+            'tail': result.output_tail,
+            'left': result.output_omitted,
+            'decode_error': result.output_decode_error,
+        })
+    else:
+        data = result.output_file.read(get_preview_size_limit())
+        context['data'], context['decode_error'] = decode_str(data)
+        context['left'] = result.output_file.size - get_preview_size_limit()
+    return TemplateResponse(request, 'testrun/data.html', context)
 
 
 @enforce_condition(contest_exists & can_enter_contest)
@@ -105,4 +121,7 @@ def download_output_file_view(request, contest_id, submission_id,
     submission = get_submission_or_404(request, contest_id, submission_id,
                                        TestRunProgramSubmission)
     result = get_testrun_report_or_404(request, submission, testrun_report_id)
-    return stream_file(result.output_file, name='output.out')
+    if not result.output_file:
+        raise Http404
+    return stream_file(result.output_file, name='output.out',
+                       request=request)